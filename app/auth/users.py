@@ -39,6 +39,18 @@ def _get_token_data(
     return token_data
 
 
+async def get_current_basic_user(
+    token: str = Depends(get_oauth2_scheme())
+) -> BasicUser:
+    """Like get_current_active_basic_user(), but inactive users are accepted."""
+    token_data = _get_token_data(token, 'access')
+    user = await async_get_user_db(username=token_data.username)
+    if user is None:
+        raise UnauthorizedHTTPException(f"User :{token_data.username}: not found.")
+
+    return user
+
+
 async def get_current_active_basic_user(
     token: str = Depends(get_oauth2_scheme())
 ) -> BasicUser:
@@ -1,7 +1,11 @@
 
+import asyncio
 import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import AsyncExitStack
 from functools import cache
 from io import BytesIO
+from typing import Any, BinaryIO, Iterable, Iterator
 
 import aioboto3
 import boto3
@@ -12,6 +16,7 @@ from s3transfer.futures import TransferFuture
 from app.config.logging import LoggerValueError, get_logger
 from app.config.settings import get_settings
 from app.config.variables import AWS as VarConfig
+from app.models.responses import S3PoolStats
 
 logger = get_logger(__name__)
 
@@ -32,6 +37,118 @@ def prepend_s3_workdir(s3_key: str) -> str:
     return full_s3_key
 
 
+###################
+# Prefix deletion
+# Keys are listed page by page (list_objects_v2 returns at most 1000 keys per page)
+# and deleted with one delete_objects request per page, with a bounded number of
+# concurrent requests. Deleting listed keys does not invalidate the continuation token.
+def get_page_keys(page: dict[str, Any]) -> list[str]:
+    return [obj["Key"] for obj in page.get("Contents", [])]
+
+
+def iter_key_batches(keys: Iterable[str]) -> Iterator[list[str]]:
+    """Batches of (at most) :AWS.DELETE_BATCH_SIZE: keys."""
+    batch: list[str] = []
+    for key in keys:
+        batch.append(key)
+        if len(batch) == VarConfig.DELETE_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def get_delete_objects_kwargs(bucket: str, keys: list[str]) -> dict[str, Any]:
+    return {
+        "Bucket": bucket,
+        "Delete": {"Objects": [{"Key": key} for key in keys], "Quiet": True}
+    }
+
+
+def check_delete_objects_response(response: dict[str, Any]) -> int:
+    """Returns the number of keys that failed to be deleted (which are logged)."""
+    errors = response.get("Errors", [])
+    for error in errors:
+        logger.error(
+            f"Could not delete s3 obj :{error.get('Key')}:: {error.get('Message')}"
+        )
+
+    return len(errors)
+
+
+def delete_objs_in_prefix(
+    client: Any,
+    bucket: str,
+    prefix: str,
+    num_workers: int = VarConfig.NUM_DELETE_WORKERS
+) -> int:
+    """
+    Delete all objs in :prefix: with a boto3 :client:, over a pool of :num_workers:
+    threads. Returns the number of deleted objs.
+    """
+    num_keys = num_errors = 0
+    pending: set[Future] = set()
+    paginator = client.get_paginator("list_objects_v2")
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for keys in iter_key_batches(get_page_keys(page)):
+                if len(pending) >= num_workers:  # bound in-flight requests
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    num_errors += sum(
+                        check_delete_objects_response(future.result())
+                        for future in done
+                    )
+                pending.add(executor.submit(
+                    client.delete_objects, **get_delete_objects_kwargs(bucket, keys)
+                ))
+                num_keys += len(keys)
+        num_errors += sum(
+            check_delete_objects_response(future.result())
+            for future in wait(pending).done
+        )
+
+    return num_keys - num_errors
+
+
+async def async_delete_objs_in_prefix(
+    client: Any,
+    bucket: str,
+    prefix: str,
+    num_workers: int = VarConfig.NUM_DELETE_WORKERS
+) -> int:
+    """
+    Delete all objs in :prefix: with an aiobotocore :client:, with at most
+    :num_workers: concurrent requests. Returns the number of deleted objs.
+    """
+    semaphore = asyncio.Semaphore(num_workers)
+
+    async def async_delete_objects(keys: list[str]) -> int:
+        try:
+            response = await client.delete_objects(
+                **get_delete_objects_kwargs(bucket, keys)
+            )
+        finally:
+            semaphore.release()
+        return len(keys) - check_delete_objects_response(response)
+
+    tasks: list[asyncio.Task] = []
+    paginator = client.get_paginator("list_objects_v2")
+    try:
+        async for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for keys in iter_key_batches(get_page_keys(page)):
+                await semaphore.acquire()  # bound in-flight requests
+                tasks.append(asyncio.create_task(async_delete_objects(keys)))
+    except BaseException:
+        # listing failed (or was cancelled): stop the started deletes, which are
+        # redone when the deletion is retried
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    return sum(await asyncio.gather(*tasks))
+
+
 class S3Client:
     def __init__(self):
         self.num_workers = VarConfig.NUM_WORKERS
@@ -45,6 +162,12 @@ class S3Client:
             region_name=settings.AWS_REGION_NAME
         )
         self.client = self.session.client('s3', config=botocore_config)
+        self.upload_config = s3transfer.TransferConfig(
+            multipart_threshold=VarConfig.UPLOAD_MULTIPART_THRESHOLD,
+            multipart_chunksize=VarConfig.UPLOAD_PART_SIZE,
+            max_concurrency=self.num_workers,
+            use_threads=True
+        )
 
     def write_stream_to_s3(self, contents: bytes, s3_key: str) -> None:
         temp_file = BytesIO()
@@ -58,6 +181,20 @@ class S3Client:
         )
         temp_file.close()
 
+    def write_fileobj_to_s3(self, fileobj: BinaryIO, s3_key: str) -> None:
+        """
+        Stream :fileobj: (from its start) to s3, in a multipart upload for large
+        files, so that it is never fully read in memory.
+        """
+        fileobj.seek(0)
+        full_path = prepend_s3_workdir(s3_key)
+        self.client.upload_fileobj(
+            fileobj,
+            self.bucket,
+            full_path,
+            Config=self.upload_config
+        )
+
     def write_file_to_s3(self, filename: str, s3_key: str) -> None:
         full_path = prepend_s3_workdir(s3_key)
         self.client.upload_file(
@@ -70,13 +207,8 @@ class S3Client:
 
     def delete_s3_objs_in_prefix(self, prefix: str) -> None:
         full_path = prepend_s3_workdir(prefix)
-        response = self.client.list_objects_v2(
-            Bucket=self.bucket,
-            Prefix=full_path
-        )
-        if response['KeyCount'] > 0:
-            for object in response['Contents']:
-                self.client.delete_object(Bucket=self.bucket, Key=object['Key'])
+        num_deleted = delete_objs_in_prefix(self.client, self.bucket, full_path)
+        logger.debug(f"Deleted :{num_deleted}: s3 objs in prefix :{full_path}:.")
 
 
 @cache
@@ -127,6 +259,11 @@ def get_s3_transfer() -> S3Transfer:
 
 # Async version with aioboto3
 class AsyncS3Session():
+    """
+    Holds a long-lived async s3 client (and its connection pool), opened at startup
+    (or on first use) and closed at shutdown, shared by all async s3 helpers.
+    """
+
     def __init__(self):
         settings = get_settings()
         assert not settings.LOCAL
@@ -136,12 +273,75 @@ class AsyncS3Session():
             aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
             region_name=settings.AWS_REGION_NAME
         )
+        self.max_connections = VarConfig.MAX_ASYNC_POOL_CONNECTIONS
+        self._client: Any = None
+        self._exit_stack = AsyncExitStack()
+        self._lock = asyncio.Lock()
+        # pool metrics, from the client request events (see async_open())
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.num_requests = 0
+
+    def _on_before_send(self, **kwargs) -> None:
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.num_requests += 1
+        # returns None, otherwise the request would not be sent
+
+    def _on_needs_retry(self, **kwargs) -> None:
+        # emitted after each request attempt, with its response or exception
+        self.in_flight = max(self.in_flight - 1, 0)
+
+    async def async_open(self) -> None:
+        async with self._lock:
+            if self._client is not None:
+                return
+            botocore_config = botocore.config.Config(
+                max_pool_connections=self.max_connections
+            )
+            self._client = await self._exit_stack.enter_async_context(
+                self.session.client("s3", config=botocore_config)
+            )
+            self._client.meta.events.register("before-send.s3", self._on_before_send)
+            self._client.meta.events.register("needs-retry.s3", self._on_needs_retry)
+            logger.info(
+                f"Opened async s3 client with :{self.max_connections}: connections."
+            )
+
+    async def async_close(self) -> None:
+        async with self._lock:
+            if self._client is None:
+                return
+            await self._exit_stack.aclose()
+            self._client = None
+            logger.info("Closed async s3 client.")
+
+    async def async_get_client(self) -> Any:
+        if self._client is None:
+            await self.async_open()
+
+        return self._client
+
+    def get_pool_stats(self) -> S3PoolStats:
+        return S3PoolStats(
+            max_connections=self.max_connections,
+            in_flight=self.in_flight,
+            peak_in_flight=self.peak_in_flight,
+            num_requests=self.num_requests,
+            utilization=self.in_flight / self.max_connections
+        )
+
+    async def async_write_stream_to_s3(self, contents: bytes, s3_key: str) -> None:
+        full_path = prepend_s3_workdir(s3_key)
+        client = await self.async_get_client()
+        await client.put_object(Bucket=self.bucket, Key=full_path, Body=contents)
 
     async def async_delete_objs_in_prefix(self, prefix: str) -> None:
-        async with self.session.resource("s3") as s3:
-            bucket = await s3.Bucket(self.bucket)
-            full_path = prepend_s3_workdir(prefix)
-            await bucket.objects.filter(Prefix=full_path).delete()
+        full_path = prepend_s3_workdir(prefix)
+        num_deleted = await async_delete_objs_in_prefix(
+            await self.async_get_client(), self.bucket, full_path
+        )
+        logger.debug(f"Deleted :{num_deleted}: s3 objs in prefix :{full_path}:.")
 
 
 @cache
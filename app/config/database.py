@@ -1,20 +1,37 @@
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable
+
 from beanie import init_beanie
+from bson import ObjectId
 from bunnet import init_bunnet
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from motor.motor_asyncio import (
+    AsyncIOMotorClient, AsyncIOMotorClientSession, AsyncIOMotorCollection,
+    AsyncIOMotorDatabase,
+)
 from pymongo import MongoClient
 from pymongo.database import Database
 from starlette.datastructures import State
 
+from app.config.logging import get_logger
 from app.config.settings import get_settings
+from app.config.variables import Database as VarConfig
+from app.models.audio_chunks import CachedAudioChunk
 from app.models.blocks import Block, BunnetBlock
 from app.models.collections import Collections
 from app.models.items import BunnetItem, Item
+from app.models.jobs import Job
 from app.models.spans import BunnetSpan, Span  # TODO: Remove
-from app.models.users import UserInDB
+from app.models.users import UserDeletion, UserInDB
+
+logger = get_logger(__name__)
 
 # stores database states
 _APP_GLOBAL_STATE: State | None = None
 
+# (collection, filter, sort)
+HotQuery = tuple[Collections, dict[str, Any], list[tuple[str, int]] | None]
+
 
 async def async_init_beanie_database(
     app_global_state: State,
@@ -36,7 +53,9 @@ async def async_init_beanie_database(
 
     await init_beanie(
         database=beanie_database,
-        document_models=[UserInDB, Item, Block, Span]  # type: ignore
+        document_models=[  # type: ignore
+            UserInDB, UserDeletion, Item, Block, Span, Job, CachedAudioChunk
+        ]
     )
 
 
@@ -68,8 +87,74 @@ async def async_init_databases(
     mongo_url: str = "",
     database_name: str = ""
 ) -> None:
+    # the indexes declared in the document models are built here
     await async_init_beanie_database(app_global_state, mongo_url, database_name)
     init_bunnet_database(app_global_state, mongo_url, database_name)
+    if VarConfig.REPORT_COLLECTION_SCANS:
+        await async_report_collection_scans()
+
+
+def get_hot_queries() -> list[HotQuery]:
+    """Shapes of the frequent queries in app/crud. Ids are placeholders."""
+    id_ = ObjectId()
+    now = datetime.now(timezone.utc)
+    return [
+        (Collections.ITEMS, {"_id": id_, "owner_id": id_}, None),
+        (Collections.ITEMS, {"owner_id": id_}, None),
+        (Collections.BLOCKS, {"_id": id_, "item_id": id_}, None),
+        (Collections.BLOCKS, {"item_id": id_}, [("seq", 1)]),
+        (Collections.BLOCKS, {"item_id": id_, "is_head": True}, None),
+        (Collections.BLOCKS, {"next_id": id_, "item_id": id_}, None),
+        (
+            Collections.BLOCKS,
+            {"item_id": id_, "page_nb": {"$gte": 1, "$lt": 2}},
+            [("seq", 1)]
+        ),
+        (
+            Collections.BLOCKS,
+            {"item_id": id_, "page_nb": {"$gte": 1}},
+            [("page_nb", 1), ("seq", 1)]
+        ),
+        (Collections.SPANS, {"block_id": id_}, [("seq", 1)]),
+        (Collections.SPANS, {"block_id": {"$in": [id_]}}, None),
+        (Collections.SPANS, {"item_id": id_}, None),
+        (Collections.JOBS, {"status": "queued", "run_after": {"$lte": now}}, None),
+        (Collections.JOBS, {"status": "running", "lease_expires": {"$lt": now}}, None),
+    ]
+
+
+def has_collection_scan(plan: Any) -> bool:
+    """Whether an explain() query plan (or any of its input stages) is a COLLSCAN."""
+    if isinstance(plan, dict):
+        return (plan.get("stage") == "COLLSCAN" or
+                any(has_collection_scan(value) for value in plan.values()))
+    if isinstance(plan, list):
+        return any(has_collection_scan(value) for value in plan)
+
+    return False
+
+
+async def async_report_collection_scans() -> list[HotQuery]:
+    """Log (and return) the hot queries whose winning plan is a collection scan."""
+    beanie_db = get_beanie_database()
+    collection_scans: list[HotQuery] = []
+    for hot_query in get_hot_queries():
+        collection, query_filter, sort = hot_query
+        cursor = beanie_db[collection.value].find(query_filter)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = await cursor.explain()
+        if has_collection_scan(explanation["queryPlanner"]["winningPlan"]):
+            collection_scans.append(hot_query)
+            logger.warning(
+                f"Query :{query_filter}: (sort :{sort}:) on :{collection.value}: "
+                "falls back to a collection scan. Check the model indexes."
+            )
+
+    if not collection_scans:
+        logger.info("All hot queries use an index.")
+
+    return collection_scans
 
 
 def get_beanie_database() -> AsyncIOMotorDatabase:
@@ -79,6 +164,70 @@ def get_beanie_database() -> AsyncIOMotorDatabase:
     return _APP_GLOBAL_STATE.beanie_database
 
 
+async def async_delete_in_batches(
+    collection: AsyncIOMotorCollection,
+    query: dict[str, Any],
+    before_delete: Callable[[list[ObjectId]], Awaitable[None]] | None = None,
+    batch_size: int = VarConfig.DELETE_BATCH_SIZE
+) -> AsyncIterator[int]:
+    """
+    Delete the documents matching :query: in batches of (at most) :batch_size:, so
+    that each request stays bounded, yielding the number of deleted documents of each
+    batch. :before_delete: is awaited with the ids of each batch before deleting it.
+    """
+    while True:
+        ids = [
+            doc["_id"]
+            async for doc in collection.find(query, {"_id": 1}).limit(batch_size)
+        ]
+        if not ids:
+            return
+
+        if before_delete is not None:
+            await before_delete(ids)
+        delete_result = await collection.delete_many({"_id": {"$in": ids}})
+        yield delete_result.deleted_count
+
+
+async def async_supports_change_streams() -> bool:
+    """Change streams, like transactions, require a replica set."""
+    return await async_supports_transactions()
+
+
+async def async_supports_transactions() -> bool:
+    """Transactions require a replica set (or a sharded cluster)."""
+    if _APP_GLOBAL_STATE is None:
+        raise RuntimeWarning("DB not initialized with a global state.")
+
+    if not hasattr(_APP_GLOBAL_STATE, "supports_transactions"):
+        hello = await _APP_GLOBAL_STATE.beanie_client.admin.command("hello")
+        _APP_GLOBAL_STATE.supports_transactions = (
+            "setName" in hello or hello.get("msg") == "isdbgrid"
+        )
+        if not _APP_GLOBAL_STATE.supports_transactions:
+            logger.warning(
+                "Mongo deployment does not support transactions (standalone server). "
+                "Multi-document writes are applied without a transaction."
+            )
+
+    return _APP_GLOBAL_STATE.supports_transactions
+
+
+@asynccontextmanager
+async def async_transaction() -> AsyncIterator[AsyncIOMotorClientSession | None]:
+    """
+    Yields a session with a started transaction, committed on exit (or aborted on
+    exception). Yields None if the deployment does not support transactions.
+    """
+    if not await async_supports_transactions():
+        yield None
+        return
+
+    async with await _APP_GLOBAL_STATE.beanie_client.start_session() as session:
+        async with session.start_transaction():
+            yield session
+
+
 async def async_drop_collections() -> None:
     beanie_db = get_beanie_database()
     for collection in Collections:
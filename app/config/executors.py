@@ -0,0 +1,86 @@
+"""
+Dedicated executors for blocking work (sync boto3/Bunnet calls, document parsing)
+that would otherwise run in the event loop's default threadpool, which is shared
+with request handling. Each executor has a bounded queue: a slot is reserved before
+the work is accepted, and reservations beyond :max_queue_size: pending tasks are
+rejected, so that bursts of work neither starve the API nor grow without limit.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, partial
+from typing import Any, Callable
+
+from app.config.logging import get_logger
+from app.config.variables import Ingest as VarConfig
+
+logger = get_logger(__name__)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class ExecutorSlot:
+    """A reserved slot of a BoundedExecutor; released once its task is done."""
+
+    def __init__(self, executor: "BoundedExecutor"):
+        self._executor = executor
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._executor._release()
+
+    async def async_run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run :func: in the executor threads, without blocking the event loop."""
+        try:
+            return await asyncio.wrap_future(
+                self._executor._pool.submit(partial(func, *args, **kwargs))
+            )
+        finally:
+            self.release()
+
+
+class BoundedExecutor:
+    """Pool of :num_workers: threads with at most :max_queue_size: queued tasks."""
+
+    def __init__(self, name: str, num_workers: int, max_queue_size: int):
+        self.name = name
+        self.max_pending = num_workers + max_queue_size
+        self._pool = ThreadPoolExecutor(
+            max_workers=num_workers, thread_name_prefix=name
+        )
+        self._lock = threading.Lock()
+        self._num_pending = 0
+
+    @property
+    def num_pending(self) -> int:
+        """Number of reserved slots (running and queued tasks)."""
+        return self._num_pending
+
+    def reserve(self) -> ExecutorSlot:
+        """Reserve a slot for a task. Raises QueueFullError if the queue is full."""
+        with self._lock:
+            if self._num_pending >= self.max_pending:
+                raise QueueFullError(
+                    f"Executor :{self.name}: is full ({self.max_pending} tasks)."
+                )
+            self._num_pending += 1
+
+        return ExecutorSlot(self)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._num_pending -= 1
+
+    def shutdown(self, wait: bool = True) -> None:
+        logger.info(f"Shutting down executor :{self.name}: ({self.num_pending} tasks).")
+        self._pool.shutdown(wait=wait)
+
+
+@cache
+def get_ingest_executor() -> BoundedExecutor:
+    """Executor of the item upload pipeline (see upload_item())."""
+    return BoundedExecutor("ingest", VarConfig.NUM_WORKERS, VarConfig.MAX_QUEUE_SIZE)
@@ -1,5 +1,6 @@
 """Expose logger and environment variables."""
 from functools import cache
+from typing import Literal
 
 from pydantic import BaseSettings, root_validator
 
@@ -38,6 +39,9 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: str = ""
     AWS_S3_BUCKET: str = ""
     AWS_REGION_NAME: str = ""
+    DOCUMENT_CACHE_DIR: str = ""  # if set, cache item documents on disk, not in memory
+    # whether spans are stored in their own collection or embedded in their blocks
+    SPAN_STORAGE: Literal["collection", "embedded"] = "collection"
 
     @root_validator
     def env_var_exists(cls, values: dict[str, str]) -> dict[str, str]:
@@ -33,6 +33,90 @@ class Regex:
     WHITESPACES_REGEX: Final[str] = r"[ \u00A0\t\r\x0b\x0c\n]+"
 
 
+class Blocks:
+    # Blocks and spans are given sparse order keys (:seq:) spaced by SEQ_GAP, so that
+    # insertions between two elements rarely require renumbering the whole item.
+    SEQ_GAP: Final[float] = 1024.
+    # Whether to check that the :next_id: pointers agree with the :seq: order on reads
+    CHECK_LINKED_LIST: bool = False
+
+
+class Database:
+    # Whether to report hot queries that fall back to a collection scan at startup
+    REPORT_COLLECTION_SCANS: bool = True
+    # Number of documents deleted per request in cascading deletes
+    DELETE_BATCH_SIZE: int = 10000
+
+
+class Users:
+    # Seconds without progress after which an in-progress user deletion is resumed
+    DELETION_STALE_SECONDS: int = 300
+    # Seconds between refreshes of a running user deletion (less than the above)
+    DELETION_HEARTBEAT_SECONDS: int = 60
+    # Seconds between checks for stale user deletions (see async_sweep_user_deletions())
+    DELETION_SWEEP_SECONDS: int = 60
+
+
+class Ingest:
+    # Number of threads running the item upload pipeline (see config/executors.py).
+    # Ingests are mostly blocking I/O and parsing, kept apart from request handling.
+    NUM_WORKERS: int = 2
+    # Number of uploads waiting for a worker, after which uploads are rejected (503)
+    MAX_QUEUE_SIZE: int = 8
+
+
+class Jobs:
+    # Seconds a worker holds a claimed job without renewing its lease. Jobs of
+    # workers that died are claimed again once their lease expires.
+    LEASE_SECONDS: int = 60
+    # Number of runs of a job before it is failed; retries are delayed exponentially
+    MAX_ATTEMPTS: int = 3
+    RETRY_BASE_SECONDS: int = 10
+    MAX_RETRY_SECONDS: int = 600
+    # Maximum number of running jobs of a single user, across all workers
+    MAX_RUNNING_PER_OWNER: int = 2
+    # Number of jobs run concurrently by each worker process
+    NUM_CONCURRENT_JOBS: int = 4
+    # Seconds an idle worker waits before polling for jobs again
+    POLL_SECONDS: float = 1.
+    # Seconds completed and failed jobs are kept
+    FINISHED_TTL_SECONDS: int = 7 * 24 * 3600
+
+
+class TTS:
+    # Maximum number of blocks of the same voice synthesized at a time by a worker
+    # process (see utils/tts.py), overridden per voice name (e.g. for voices of
+    # rate-limited engines) in VOICE_MAX_CONCURRENCY.
+    MAX_CONCURRENCY: int = 8
+    VOICE_MAX_CONCURRENCY: dict[str, int] = {}
+    # Part of the key of cached audio chunks (see utils/audio_cache.py); increment it
+    # to stop using the cached audio, e.g. when the TTS engines change.
+    AUDIO_CACHE_VERSION: Final[int] = 1
+
+
+class Events:
+    # Seconds between reads of the item block audios when change streams are not
+    # available (standalone Mongo server)
+    POLL_SECONDS: float = 2.
+    # Seconds without events after which a keepalive comment is sent
+    KEEPALIVE_SECONDS: float = 15.
+    # Seconds after which an event stream is closed (clients reconnect)
+    MAX_STREAM_SECONDS: float = 3600.
+
+
+class Raw:
+    # Number of documents per batch returned by raw (motor) cursors
+    BATCH_SIZE: int = 1000
+
+
+class Cache:
+    # Maximum number of streamed document lengths kept in memory
+    MAX_DOCUMENT_LENGTHS: int = 10000
+    # Budget of serialized item document blocks kept in memory / on disk
+    MAX_DOCUMENT_BYTES: int = 256 * 1024**2  # 256 MB
+    MAX_DISK_DOCUMENT_BYTES: int = 4 * 1024**3  # 4 GB
+
+
 class AWS:
     # The maximum number of concurrent S3 API transfer operations can be tuned to
     # adjust for the connection speed. Set the max_concurrency attribute to increase
@@ -40,4 +124,14 @@ class AWS:
     # The attribute's default setting is 10. To reduce bandwidth usage, reduce the
     # value; to increase usage, increase it.
     NUM_WORKERS: int = 20
+    # Uploads of files larger than the threshold are multipart, with parts of
+    # UPLOAD_PART_SIZE bytes uploaded by up to NUM_WORKERS threads.
+    UPLOAD_MULTIPART_THRESHOLD: int = 16 * 1024 * 1024
+    UPLOAD_PART_SIZE: int = 16 * 1024 * 1024
+    # Maximum number of keys per delete_objects request (S3 limit)
+    DELETE_BATCH_SIZE: Final[int] = 1000
+    # Maximum number of concurrent delete_objects requests of a prefix deletion
+    NUM_DELETE_WORKERS: int = 8
+    # Connection pool size of the long-lived async s3 client
+    MAX_ASYNC_POOL_CONNECTIONS: int = 50
     PRESIGNED_URL_EXPIRE_SECONDS: Final[int] = 14400  # 4 hours
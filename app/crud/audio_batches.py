@@ -0,0 +1,112 @@
+"""
+Batch audio generation: the blocks of a batch audio request (see
+request_block_batch_audio()) are synthesized with the TTS scheduler of the worker
+(see utils/tts.py), starting at the reading position.
+"""
+from beanie.odm.fields import PydanticObjectId
+
+from app.config.logging import get_logger
+from app.crud.audios import process_item_block_audio  # type: ignore
+from app.crud.blocks import async_get_item_block_db, async_get_item_block_orders_db
+from app.models.blocks import Block
+from app.models.fields import AudioStatus
+from app.models.items import Item
+from app.routers.http_exceptions import InternalServerErrorHTTPException
+from app.utils.general import async_call
+from app.utils.tts import get_reading_order, get_tts_scheduler
+
+logger = get_logger(__name__)
+
+
+def get_reading_seqs(
+    block_seqs: dict[PydanticObjectId, float | None],
+    ordered_block_ids: list[PydanticObjectId] | None = None
+) -> dict[PydanticObjectId, float]:
+    """
+    Reading order keys of the blocks of :block_seqs: (id to :seq:): their :seq:, or,
+    if some block has none (blocks of items created before :seq:), their index in
+    the item block list :ordered_block_ids:, if given.
+    """
+    if ordered_block_ids is None or all(
+        seq is not None for seq in block_seqs.values()
+    ):
+        return {block_id: seq or 0. for block_id, seq in block_seqs.items()}
+
+    return {
+        block_id: float(idx)
+        for idx, block_id in enumerate(ordered_block_ids)
+        if block_id in block_seqs
+    }
+
+
+async def async_get_reading_seqs(
+    item_id: PydanticObjectId,
+    block_seqs: dict[PydanticObjectId, float | None]
+) -> dict[PydanticObjectId, float]:
+    """See get_reading_seqs(). The item block list is only read if needed."""
+    ordered_block_ids = None
+    if any(seq is None for seq in block_seqs.values()):
+        try:
+            ordered_block_ids = [
+                block.id for block in await async_get_item_block_orders_db(item_id)
+            ]
+        except InternalServerErrorHTTPException as exc:
+            logger.warning(
+                f"Reading order of item :{item_id}: not found: {exc.detail}"
+            )
+
+    return get_reading_seqs(block_seqs, ordered_block_ids)
+
+
+async def async_process_item_block_batch_audio(
+    item_db: Item,
+    block_ids: list[PydanticObjectId],
+    position_block_id: PydanticObjectId | None = None
+) -> None:
+    """
+    Generate the audios of blocks :block_ids: of :item_db:, from the reading position
+    :position_block_id: onwards first (see get_reading_order()). The block
+    :audio_status: is the persisted progress of the batch: blocks that are no longer
+    in progress (done by a previous run of the job, or by a concurrent request) are
+    skipped, and blocks whose synthesis fails are set as failed.
+    """
+    query_block_ids = list(block_ids)
+    if position_block_id is not None:
+        query_block_ids.append(position_block_id)
+    blocks = await Block.get_motor_collection().find(
+        {"_id": {"$in": query_block_ids}, "item_id": item_db.id},
+        {"seq": 1, "audio_status": 1}
+    ).to_list(None)
+    reading_seqs = await async_get_reading_seqs(
+        item_db.id, {block["_id"]: block.get("seq") for block in blocks}
+    )
+    block_seqs = [
+        (block["_id"], reading_seqs[block["_id"]])
+        for block in blocks
+        if block.get("audio_status") == AudioStatus.IN_PROGRESS and
+        block["_id"] in reading_seqs
+    ]
+    position_seq = None
+    if position_block_id is not None:
+        position_seq = reading_seqs.get(position_block_id)
+
+    async def async_synthesize(block_id: PydanticObjectId) -> None:
+        block_db = await async_get_item_block_db(item_db.id, block_id)
+        if not block_db or block_db.audio_status != AudioStatus.IN_PROGRESS:
+            return  # deleted or done
+
+        await async_call(process_item_block_audio, item_db, block_db)
+
+    failed_block_ids = await get_tts_scheduler().async_synthesize_blocks(
+        item_db.voice_name,
+        get_reading_order(block_seqs, position_seq),
+        async_synthesize
+    )
+    if failed_block_ids:
+        await Block.find({"_id": {"$in": failed_block_ids}}).update(
+            {"$set": {"audio_status": AudioStatus.FAILED}}
+        )
+        logger.warning(
+            f"Audio of :{len(failed_block_ids)}: of :{len(block_seqs)}: blocks of "
+            f"item :{item_db.id}: failed."
+        )
@@ -0,0 +1,88 @@
+"""
+Block audio from cached sentence chunks (see utils/audio_cache.py). The cache index
+(the audio_chunks collection) maps chunk hashes to their s3 objects, so that the
+cached chunks of a block are found in a single query.
+"""
+import os
+from typing import Awaitable, Callable, Sequence
+
+from app.config.logging import get_logger
+from app.config.settings import get_settings
+from app.config.variables import Path as VarConfig  # type: ignore
+from app.models.audio_chunks import CachedAudioChunk
+from app.models.fields import datetime_func
+from app.models.spans import SpanOut
+from app.utils.audio_cache import get_audio_chunk_hash, get_audio_chunks
+from app.utils.aws import async_write_stream_to_s3, get_audio_chunk_s3_key
+from app.utils.general import mkdir_if_not_exists
+
+logger = get_logger(__name__)
+
+# synthesizes the audio (wav bytes) of a chunk of spans
+AudioChunkSynthesis = Callable[[list[SpanOut]], Awaitable[bytes]]
+
+
+async def async_get_cached_audio_chunk_keys(chunk_hashes: list[str]) -> dict[str, str]:
+    """s3 keys of the cached chunks among :chunk_hashes:."""
+    return {
+        chunk["_id"]: chunk["s3_key"]
+        async for chunk in CachedAudioChunk.get_motor_collection().find(
+            {"_id": {"$in": chunk_hashes}}, {"s3_key": 1}
+        )
+    }
+
+
+async def async_add_cached_audio_chunk(chunk_hash: str, contents: bytes) -> str:
+    """Store audio chunk :chunk_hash: and add it to the cache index."""
+    s3_key = get_audio_chunk_s3_key(chunk_hash)
+    if not get_settings().LOCAL:
+        await async_write_stream_to_s3(contents, s3_key)
+    else:
+        out_path = os.path.join(VarConfig.OUTPUT, s3_key)
+        mkdir_if_not_exists(os.path.dirname(out_path))
+        with open(out_path, 'wb') as f:
+            f.write(contents)
+
+    # chunks are immutable: a concurrent insert of the same chunk is the same audio
+    await CachedAudioChunk.get_motor_collection().update_one(
+        {"_id": chunk_hash},
+        {"$setOnInsert": {
+            "s3_key": s3_key,
+            "num_bytes": len(contents),
+            "added_date": datetime_func()
+        }},
+        upsert=True
+    )
+
+    return s3_key
+
+
+async def async_get_block_audio_chunk_keys(
+    spans: Sequence[SpanOut],
+    language_name: str,
+    voice_name: str,
+    synthesize: AudioChunkSynthesis
+) -> list[str]:
+    """
+    s3 keys of the audio chunks of block :spans: (in reading order), to be joined
+    into the block audio. Only the chunks missing from the cache are synthesized
+    with :synthesize:, once per distinct chunk.
+    """
+    chunks = get_audio_chunks(spans)
+    chunk_hashes = [
+        get_audio_chunk_hash(chunk, language_name, voice_name) for chunk in chunks
+    ]
+    s3_keys = await async_get_cached_audio_chunk_keys(list(set(chunk_hashes)))
+    num_cached = len(s3_keys)
+    # one chunk at a time: a block takes one slot of the TTS scheduler
+    for chunk_hash, chunk in zip(chunk_hashes, chunks):
+        if chunk_hash not in s3_keys:
+            s3_keys[chunk_hash] = await async_add_cached_audio_chunk(
+                chunk_hash, await synthesize(chunk)
+            )
+
+    logger.debug(
+        f":{len(chunks)}: audio chunks, :{num_cached}: cached, "
+        f":{len(s3_keys) - num_cached}: synthesized."
+    )
+    return [s3_keys[chunk_hash] for chunk_hash in chunk_hashes]
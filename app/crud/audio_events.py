@@ -0,0 +1,128 @@
+"""
+Audio status events of an item (see GET /items/{id}/audios/events): the changes of
+the block :audio_status: and :audio_path:, read from a change stream of the blocks
+collection on replica sets, or by polling the item block audios otherwise, so that
+each client watches an item with a single connection.
+"""
+import asyncio
+import time
+from typing import AsyncIterator
+
+from beanie.odm.fields import PydanticObjectId
+from pymongo.errors import PyMongoError
+
+from app.config.database import async_supports_change_streams
+from app.config.logging import get_logger
+from app.config.variables import Events as VarConfig
+from app.crud.raw import (
+    BLOCK_AUDIO_PROJECTION, RawDict, async_list_item_block_audios_raw,
+    get_block_audio_dict,
+)
+from app.models.blocks import Block
+from app.utils.serialization import get_event_message
+
+logger = get_logger(__name__)
+
+
+def get_block_audio_changes(
+    block_audios: dict[PydanticObjectId, RawDict],
+    new_block_audios: list[RawDict]
+) -> list[RawDict]:
+    """
+    :new_block_audios: that differ from :block_audios: (by block id), which are
+    updated with them.
+    """
+    changes = []
+    for block_audio in new_block_audios:
+        if block_audios.get(block_audio["_id"]) != block_audio:
+            block_audios[block_audio["_id"]] = block_audio
+            changes.append(block_audio)
+
+    return changes
+
+
+async def async_iter_polled_block_audios(
+    item_id: PydanticObjectId
+) -> AsyncIterator[list[RawDict]]:
+    """All block audios of item :item_id:, first at once, then every poll."""
+    yield await async_list_item_block_audios_raw(item_id)
+    while True:
+        await asyncio.sleep(VarConfig.POLL_SECONDS)
+        yield await async_list_item_block_audios_raw(item_id)
+
+
+async def async_iter_watched_block_audios(
+    item_id: PydanticObjectId
+) -> AsyncIterator[list[RawDict]]:
+    """
+    All block audios of item :item_id:, read once the change stream is open, so that
+    no later change is missed; then the updated block audios (empty lists when idle).
+    """
+    pipeline = [
+        {
+            "$match": {
+                "operationType": {"$in": ["update", "replace"]},
+                "fullDocument.item_id": item_id
+            }
+        },
+        {
+            "$project": {
+                f"fullDocument.{field}": 1 for field in BLOCK_AUDIO_PROJECTION
+            }
+        }
+    ]
+    async with Block.get_motor_collection().watch(
+        pipeline,
+        full_document="updateLookup",
+        max_await_time_ms=int(VarConfig.KEEPALIVE_SECONDS * 1000)
+    ) as change_stream:
+        yield await async_list_item_block_audios_raw(item_id)
+        while True:
+            change = await change_stream.try_next()
+            if change is None or change.get("fullDocument") is None:
+                yield []
+            else:
+                yield [get_block_audio_dict(change["fullDocument"])]
+
+
+async def async_iter_item_audio_events(
+    item_id: PydanticObjectId
+) -> AsyncIterator[bytes]:
+    """
+    Server-sent events of item :item_id:: a "snapshot" event with all its
+    :BlockAudio: dicts, then an "audio" event with each changed :BlockAudio: dict.
+    The snapshot is read once changes are being watched, so that none is lost.
+    Keepalive comments are sent when idle, and the stream ends after
+    :MAX_STREAM_SECONDS:.
+    """
+    last_block_audios: dict[PydanticObjectId, RawDict] | None = None
+    iter_block_audios = (
+        async_iter_watched_block_audios
+        if await async_supports_change_streams()
+        else async_iter_polled_block_audios
+    )
+    start_time = last_event_time = time.monotonic()
+    try:
+        async for new_block_audios in iter_block_audios(item_id):
+            if last_block_audios is None:  # first read: snapshot
+                last_block_audios = {
+                    block_audio["_id"]: block_audio for block_audio in new_block_audios
+                }
+                yield b"retry: 5000\n" + get_event_message("snapshot", new_block_audios)
+                continue
+
+            for block_audio in get_block_audio_changes(
+                last_block_audios, new_block_audios
+            ):
+                yield get_event_message("audio", block_audio)
+                last_event_time = time.monotonic()
+
+            now = time.monotonic()
+            if now - start_time > VarConfig.MAX_STREAM_SECONDS:
+                return
+            if now - last_event_time > VarConfig.KEEPALIVE_SECONDS:
+                yield b": keepalive\n\n"
+                last_event_time = now
+    except PyMongoError as exc:
+        # the client reconnects and gets a new snapshot
+        logger.warning(f"Audio events of item :{item_id}: stopped: {exc}")
@@ -1,25 +1,124 @@
-from typing import Any, cast
+import asyncio
+from typing import Any, Awaitable, Callable, Sequence, cast
 
 from beanie.odm.fields import PydanticObjectId
+from beanie.odm.utils.dump import get_dict
 from pydantic import NonNegativeInt, PositiveInt
+from pymongo import DeleteMany, InsertOne, UpdateOne
 
+from app.config.database import async_delete_in_batches, async_transaction
 from app.config.logging import LoggerOSError, LoggerValueError, get_logger
 from app.config.settings import get_settings
+from app.config.variables import Blocks as VarConfig
+from app.crud.spans import get_span_storage
 from app.models.base import IdModel
 from app.models.blocks import (
-    BaseBlock, BaseBlockOut, Block, BlockAudio, BlockDict, BlockIdAudioStatus, BlockOut,
-    BunnetBlock, PageNumber, ShallowBlockDict,
+    BaseBlock, BaseBlockOut, Block, BlockAudio, BlockEdit, BlockGraph,
+    BlockIdAudioStatus, BlockIn, BlockOrder, BlockOrderRead, BlockOut, BlockWithSpans,
+    BunnetBlock, PageNumber,
+)
+from app.models.collections import Collections
+from app.models.fields import AudioStatus, BlockEditOp, SpanType
+from app.models.items import BunnetItem, Item
+from app.models.spans import (
+    BaseSpan, BunnetSpan, PauseSpanIn, Span, SpanIdBlockId, SpanOut,
 )
-from app.models.fields import AudioStatus
-from app.models.spans import BaseSpan, BunnetSpan, Span, SpanIdBlockId, SpanOut
 from app.routers.http_exceptions import (
-    InternalServerErrorHTTPException, NotFoundHTTPException,
+    BadRequestHTTPException, InternalServerErrorHTTPException, NotFoundHTTPException,
 )
 from app.utils.aws import async_delete_s3_objs_in_prefix, get_block_audio_s3_prefix
+from app.utils.seq import fill_seqs, get_seq, get_seq_between
 
 logger = get_logger(__name__)
 
 
+########
+# Order
+def has_seq(elements: Sequence[BlockOrder | BaseBlock | BaseSpan]) -> bool:
+    """Whether all elements have an order key (see :Blocks.SEQ_GAP:)."""
+    return all(element.seq is not None for element in elements)
+
+
+def check_linked_list(elements: Sequence[BlockOrder | BaseBlock | BaseSpan]) -> None:
+    """Check that the :next_id: pointers agree with the order of :elements:."""
+    for cur_element, next_element in zip(elements[:-1], elements[1:]):
+        if cur_element.next_id != next_element.id:
+            raise LoggerOSError(
+                logger,
+                f"Linked list of :{cur_element.id}: points to :{cur_element.next_id}: "
+                f"but the next element in :seq: order is :{next_element.id}:."
+            )
+
+
+def get_linked_list_ids(
+    elements: Sequence[BlockOrder | BaseBlock | BaseSpan],
+    head_id: PydanticObjectId
+) -> list[PydanticObjectId]:
+    """Follow the :next_id: pointers of :elements: from :head_id:."""
+    element_dict = {element.id: element for element in elements}
+    ids: list[PydanticObjectId] = []
+    cur_id: PydanticObjectId | None = head_id
+    while cur_id is not None:
+        try:
+            cur_element = element_dict[cur_id]
+        except KeyError as exc:
+            raise LoggerOSError(
+                logger, f"Linked list construction failed in element :{cur_id}:."
+            ) from exc
+
+        ids.append(cur_id)
+        cur_id = cur_element.next_id
+
+    if len(ids) != len(element_dict):
+        raise LoggerOSError(
+            logger,
+            f"Linked list from :{head_id}: has :{len(ids)}: elements "
+            f"but :{len(element_dict)}: were given."
+        )
+
+    return ids
+
+
+def get_linked_list_range_ids(
+    elements: Sequence[BlockOrder],
+    start_id: PydanticObjectId,
+    end_id: PydanticObjectId | None = None
+) -> list[PydanticObjectId]:
+    """
+    Follow the :next_id: pointers of :elements: from :start_id: to :end_id:
+    (inclusive) or, if not given, to the end of the list.
+    """
+    element_dict = {element.id: element for element in elements}
+    ids: list[PydanticObjectId] = []
+    cur_id: PydanticObjectId | None = start_id
+    while cur_id is not None:
+        try:
+            cur_element = element_dict[cur_id]
+        except KeyError as exc:
+            raise LoggerOSError(
+                logger, f"Linked list range construction failed in element :{cur_id}:."
+            ) from exc
+
+        ids.append(cur_id)
+        if cur_id == end_id:
+            return ids
+        cur_id = cur_element.next_id
+
+    if end_id is not None:
+        raise LoggerValueError(
+            logger, f"Element :{end_id}: not found after element :{start_id}:."
+        )
+
+    return ids
+
+
+def get_seq_update_ops(ordered_ids: list[PydanticObjectId]) -> list[UpdateOne]:
+    return [
+        UpdateOne({"_id": id_}, {"$set": {"seq": get_seq(idx)}})
+        for idx, id_ in enumerate(ordered_ids)
+    ]
+
+
 ########
 def get_spans_out_from_head_non_head_spans_db(
     head_span_db: BaseSpan,
@@ -47,24 +146,40 @@ def get_spans_out_from_head_non_head_spans_db(
     return spans
 
 
+def get_spans_out_from_spans_db(
+    block_id: PydanticObjectId,
+    spans_db: list[BaseSpan]
+) -> list[SpanOut]:
+    """
+    If all spans have an order key, :spans_db: is expected to be sorted by :seq:.
+    Otherwise, the linked list is followed from the head span.
+    """
+    if has_seq(spans_db):
+        if VarConfig.CHECK_LINKED_LIST:
+            check_linked_list(spans_db)
+        return [BaseSpan.convert_to_span_out(span) for span in spans_db]
+
+    head_spans_db = [span for span in spans_db if span.is_head]
+    if len(head_spans_db) != 1:
+        raise LoggerOSError(
+            logger, f"Found :{len(head_spans_db)}: head spans in block :{block_id}:."
+        )
+    non_head_spans_db = [span for span in spans_db if not span.is_head]
+
+    return get_spans_out_from_head_non_head_spans_db(
+        head_spans_db[0], non_head_spans_db
+    )
+
+
 ####
 async def async_get_block_spans_out_db(block_id: PydanticObjectId) -> list[SpanOut]:
-    # get head span
-    head_span_db = await Span.find_one(
-        {"block_id": block_id, "is_head": True}
-    ).project(BaseSpan)
-    if not head_span_db:
+    # get block spans in :seq: order
+    spans_db = await get_span_storage().async_get_block_spans(block_id)
+    if not spans_db:
         raise NotFoundHTTPException(f"No head span found for block :{block_id}:.")
 
-    # get block non-head spans
-    non_head_spans_db = await Span.find(
-        {"block_id": block_id, "is_head": None}
-    ).project(BaseSpan).to_list()
-
     try:
-        spans = get_spans_out_from_head_non_head_spans_db(
-            head_span_db, non_head_spans_db
-        )
+        spans = get_spans_out_from_spans_db(block_id, spans_db)
     except (LoggerOSError, LoggerValueError) as exc:
         raise InternalServerErrorHTTPException(exc.msg)
 
@@ -72,19 +187,12 @@ async def async_get_block_spans_out_db(block_id: PydanticObjectId) -> list[SpanO
 
 
 def get_block_spans_out_db(block_id: PydanticObjectId) -> list[SpanOut]:
-    # get head span
-    head_span_db = BunnetSpan.find_one(
-        {"block_id": block_id, "is_head": True}
-    ).project(BaseSpan).run()
-    if not head_span_db:
+    # get block spans in :seq: order
+    spans_db = get_span_storage().get_block_spans(block_id)
+    if not spans_db:
         raise LoggerOSError(logger, f"No head span found for block :{block_id}:.")
 
-    # get block non-head spans
-    non_head_spans_db = BunnetSpan.find(
-        {"block_id": block_id, "is_head": None}
-    ).project(BaseSpan).to_list()
-
-    return get_spans_out_from_head_non_head_spans_db(head_span_db, non_head_spans_db)
+    return get_spans_out_from_spans_db(block_id, spans_db)
 
 
 ####
@@ -98,6 +206,22 @@ def get_block_out_from_block_db(block: BaseBlockOut) -> BlockOut:
     return BlockOut.construct_from_block(block, spans)
 
 
+def get_block_out_from_block_with_spans(block: BlockWithSpans) -> BlockOut:
+    spans = get_spans_out_from_spans_db(block.id, block.spans)
+    return BlockOut.construct_from_block(block, spans)
+
+
+########
+# Item version
+async def async_increment_item_version_db(item_id: PydanticObjectId) -> None:
+    """Signal that the item document changed (see :Item.version:)."""
+    await Item.find_one({"_id": item_id}).update({"$inc": {"version": 1}})
+
+
+def increment_item_version_db(item_id: PydanticObjectId) -> None:
+    BunnetItem.find_one({"_id": item_id}).update({"$inc": {"version": 1}}).run()
+
+
 ########
 # GET
 async def async_get_item_block_db(
@@ -144,6 +268,67 @@ def get_page_range_block_query_dict(
     return block_query_dict
 
 
+def get_blocks_with_spans_pipeline(
+    block_query_dict: dict[str, Any]
+) -> list[dict[str, Any]]:
+    """
+    Aggregation pipeline returning the blocks matching :block_query_dict:, each with
+    its spans grouped under "spans" and the id(s) of its head span under
+    "head_span_ids", in a single round trip. Blocks and spans are sorted by :seq:.
+    """
+    return [
+        {"$match": block_query_dict},
+        {"$sort": {"seq": 1}},
+        *get_span_storage().get_spans_pipeline()
+    ]
+
+
+async def async_get_item_blocks_with_spans_db(
+    item_id: PydanticObjectId,
+    start_page: NonNegativeInt | None = None,
+    end_page: PositiveInt | None = None
+) -> list[BlockWithSpans]:
+    block_query_dict = get_page_range_block_query_dict(
+        item_id,
+        start_page=start_page,
+        end_page=end_page
+    )
+    return await Block.aggregate(
+        get_blocks_with_spans_pipeline(block_query_dict),
+        projection_model=BlockWithSpans
+    ).to_list()
+
+
+def get_item_blocks_with_spans_db(
+    item_id: PydanticObjectId,
+    block_ids: list[PydanticObjectId] | None = None
+) -> list[BlockWithSpans]:
+    block_query_dict: dict[str, Any] = {"item_id": item_id}
+    if block_ids is not None:
+        block_query_dict["_id"] = {"$in": block_ids}
+
+    return BunnetBlock.aggregate(
+        get_blocks_with_spans_pipeline(block_query_dict),
+        projection_model=BlockWithSpans
+    ).to_list()
+
+
+def get_head_block_id_from_blocks(blocks: list[BlockWithSpans]) -> PydanticObjectId:
+    """
+    Get the id of the first block of a contiguous range of blocks, i.e., of the only
+    block in :blocks: which is not pointed to by any other block in :blocks:.
+    """
+    next_ids = {block.next_id for block in blocks}
+    head_block_ids = [block.id for block in blocks if block.id not in next_ids]
+    if len(head_block_ids) != 1:
+        raise LoggerOSError(
+            logger,
+            f"Expected one head block in block range but found :{len(head_block_ids)}:."
+        )
+
+    return head_block_ids[0]
+
+
 async def async_get_item_head_block_id(
     item_id: PydanticObjectId,
     start_page: NonNegativeInt | None = None,
@@ -172,11 +357,14 @@ async def async_get_item_head_block_id(
     )
     block_query = await Block.find(
         block_query_dict
-    ).sort("+page_nb").limit(1).project(PageNumber).to_list()
+    ).sort("+page_nb", "+seq").limit(1).project(BlockOrder).to_list()
 
     if not block_query or len(block_query) == 0:
         return None  # No block found after :start_page:
 
+    if block_query[0].seq is not None:
+        return block_query[0].id  # first block after :start_page: in :seq: order
+
     first_block_page_from_start = block_query[0].page_nb
     # Construct linked list to find first block in page :first_block_page_from_start:
     # fetch blocks from page 0 to page :first_block_page_from_start: (inclusive)
@@ -185,7 +373,7 @@ async def async_get_item_head_block_id(
         "page_nb": {"$lte": first_block_page_from_start}
     }).project(BaseBlock).to_list()
 
-    block_dict = ShallowBlockDict.initialize(first_blocks)
+    block_dict = BlockGraph(first_blocks)
     cur_block_id: PydanticObjectId | None = head_block_id
     while (cur_block_id is not None):
         cur_block = block_dict.get_block(cur_block_id)
@@ -334,6 +522,390 @@ def update_block(
     if update_query.matched_count < 1:
         raise LoggerOSError(logger, f"Block :{block_id}: not found.")
 
+    increment_item_version_db(item_id)
+
+
+async def async_replace_item_block_db_s3(
+    user_id: PydanticObjectId,
+    item_id: PydanticObjectId,
+    old_block_db: Block,
+    block_in: BlockIn
+) -> Block:
+    """
+    Replace block spans and attributes, keeping its id and position in the list.
+    The block audio is deleted from s3.
+    """
+    spans = get_spans_from_block_in(item_id, old_block_db.id, block_in)
+    # Can raise HTTP_502_BAD_GATEWAY
+    await get_span_storage().async_replace_block_spans(old_block_db.id, spans)
+
+    await async_delete_item_block_audio_s3(user_id, item_id, old_block_db.id)
+    await old_block_db.set({
+        "size_class": block_in.size_class,
+        "audio_status": None,
+        "audio_path": None
+    })
+    await async_increment_item_version_db(item_id)
+
+    return old_block_db
+
+
+######
+# ADD
+def get_spans_from_block_in(
+    item_id: PydanticObjectId,
+    block_id: PydanticObjectId,
+    block_in: BlockIn
+) -> list[Span]:
+    if not block_in.spans:
+        raise BadRequestHTTPException("Block should have at least one span.")
+
+    span_ids = [PydanticObjectId() for _ in block_in.spans]
+    num_spans = len(span_ids)
+    spans: list[Span] = []
+    for j, span_in in enumerate(block_in.spans):
+        span_fields: dict[str, Any] = (
+            {"type_": SpanType.PAUSE, "pause": span_in.pause}
+            if isinstance(span_in, PauseSpanIn)
+            else {"text": span_in.text, "read": span_in.read}
+        )
+        spans.append(
+            Span(
+                id=span_ids[j],
+                block_id=block_id,
+                item_id=item_id,
+                next_id=(None if j >= (num_spans - 1) else span_ids[j + 1]),
+                is_head=(True if j == 0 else None),  # None is equivalent to False
+                seq=get_seq(j),
+                **span_fields
+            )
+        )
+
+    return spans
+
+
+async def async_get_item_block_order_db(
+    item_id: PydanticObjectId,
+    block_id: PydanticObjectId | None = None,
+    is_head: bool = False
+) -> BlockOrder | None:
+    """Get order info of block :block_id: or, if :is_head:, of the item head block."""
+    block_query_dict: dict[str, Any] = {"item_id": item_id}
+    if is_head:
+        block_query_dict["is_head"] = True
+    else:
+        block_query_dict["_id"] = block_id
+
+    return await Block.find_one(block_query_dict).project(BlockOrder)
+
+
+async def async_get_item_block_id_range_db(
+    item_id: PydanticObjectId,
+    start_id: PydanticObjectId | None = None,
+    end_id: PydanticObjectId | None = None
+) -> list[PydanticObjectId]:
+    """
+    Ids of the item blocks from :start_id: (default: head block) to :end_id:
+    (inclusive; default: last block), in list order. Only order info projections
+    (no spans) of the blocks in the range are read: by :seq: range if the range ends
+    have an order key, else by page range, following the :next_id: pointers.
+    """
+    start_block = await async_get_item_block_order_db(
+        item_id, block_id=start_id, is_head=(start_id is None)
+    )
+    if not start_block:
+        raise NotFoundHTTPException(
+            f"Block :{start_id}: not found." if start_id
+            else f"No head block found for item :{item_id}:."
+        )
+
+    end_block: BlockOrder | None = None
+    if end_id is not None:
+        end_block = await async_get_item_block_order_db(item_id, block_id=end_id)
+        if not end_block:
+            raise NotFoundHTTPException(f"Block :{end_id}: not found.")
+
+    if has_seq([start_block] + ([end_block] if end_block else [])):
+        seq_query_dict: dict[str, float] = {"$gte": cast(float, start_block.seq)}
+        if end_block:
+            if cast(float, end_block.seq) < cast(float, start_block.seq):
+                raise BadRequestHTTPException(
+                    f"Block :{end_id}: is before block :{start_block.id}:."
+                )
+            seq_query_dict["$lte"] = cast(float, end_block.seq)
+
+        id_models = await Block.find(
+            {"item_id": item_id, "seq": seq_query_dict}
+        ).sort("+seq").project(IdModel).to_list()
+
+        return [id_model.id for id_model in id_models]
+
+    if end_block and end_block.page_nb < start_block.page_nb:
+        raise BadRequestHTTPException(
+            f"Block :{end_id}: is before block :{start_block.id}:."
+        )
+    block_query_dict = get_page_range_block_query_dict(
+        item_id,
+        start_page=start_block.page_nb,
+        end_page=(end_block.page_nb + 1 if end_block else None)
+    )
+    blocks = await Block.find(block_query_dict).project(BlockOrder).to_list()
+    try:
+        return get_linked_list_range_ids(blocks, start_block.id, end_id=end_id)
+    except LoggerOSError as exc:
+        raise InternalServerErrorHTTPException(exc.msg)
+    except LoggerValueError as exc:
+        raise BadRequestHTTPException(exc.msg)
+
+
+async def async_add_item_block_db(
+    item_id: PydanticObjectId,
+    block_in: BlockIn,
+    prev_block_id: PydanticObjectId | None = None
+) -> Block:
+    """
+    Add block after block :prev_block_id:.
+    If :prev_block_id: is None, the block is added at the head of the list.
+    """
+    prev_block: BlockOrder | None = None
+    next_block: BlockOrder | None = None
+    if prev_block_id is not None:
+        prev_block = await async_get_item_block_order_db(item_id, prev_block_id)
+        if not prev_block:
+            raise NotFoundHTTPException(f"Block :{prev_block_id}: not found.")
+        if prev_block.next_id is not None:
+            next_block = await async_get_item_block_order_db(
+                item_id, prev_block.next_id
+            )
+    else:
+        next_block = await async_get_item_block_order_db(item_id, is_head=True)
+
+    # new block is in the same page as the previous block (or the next, if at head)
+    page_nb = (
+        prev_block.page_nb
+        if prev_block
+        else (next_block.page_nb if next_block else 0)
+    )
+    seq: float | None = None
+    if not ((prev_block and prev_block.seq is None) or
+            (next_block and next_block.seq is None)):
+        seq = get_seq_between(
+            (prev_block.seq if prev_block else None),
+            (next_block.seq if next_block else None)
+        )
+        if seq is None:  # no room left between neighbours
+            await async_set_item_blocks_seq_db(item_id)
+            assert prev_block is not None and next_block is not None
+            prev_block = await async_get_item_block_order_db(item_id, prev_block.id)
+            next_block = await async_get_item_block_order_db(item_id, next_block.id)
+            assert prev_block is not None and next_block is not None
+            seq = get_seq_between(prev_block.seq, next_block.seq)
+
+    block_id = PydanticObjectId()
+    block = Block(
+        id=block_id,
+        item_id=item_id,
+        next_id=(next_block.id if next_block else None),
+        page_nb=page_nb,
+        is_head=(True if prev_block is None else None),
+        size_class=block_in.size_class,
+        seq=seq,
+    )
+    block_db = await get_span_storage().async_insert_block(  # Can raise HTTP_502
+        block, get_spans_from_block_in(item_id, block_id, block_in)
+    )
+
+    # initially, prev_block -> next_block. Now, prev_block -> block -> next_block.
+    if prev_block is not None:
+        await Block.find_one(
+            {"_id": prev_block.id, "item_id": item_id}
+        ).update({"$set": {"next_id": block_id}})
+    elif next_block is not None:  # block is the new head block
+        await Block.find_one(
+            {"_id": next_block.id, "item_id": item_id}
+        ).update({"$set": {"is_head": None}})
+
+    await async_increment_item_version_db(item_id)
+
+    return block_db
+
+
+######
+# MOVE
+def get_move_block_updates(
+    block: BlockOrder,
+    old_prev_block: BlockOrder | None,
+    prev_block: BlockOrder | None,
+    next_block: BlockOrder | None,
+    seq: float | None
+) -> dict[PydanticObjectId, dict[str, Any]]:
+    """
+    Updates (by block id) moving :block: between :prev_block: and :next_block:.
+    None :prev_block: (:next_block:) means that the block is moved to the head (tail).
+    """
+    # initially, old_prev_block -> block -> old_next_block, prev_block -> next_block.
+    # Now, old_prev_block -> old_next_block, prev_block -> block -> next_block.
+    block_updates: dict[PydanticObjectId, dict[str, Any]] = {
+        block.id: {
+            "next_id": (next_block.id if next_block else None),
+            "is_head": (True if prev_block is None else None),
+            # same page as the previous block (or the next, if at head)
+            "page_nb": (
+                prev_block.page_nb
+                if prev_block
+                else (next_block.page_nb if next_block else block.page_nb)
+            ),
+            "seq": seq
+        }
+    }
+    if old_prev_block is not None:
+        block_updates[old_prev_block.id] = {"next_id": block.next_id}
+    elif block.next_id is not None:  # old next block is the new head block
+        block_updates[block.next_id] = {"is_head": True}
+    if prev_block is not None:
+        block_updates.setdefault(prev_block.id, {})["next_id"] = block.id
+    elif next_block is not None:  # block is the new head block
+        block_updates.setdefault(next_block.id, {})["is_head"] = None
+
+    return block_updates
+
+
+async def async_move_item_block_db(
+    item_id: PydanticObjectId,
+    block_id: PydanticObjectId,
+    prev_block_id: PydanticObjectId | None = None
+) -> bool:
+    """
+    Move block :block_id: after block :prev_block_id: (at the head if None).
+    Only the list pointers and the block order key and page are rewritten, in a
+    single bulk write; spans and audio are kept.
+    Returns False if block :block_id: is not found.
+    """
+    if prev_block_id == block_id:
+        raise BadRequestHTTPException(
+            f"Block :{block_id}: cannot be moved after itself."
+        )
+
+    # the block, its previous block, the new previous block and the head block
+    block_query_or: list[dict[str, Any]] = [
+        {"_id": {"$in": [id_ for id_ in (block_id, prev_block_id) if id_ is not None]}},
+        {"next_id": block_id},
+        {"is_head": True}
+    ]
+    blocks = await Block.find(
+        {"item_id": item_id, "$or": block_query_or}
+    ).project(BlockOrder).to_list()
+    block_dict = {block.id: block for block in blocks}
+    block = block_dict.get(block_id)
+    if not block:
+        return False
+    prev_block: BlockOrder | None = None
+    if prev_block_id is not None:
+        prev_block = block_dict.get(prev_block_id)
+        if not prev_block:
+            raise NotFoundHTTPException(f"Block :{prev_block_id}: not found.")
+    old_prev_block = next(
+        (block_ for block_ in blocks if block_.next_id == block_id), None
+    )
+    if (
+        (prev_block is None and block.is_head) or
+        (prev_block is not None and prev_block.next_id == block_id)
+    ):
+        return True  # already in place
+
+    head_block = next((block_ for block_ in blocks if block_.is_head), None)
+    next_block_id = (
+        prev_block.next_id if prev_block else (head_block.id if head_block else None)
+    )
+    next_block: BlockOrder | None = None
+    if next_block_id is not None:
+        next_block = (
+            block_dict.get(next_block_id) or
+            await async_get_item_block_order_db(item_id, next_block_id)
+        )
+
+    seq: float | None = None
+    if not ((prev_block and prev_block.seq is None) or
+            (next_block and next_block.seq is None)):
+        seq = get_seq_between(
+            (prev_block.seq if prev_block else None),
+            (next_block.seq if next_block else None)
+        )
+        if seq is None:  # no room left between neighbours
+            await async_set_item_blocks_seq_db(item_id)
+            assert prev_block is not None and next_block is not None
+            prev_block = await async_get_item_block_order_db(item_id, prev_block.id)
+            next_block = await async_get_item_block_order_db(item_id, next_block.id)
+            assert prev_block is not None and next_block is not None
+            seq = get_seq_between(prev_block.seq, next_block.seq)
+
+    block_updates = get_move_block_updates(
+        block, old_prev_block, prev_block, next_block, seq
+    )
+    async with async_transaction() as session:
+        await Block.get_motor_collection().bulk_write(
+            [
+                UpdateOne({"_id": id_, "item_id": item_id}, {"$set": update_dict})
+                for id_, update_dict in block_updates.items()
+            ],
+            ordered=False,
+            session=session
+        )
+        await Item.get_motor_collection().update_one(
+            {"_id": item_id}, {"$inc": {"version": 1}}, session=session
+        )
+
+    return True
+
+
+######
+# Order keys
+async def async_set_item_blocks_seq_db(item_id: PydanticObjectId) -> None:
+    """Renumber the :seq: of all item blocks, following the linked list."""
+    blocks = await Block.find({"item_id": item_id}).project(BlockOrder).to_list()
+    head_block_ids = [block.id for block in blocks if block.is_head]
+    if len(head_block_ids) != 1:
+        raise InternalServerErrorHTTPException(
+            f"Found :{len(head_block_ids)}: head blocks for item :{item_id}:."
+        )
+    try:
+        block_ids = get_linked_list_ids(blocks, head_block_ids[0])
+    except (LoggerOSError, LoggerValueError) as exc:
+        raise InternalServerErrorHTTPException(exc.msg)
+
+    await Block.get_motor_collection().bulk_write(
+        get_seq_update_ops(block_ids), ordered=False
+    )
+
+
+def set_item_seq_db(item_id: PydanticObjectId) -> None:
+    """
+    Set the :seq: of all item blocks and spans, following the linked lists.
+    Used to backfill order keys of items created before :seq: was introduced.
+    """
+    blocks = get_item_blocks_with_spans_db(item_id)
+    if not blocks:
+        return
+
+    block_ids = get_linked_list_ids(blocks, get_head_block_id_from_blocks(blocks))
+    span_ops: list[UpdateOne] = []
+    for block in blocks:
+        if len(block.head_span_ids) != 1:
+            raise LoggerOSError(
+                logger,
+                f"Found :{len(block.head_span_ids)}: head spans in block :{block.id}:."
+            )
+        if has_seq(block.spans):
+            continue  # e.g., embedded spans (see crud/spans.py)
+        span_ids = get_linked_list_ids(block.spans, block.head_span_ids[0])
+        span_ops.extend(get_seq_update_ops(span_ids))
+
+    BunnetBlock.get_motor_collection().bulk_write(
+        get_seq_update_ops(block_ids), ordered=False
+    )
+    if span_ops:
+        BunnetSpan.get_motor_collection().bulk_write(span_ops, ordered=False)
+
 
 #######
 # Batch
@@ -342,15 +914,14 @@ def construct_block_dict(
     blocks: list[BaseBlock],
     head_spans: list[SpanIdBlockId],
     spans: list[BaseSpan]
-) -> BlockDict:
+) -> BlockGraph:
     if len(head_spans) != len(blocks):
         # Check that there is one head span per block
         raise LoggerOSError(
             logger, "The Number of head spans does not match the number of blocks."
         )
 
-    # {block_id: {"block": block, "head_span_id": span_id, "spans": {span_id: Span}}
-    block_dict = BlockDict.initialize(blocks)
+    block_dict = BlockGraph(blocks)
     for head_span in head_spans:  # save head span id for each block
         block_dict.add_head_span(head_span)
 
@@ -360,6 +931,24 @@ def construct_block_dict(
     return block_dict
 
 
+def construct_block_dict_from_blocks_with_spans(
+    blocks: list[BlockWithSpans]
+) -> BlockGraph:
+    block_dict = BlockGraph(blocks)
+    for block in blocks:
+        if len(block.head_span_ids) != 1:
+            # Check that there is one head span per block
+            raise LoggerOSError(
+                logger,
+                f"Found :{len(block.head_span_ids)}: head spans in block :{block.id}:."
+            )
+        block_dict.set_head_span_id(block.id, block.head_span_ids[0])
+        for span in block.spans:  # save blocks spans
+            block_dict.add_span(span)
+
+    return block_dict
+
+
 def get_item_base_block_batch_db(
     item_id: PydanticObjectId,
     block_ids: list[PydanticObjectId]
@@ -381,25 +970,19 @@ def get_item_base_block_batch_db(
 def get_item_block_batch_dict(
     item_id: PydanticObjectId,
     block_ids: list[PydanticObjectId]
-) -> BlockDict:
-    # get batch blocks
-    blocks = get_item_base_block_batch_db(item_id, block_ids)
-
-    # get all block head spans (_id and block_id)
-    head_spans = BunnetSpan.find({
-        "block_id": {"$in": block_ids},
-        "is_head": True
-    }).project(SpanIdBlockId).to_list()
-
-    # get all block spans
-    spans = BunnetSpan.find(
-        {"block_id": {"$in": block_ids}}
-    ).project(BaseSpan).to_list()
+) -> BlockGraph:
+    # get batch blocks with their spans
+    blocks = get_item_blocks_with_spans_db(item_id, block_ids=block_ids)
+    if len(blocks) < len(block_ids):
+        block_ids_db = {block.id for block in blocks}
+        for block_id in block_ids:
+            if block_id not in block_ids_db:
+                raise LoggerOSError(logger, f"no block :{block_id}: found.")
 
-    return construct_block_dict(blocks, head_spans, spans)
+    return construct_block_dict_from_blocks_with_spans(blocks)
 
 
-def get_cur_block(block_dict: BlockDict, cur_block_id: PydanticObjectId) -> BaseBlock:
+def get_cur_block(block_dict: BlockGraph, cur_block_id: PydanticObjectId) -> BaseBlock:
     """Get current block from id and block_dict"""
     try:
         cur_block = block_dict.get_block(cur_block_id)
@@ -414,7 +997,7 @@ def get_cur_block(block_dict: BlockDict, cur_block_id: PydanticObjectId) -> Base
 def append_cur_block_to_blocks(
     cur_block: BaseBlock,
     blocks: list[BlockOut],
-    block_dict: BlockDict,
+    block_dict: BlockGraph,
 ) -> None:
     """
     Returns:
@@ -436,34 +1019,104 @@ def append_cur_block_to_blocks(
     blocks.append(BlockOut.construct_from_block(cur_block, block_spans))
 
 
-async def async_get_item_block_batch_read_block_ids(
+def get_read_block_query_dict(
     item_id: PydanticObjectId,
     block_ids: list[PydanticObjectId] | None = None,
     only_missing: bool = False
-) -> list[PydanticObjectId]:
+) -> dict[str, Any]:
     """
-    Args:
-        :block_ids: If not given, get all item read block ids
+    Query of the read blocks of item :item_id: (among :block_ids:, if given), without
+    completed audio if :only_missing:.
     """
     block_query_dict: dict[str, Any] = {
         "item_id": item_id,
         "read": {"$ne": False}
     }
     if block_ids is not None:
-        if not block_ids:
-            return []
         block_query_dict["_id"] = {"$in": block_ids}
 
     if only_missing:
         block_query_dict["audio_status"] = {"$ne": AudioStatus.COMPLETED}
 
+    return block_query_dict
+
+
+async def async_get_item_block_batch_read_block_ids(
+    item_id: PydanticObjectId,
+    block_ids: list[PydanticObjectId] | None = None,
+    only_missing: bool = False
+) -> list[PydanticObjectId]:
+    """
+    Args:
+        :block_ids: If not given, get all item read block ids
+    """
+    if block_ids is not None and not block_ids:
+        return []
+
     read_blocks_id_models = await Block.find(
-        block_query_dict
+        get_read_block_query_dict(item_id, block_ids, only_missing)
     ).project(IdModel).to_list()
 
     return [id_model.id for id_model in read_blocks_id_models]
 
 
+async def async_request_item_block_batch_audio_db_s3(
+    user_id: PydanticObjectId,
+    item_id: PydanticObjectId,
+    block_ids: list[PydanticObjectId] | None = None,
+    only_missing: bool = False
+) -> list[PydanticObjectId]:
+    """
+    Set the audio of the read blocks of item :item_id: (see
+    get_read_block_query_dict()) in progress, and return their ids. The blocks are
+    selected and updated in a single update_many, so that blocks changed between a
+    read and a write are never updated.
+    update_many does not return the updated ids, so the blocks are tagged with two
+    temporary fields, not part of the :Block: model:
+      - :audio_request_id:, the id of this request, by which the updated blocks are
+        then read. Concurrent requests re-tag blocks, so that each block is returned
+        by one request only;
+      - :prev_audio_path:, the audio path before the first pending request, kept if
+        the block is re-tagged, whose audio is deleted from s3.
+    Both fields are removed once the audios are deleted.
+    """
+    if block_ids is not None and not block_ids:
+        return []
+
+    request_id = PydanticObjectId()
+    block_collection = Block.get_motor_collection()
+    await block_collection.update_many(
+        get_read_block_query_dict(item_id, block_ids, only_missing),
+        [{
+            "$set": {
+                "audio_request_id": request_id,
+                "prev_audio_path": {"$ifNull": ["$audio_path", "$prev_audio_path"]},
+                "audio_status": AudioStatus.IN_PROGRESS,
+                "audio_path": None
+            }
+        }]
+    )
+    request_query_dict = {"audio_request_id": request_id, "item_id": item_id}
+    requested_blocks = [
+        block
+        async for block in block_collection.find(
+            request_query_dict, {"_id": 1, "prev_audio_path": 1}
+        )
+    ]
+    await asyncio.gather(*(
+        async_delete_item_block_audio_s3(user_id, item_id, block["_id"])
+        for block in requested_blocks
+        if block.get("prev_audio_path") is not None
+    ))
+    if requested_blocks:  # blocks re-tagged since are cleared by their request
+        await block_collection.update_many(
+            request_query_dict,
+            {"$unset": {"audio_request_id": "", "prev_audio_path": ""}}
+        )
+
+    return [block["_id"] for block in requested_blocks]
+
+
 ########
 # DELETE
 async def async_simple_delete_block_db(block_db: Block) -> bool:
@@ -471,7 +1124,7 @@ async def async_simple_delete_block_db(block_db: Block) -> bool:
     Delete operation on single block; pointers of linked list are not updated.
     S3 objs are not deleted (see delete_item_block_db_s3() for that).
     """
-    await Span.find({"block_id": block_db.id}).delete()  # delete spans
+    await get_span_storage().async_delete_spans([block_db.id])  # delete spans
     delete_result = await block_db.delete()  # delete block
     if (delete_result is None or delete_result.deleted_count == 0):
         return False
@@ -479,6 +1132,39 @@ async def async_simple_delete_block_db(block_db: Block) -> bool:
     return True
 
 
+async def async_delete_item_blocks_db(
+    item_id: PydanticObjectId,
+    on_progress: Callable[[Collections, int], Awaitable[None]] | None = None
+) -> None:
+    """
+    Delete all item spans and blocks in bounded batches, without reading their ids
+    for the whole item. :on_progress: is awaited after each batch with the collection
+    and its number of deleted documents so far.
+    S3 objs are not deleted (see async_delete_user_item_db_s3() for that).
+    """
+    span_storage = get_span_storage()
+    num_deleted = {Collections.SPANS: 0, Collections.BLOCKS: 0}
+
+    async def async_report_progress(collection: Collections, batch_size: int) -> None:
+        num_deleted[collection] += batch_size
+        logger.info(
+            f"Item :{item_id}:: deleted :{num_deleted[collection]}: {collection.value}."
+        )
+        if on_progress is not None:
+            await on_progress(collection, num_deleted[collection])
+
+    async for batch_size in span_storage.async_delete_item_spans(item_id):
+        await async_report_progress(Collections.SPANS, batch_size)
+
+    # spans created before :item_id: was set on spans are deleted with their blocks
+    async for batch_size in async_delete_in_batches(
+        Block.get_motor_collection(),
+        {"item_id": item_id},
+        before_delete=span_storage.async_delete_spans
+    ):
+        await async_report_progress(Collections.BLOCKS, batch_size)
+
+
 async def async_delete_item_block_audio_s3(
     user_id: PydanticObjectId,
     item_id: PydanticObjectId,
@@ -501,12 +1187,264 @@ async def async_delete_item_block_db_s3(
         return False
 
     # initially, prev_block -> block -> next_block. Now, prev_block -> next_block.
-    await Block.find_one(
-        {"next_id": block_id, "item_id": item_id}
-    ).update({"$set": {"next_id": block_db.next_id}})
+    # Order keys (:seq:) of the remaining blocks stay valid.
+    if block_db.is_head:
+        if block_db.next_id is not None:  # next block is the new head block
+            await Block.find_one(
+                {"_id": block_db.next_id, "item_id": item_id}
+            ).update({"$set": {"is_head": True}})
+    else:
+        await Block.find_one(
+            {"next_id": block_id, "item_id": item_id}
+        ).update({"$set": {"next_id": block_db.next_id}})
 
     await async_delete_item_block_audio_s3(user_id, item_id, block_id)
     if not await async_simple_delete_block_db(block_db):
         return False
 
+    await async_increment_item_version_db(item_id)
+
     return True
+
+
+############
+# Batch edit
+def get_block_index(
+    block_ids: list[PydanticObjectId],
+    block_id: PydanticObjectId
+) -> int:
+    try:
+        return block_ids.index(block_id)
+    except ValueError as exc:
+        raise NotFoundHTTPException(f"Block :{block_id}: not found.") from exc
+
+
+def get_insert_index(
+    block_ids: list[PydanticObjectId],
+    prev_block_id: PydanticObjectId | None
+) -> int:
+    """Index of a block inserted after :prev_block_id: (at the head if None)."""
+    if prev_block_id is None:
+        return 0
+
+    return get_block_index(block_ids, prev_block_id) + 1
+
+
+def apply_block_edits(
+    block_ids: list[PydanticObjectId],
+    edits: list[BlockEdit]
+) -> tuple[
+    list[PydanticObjectId],
+    dict[PydanticObjectId, BlockIn],
+    dict[PydanticObjectId, BlockIn],
+    set[PydanticObjectId]
+]:
+    """
+    Apply :edits: in order to the ordered :block_ids: of an item, in memory.
+    Returns the edited order of block ids, the inserted and the replaced blocks by id,
+    and the ids of the moved blocks. Deleted blocks are the ones missing from the order.
+    """
+    edited_block_ids = list(block_ids)
+    inserted_blocks: dict[PydanticObjectId, BlockIn] = {}
+    replaced_blocks: dict[PydanticObjectId, BlockIn] = {}
+    moved_block_ids: set[PydanticObjectId] = set()
+    for edit in edits:  # edit fields are checked by the :BlockEdit: validator
+        if edit.op == BlockEditOp.INSERT:
+            assert edit.blocks is not None
+            idx = get_insert_index(edited_block_ids, edit.prev_block_id)
+            new_block_ids = [PydanticObjectId() for _ in edit.blocks]
+            edited_block_ids[idx:idx] = new_block_ids
+            inserted_blocks.update(zip(new_block_ids, edit.blocks))
+            continue
+
+        assert edit.block_id is not None
+        idx = get_block_index(edited_block_ids, edit.block_id)
+        if edit.op == BlockEditOp.REPLACE:
+            assert edit.block is not None
+            if edit.block_id in inserted_blocks:  # inserted by a previous edit
+                inserted_blocks[edit.block_id] = edit.block
+            else:
+                replaced_blocks[edit.block_id] = edit.block
+        elif edit.op == BlockEditOp.DELETE:
+            del edited_block_ids[idx]
+            inserted_blocks.pop(edit.block_id, None)
+            replaced_blocks.pop(edit.block_id, None)
+            moved_block_ids.discard(edit.block_id)
+        elif edit.op == BlockEditOp.MOVE:
+            if edit.prev_block_id == edit.block_id:
+                raise BadRequestHTTPException(
+                    f"Block :{edit.block_id}: cannot be moved after itself."
+                )
+            del edited_block_ids[idx]
+            edited_block_ids.insert(
+                get_insert_index(edited_block_ids, edit.prev_block_id), edit.block_id
+            )
+            moved_block_ids.add(edit.block_id)
+
+    return edited_block_ids, inserted_blocks, replaced_blocks, moved_block_ids
+
+
+def get_edited_block_orders(
+    blocks: list[BlockOrderRead],
+    block_ids: list[PydanticObjectId],
+    moved_block_ids: set[PydanticObjectId]
+) -> list[BlockOrder]:
+    """
+    Order fields of the blocks :block_ids:, the edited order of :blocks:.
+    Blocks that kept their position keep their :seq:, and inserted or moved blocks
+    get keys spread between them. If there is no room left (or if :blocks: have no
+    :seq:), all blocks are renumbered. Inserted or moved blocks are in the same page
+    as the previous block (or the next, if at head).
+    """
+    block_dict = {block.id: block for block in blocks}
+    kept_blocks = [  # None for inserted or moved blocks
+        (block_dict.get(block_id) if block_id not in moved_block_ids else None)
+        for block_id in block_ids
+    ]
+    seqs: list[float] | None = None
+    if has_seq(blocks):
+        seqs = fill_seqs([(block.seq if block else None) for block in kept_blocks])
+    if seqs is None:
+        seqs = [get_seq(idx) for idx in range(len(block_ids))]
+
+    page_nbs = [(block.page_nb if block else None) for block in kept_blocks]
+    head_page_nb = next((page_nb for page_nb in page_nbs if page_nb is not None), 0)
+    for idx, page_nb in enumerate(page_nbs):
+        if page_nb is None:
+            page_nbs[idx] = page_nbs[idx - 1] if idx > 0 else head_page_nb
+
+    num_blocks = len(block_ids)
+    return [
+        BlockOrder.construct(
+            id=block_id,
+            next_id=(block_ids[idx + 1] if idx < num_blocks - 1 else None),
+            is_head=(True if idx == 0 else None),  # None is equivalent to False
+            page_nb=page_nbs[idx],
+            seq=seqs[idx]
+        )
+        for idx, block_id in enumerate(block_ids)
+    ]
+
+
+async def async_get_item_block_orders_db(
+    item_id: PydanticObjectId
+) -> list[BlockOrderRead]:
+    """Order info of all item blocks, in list order."""
+    blocks = await Block.find(
+        {"item_id": item_id}
+    ).sort("+seq").project(BlockOrderRead).to_list()
+    if not blocks:
+        return blocks
+
+    try:
+        if has_seq(blocks):
+            if VarConfig.CHECK_LINKED_LIST:
+                check_linked_list(blocks)
+            return blocks
+
+        head_block_ids = [block.id for block in blocks if block.is_head]
+        if len(head_block_ids) != 1:
+            raise LoggerOSError(
+                logger,
+                f"Found :{len(head_block_ids)}: head blocks for item :{item_id}:."
+            )
+        block_dict = {block.id: block for block in blocks}
+        return [
+            block_dict[block_id]
+            for block_id in get_linked_list_ids(blocks, head_block_ids[0])
+        ]
+    except (LoggerOSError, LoggerValueError) as exc:
+        raise InternalServerErrorHTTPException(exc.msg)
+
+
+async def async_edit_item_blocks_db_s3(
+    user_id: PydanticObjectId,
+    item_id: PydanticObjectId,
+    edits: list[BlockEdit]
+) -> list[PydanticObjectId]:
+    """
+    Apply block :edits: (see apply_block_edits()). The linked list rewiring is done in
+    memory and written with one bulk write, in a single transaction (if supported).
+    The audio of replaced and deleted blocks is deleted from s3.
+    Returns the ids of the inserted blocks.
+    """
+    blocks = await async_get_item_block_orders_db(item_id)
+    # Can raise HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
+    block_ids, inserted_blocks, replaced_blocks, moved_block_ids = apply_block_edits(
+        [block.id for block in blocks], edits
+    )
+    block_dict = {block.id: block for block in blocks}
+    for block_id in replaced_blocks:
+        if block_dict[block_id].read is False:
+            raise BadRequestHTTPException(
+                f"block :{block_id}: has :read:=False. "
+                "Set :read:=True before modifying."
+            )
+    edited_block_ids = set(block_ids)
+    deleted_block_ids = [
+        block.id for block in blocks if block.id not in edited_block_ids
+    ]
+
+    span_storage = get_span_storage()
+    block_spans: dict[PydanticObjectId, list[Span]] = {  # Can raise HTTP_400
+        block_id: get_spans_from_block_in(item_id, block_id, block_in)
+        for block_id, block_in in {**inserted_blocks, **replaced_blocks}.items()
+    }
+    block_ops: list[InsertOne | UpdateOne | DeleteMany] = []
+    for block_order in get_edited_block_orders(blocks, block_ids, moved_block_ids):
+        block_id = block_order.id
+        if block_id in inserted_blocks:
+            block = Block(
+                **block_order.dict(),
+                item_id=item_id,
+                size_class=inserted_blocks[block_id].size_class
+            )
+            block_ops.append(InsertOne({
+                **get_dict(block, to_db=True),
+                **span_storage.get_block_spans_fields(block_spans[block_id])
+            }))
+            continue
+
+        old_block_order = block_dict[block_id]
+        update_dict: dict[str, Any] = {
+            field: getattr(block_order, field)
+            for field in BlockOrder.__fields__
+            if getattr(block_order, field) != getattr(old_block_order, field)
+        }
+        if block_id in replaced_blocks:
+            update_dict.update({
+                "size_class": replaced_blocks[block_id].size_class,
+                "audio_status": None,
+                "audio_path": None,
+                **span_storage.get_block_spans_fields(block_spans[block_id])
+            })
+        if update_dict:
+            block_ops.append(
+                UpdateOne({"_id": block_id, "item_id": item_id}, {"$set": update_dict})
+            )
+    if deleted_block_ids:
+        block_ops.append(
+            DeleteMany({"_id": {"$in": deleted_block_ids}, "item_id": item_id})
+        )
+
+    async with async_transaction() as session:
+        # Can raise HTTP_502_BAD_GATEWAY
+        await span_storage.async_write_spans(
+            [*replaced_blocks, *deleted_block_ids],
+            [span for spans in block_spans.values() for span in spans],
+            session=session
+        )
+        if block_ops:
+            await Block.get_motor_collection().bulk_write(
+                block_ops, ordered=False, session=session
+            )
+        await Item.get_motor_collection().update_one(
+            {"_id": item_id}, {"$inc": {"version": 1}}, session=session
+        )
+
+    await asyncio.gather(*(
+        async_delete_item_block_audio_s3(user_id, item_id, block_id)
+        for block_id in [*replaced_blocks, *deleted_block_ids]
+    ))
+
+    return list(inserted_blocks)
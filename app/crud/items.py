@@ -1,27 +1,36 @@
-from typing import Any
+import asyncio
+from typing import Any, AsyncIterator, Iterator
 
 from beanie.odm.fields import PydanticObjectId
 from fastapi import UploadFile
-from pydantic import NonNegativeInt, PositiveInt
+from pydantic import BaseModel, NonNegativeInt, PositiveInt
 
 from app.config.logging import LoggerOSError, LoggerValueError, get_logger
 from app.config.settings import get_settings
+from app.config.variables import Blocks as VarConfig
 from app.crud.blocks import (
-    append_cur_block_to_blocks, async_get_item_block_page_nb,
-    async_get_item_head_block_id, async_list_item_block_ids_db, construct_block_dict,
-    get_cur_block, get_item_head_block_id, get_page_range_block_query_dict,
+    append_cur_block_to_blocks, async_delete_item_blocks_db,
+    async_get_item_blocks_with_spans_db, check_linked_list,
+    construct_block_dict_from_blocks_with_spans, get_block_out_from_block_with_spans,
+    get_blocks_with_spans_pipeline, get_cur_block, get_head_block_id_from_blocks,
+    get_item_blocks_with_spans_db, get_page_range_block_query_dict, has_seq,
 )
-from app.models.base import IdModel
-from app.models.blocks import BaseBlock, Block, BlockDict, BlockOut, BunnetBlock
+from app.crud.raw import async_get_item_blocks_out_raw
+from app.models.blocks import Block, BlockGraph, BlockOut, BlockWithSpans
 from app.models.fields import DocStatus
-from app.models.items import BasicItem, BunnetItem, Item, ItemIdDocStatus, ItemIn
-from app.models.spans import BaseSpan, BunnetSpan, Span, SpanIdBlockId
+from app.models.items import (
+    BaseItemOut, BasicItem, BunnetItem, Item, ItemIdDocStatus, ItemIn,
+)
 from app.routers.http_exceptions import (
     BadGatewayHTTPException, BadRequestHTTPException, InternalServerErrorHTTPException,
     NotFoundHTTPException,
 )
 from app.utils.aws import async_delete_s3_item, get_default_cover_s3_key  # type: ignore
-from app.utils.items import read_file_contents, upload_file  # type: ignore
+from app.utils.cache import (
+    DocumentBlocks, get_document_cache, get_document_length_cache,
+)
+from app.utils.items import upload_fileobj
+from app.utils.serialization import dumps, dumps_model
 
 logger = get_logger(__name__)
 
@@ -51,7 +60,7 @@ def check_status(item: Item | ItemIdDocStatus) -> None:
 async def async_get_user_id_model_item_db(
     user_id: PydanticObjectId,
     item_id: PydanticObjectId
-) -> IdModel | None:
+) -> ItemIdDocStatus | None:
     item = await Item.find_one(
         {"_id": item_id, "owner_id": user_id}
     ).project(ItemIdDocStatus)
@@ -83,60 +92,34 @@ async def async_get_item_block_dict(
     item_id: PydanticObjectId,
     start_page: NonNegativeInt | None = None,
     end_page: PositiveInt | None = None
-) -> BlockDict:
+) -> BlockGraph:
     """Get dictionary with blocks, head_span_id, and spans."""
-    block_query_dict = get_page_range_block_query_dict(
+    # get all blocks in page range with their spans (single aggregation)
+    blocks = await async_get_item_blocks_with_spans_db(
         item_id,
         start_page=start_page,
         end_page=end_page
     )
-    blocks = await Block.find(block_query_dict).project(BaseBlock).to_list()
-
-    # get all block head spans (_id and block_id)
-    block_ids = [block.id for block in blocks]
-    head_spans = await Span.find({
-        "block_id": {"$in": block_ids},
-        "is_head": True
-    }).project(SpanIdBlockId).to_list()
-
-    # get all item spans
-    spans = await Span.find(
-        {"block_id": {"$in": block_ids}}
-    ).project(BaseSpan).to_list()
-
     try:
-        block_dict = construct_block_dict(blocks, head_spans, spans)
+        block_dict = construct_block_dict_from_blocks_with_spans(blocks)
     except (LoggerOSError, LoggerValueError) as exc:
         raise NotFoundHTTPException(exc.msg)
 
     return block_dict
 
 
-def get_item_block_dict(item_id: PydanticObjectId) -> BlockDict:
+def get_item_block_dict(item_id: PydanticObjectId) -> BlockGraph:
     """Get dictionary with blocks, head_span_id, and spans."""
-    # get all item blocks
-    blocks = BunnetBlock.find({"item_id": item_id}).project(BaseBlock).to_list()
-
-    # get all block head spans (_id and block_id)
-    block_ids = [block.id for block in blocks]
-    head_spans = BunnetSpan.find({
-        "block_id": {"$in": block_ids},
-        "is_head": True
-    }).project(SpanIdBlockId).to_list()
-
-    # get all item spans
-    spans = BunnetSpan.find(
-        {"block_id": {"$in": block_ids}}
-    ).project(BaseSpan).to_list()
-
-    return construct_block_dict(blocks, head_spans, spans)
+    # get all item blocks with their spans (single aggregation)
+    blocks = get_item_blocks_with_spans_db(item_id)
+    return construct_block_dict_from_blocks_with_spans(blocks)
 ###
 
 
 ###
 # Blocks linked list construction
 def aux_get_item_block_ids(
-    block_dict: BlockDict,
+    block_dict: BlockGraph,
     head_block_id: PydanticObjectId,
     end_id: PydanticObjectId | None = None
 ) -> list[PydanticObjectId]:
@@ -168,7 +151,7 @@ def aux_get_item_block_ids(
 
 
 def aux_get_item_blocks_out(
-    block_dict: BlockDict,
+    block_dict: BlockGraph,
     head_block_id: PydanticObjectId,
     end_page: PositiveInt | None = None
 ) -> list[BlockOut]:
@@ -191,96 +174,189 @@ def aux_get_item_blocks_out(
     return blocks
 
 
-###
-# Construct block linked lists
-async def async_get_block_batch_ids_from_block_id_range(
-    item_id: PydanticObjectId,
-    start_id: PydanticObjectId | None = None,
-    end_id: PydanticObjectId | None = None,
-) -> list[PydanticObjectId]:
-    """Construct list of block ids from linked list range."""
+def aux_get_item_blocks_out_from_blocks_with_spans(
+    blocks: list[BlockWithSpans],
     end_page: PositiveInt | None = None
-    if end_id is not None:
-        end_block_page = await async_get_item_block_page_nb(item_id, end_id)
-        if not end_block_page:
-            raise NotFoundHTTPException("End block :{end_id}: not found.")
-        end_page = end_block_page + 1  # end_page is excluded
-
-    start_page: NonNegativeInt | None = None
-    if start_id is not None:
-        start_block_page = await async_get_item_block_page_nb(item_id, start_id)
-        if not start_block_page:
-            raise NotFoundHTTPException("Start block :{start_id}: not found.")
-        start_page = start_block_page  # start page is included
-        head_block_id = start_id
-    else:
-        # Can raise NotFoundException, InternalServerError
-        aux_id = await async_get_item_head_block_id(
-            item_id,
-            start_page=None,
-            end_page=end_page
-        )
-        if aux_id is None:
-            return []  # if no blocks were found in :start_id:-:end_id: range
+) -> list[BlockOut]:
+    """
+    Auxiliary function to construct list[BlockOut] from a contiguous block range,
+    common to both sync and async. If all blocks have an order key, :blocks: are
+    expected to be sorted by :seq:. Otherwise, the block linked list is followed.
+    """
+    if not blocks:
+        return []  # if no blocks were found in :page_range:
+
+    if has_seq(blocks):
+        if VarConfig.CHECK_LINKED_LIST:
+            check_linked_list(blocks)
+        return [get_block_out_from_block_with_spans(block) for block in blocks]
 
-        head_block_id = aux_id
+    # the first block in the range is the only one not pointed to by another
+    head_block_id = get_head_block_id_from_blocks(blocks)
+    block_dict = construct_block_dict_from_blocks_with_spans(blocks)
+    return aux_get_item_blocks_out(block_dict, head_block_id, end_page=end_page)
 
-    block_dict = await async_get_item_block_dict(  # Can raise NotFoundException
+
+async def async_get_item_blocks_out_db(
+    item_id: PydanticObjectId,
+    start_page: NonNegativeInt | None = None,
+    end_page: PositiveInt | None = None
+) -> list[BlockOut]:
+    """Construct list[BlockOut] for item."""
+    # get all blocks in page range with their spans (single aggregation)
+    blocks = await async_get_item_blocks_with_spans_db(
         item_id,
         start_page=start_page,
         end_page=end_page
     )
     try:
-        block_ids = aux_get_item_block_ids(
-            block_dict,
-            head_block_id,
-            end_id=end_id,
+        blocks_out = aux_get_item_blocks_out_from_blocks_with_spans(
+            blocks,
+            end_page=end_page
         )
     except (LoggerOSError, LoggerValueError) as exc:
         raise InternalServerErrorHTTPException(exc.msg)
 
-    return block_ids
+    return blocks_out
 
 
-async def async_get_item_blocks_out_db(
+def get_item_blocks_out_db(item_id: PydanticObjectId) -> list[BlockOut]:
+    blocks = get_item_blocks_with_spans_db(item_id)
+    return aux_get_item_blocks_out_from_blocks_with_spans(blocks)
+###
+
+
+###
+# Stream
+async def async_iter_item_blocks_out_db(
     item_id: PydanticObjectId,
     start_page: NonNegativeInt | None = None,
     end_page: PositiveInt | None = None
-) -> list[BlockOut]:
-    """Construct list[BlockOut] for item."""
-    # Can raise NotFoundException, InternalServerError
-    head_block_id = await async_get_item_head_block_id(
+) -> AsyncIterator[BlockOut]:
+    """
+    Yield item blocks as they are read from the aggregation cursor, sorted by :seq:.
+    Items without order keys fall back to following the block linked list.
+    """
+    block_query_dict = get_page_range_block_query_dict(
         item_id,
         start_page=start_page,
         end_page=end_page
     )
-    if head_block_id is None:
-        return []  # if no blocks were found in :page_range:
+    blocks_cursor = Block.aggregate(
+        get_blocks_with_spans_pipeline(block_query_dict),
+        projection_model=BlockWithSpans
+    )
+    prev_block: BlockWithSpans | None = None
+    legacy_blocks: list[BlockWithSpans] = []
+    try:
+        async for block in blocks_cursor:
+            if legacy_blocks or block.seq is None:
+                # blocks without :seq: are sorted first, so none of them has :seq:
+                legacy_blocks.append(block)
+                continue
+
+            if VarConfig.CHECK_LINKED_LIST and prev_block is not None:
+                check_linked_list([prev_block, block])
+            yield get_block_out_from_block_with_spans(block)
+            prev_block = block
+
+        for block_out in aux_get_item_blocks_out_from_blocks_with_spans(
+            legacy_blocks,
+            end_page=end_page
+        ):
+            yield block_out
+    except (LoggerOSError, LoggerValueError) as exc:
+        raise InternalServerErrorHTTPException(exc.msg)
 
-    # Can raise NotFoundException
-    block_dict = await async_get_item_block_dict(
-        item_id,
+
+def get_json_line(model: BaseModel) -> bytes:
+    return dumps_model(model) + b"\n"
+
+
+async def async_iter_item_document_ndjson(
+    item_db: Item,
+    start_page: NonNegativeInt | None = None,
+    end_page: PositiveInt | None = None
+) -> AsyncIterator[bytes]:
+    """
+    Stream item document as newline-delimited JSON: the :BaseItemOut: model in the
+    first line, followed by one :BlockOut: model per line. The total length is cached
+    for the item version (see get_document_length_cache()).
+    """
+    line = get_json_line(BaseItemOut.construct_from_item(item_db))
+    document_length = len(line)
+    yield line
+
+    async for block_out in async_iter_item_blocks_out_db(
+        item_db.id,
         start_page=start_page,
         end_page=end_page
+    ):
+        line = get_json_line(block_out)
+        document_length += len(line)
+        yield line
+
+    get_document_length_cache().set(
+        (item_db.id, item_db.version, start_page, end_page), document_length
     )
+###
+
+
+###
+# Cached documents
+async def async_get_item_document_blocks(item_db: Item) -> DocumentBlocks:
+    """
+    Get the serialized blocks of the whole item document from the document cache,
+    keyed on the item version. On a miss, they are read and cached.
+    """
+    document_cache = get_document_cache()
+    key = (item_db.id, item_db.version)
+    document_blocks = await document_cache.async_get(key)
+    if document_blocks is not None:
+        return document_blocks
+
     try:
-        blocks_out = aux_get_item_blocks_out(
-            block_dict,
-            head_block_id,
-            end_page=end_page,
-        )
+        raw_blocks = await async_get_item_blocks_out_raw(item_db.id)
+        if raw_blocks is not None:
+            raw_blocks_out, page_nbs = raw_blocks
+            document_blocks = DocumentBlocks(
+                [dumps(block_out) for block_out in raw_blocks_out], page_nbs
+            )
+        else:  # blocks without order keys: follow the block linked list
+            blocks = await async_get_item_blocks_with_spans_db(item_db.id)
+            blocks_out = aux_get_item_blocks_out_from_blocks_with_spans(blocks)
+            page_nb_dict = {block.id: block.page_nb for block in blocks}
+            document_blocks = DocumentBlocks(
+                [dumps_model(block_out) for block_out in blocks_out],
+                [page_nb_dict[block_out.id] for block_out in blocks_out]
+            )
     except (LoggerOSError, LoggerValueError) as exc:
         raise InternalServerErrorHTTPException(exc.msg)
 
-    return blocks_out
+    await document_cache.async_set(key, document_blocks)
 
+    return document_blocks
 
-def get_item_blocks_out_db(item_id: PydanticObjectId) -> list[BlockOut]:
-    block_dict = get_item_block_dict(item_id)
-    head_block_id = get_item_head_block_id(item_id)
-    blocks_out = aux_get_item_blocks_out(block_dict, head_block_id)
 
-    return blocks_out
+def get_item_out_bytes(item_db: Item, blocks: list[bytes]) -> bytes:
+    """Serialized :ItemOut: model, built from already serialized blocks."""
+    base_item_out_bytes = dumps_model(BaseItemOut.construct_from_item(item_db))
+    return b"".join((
+        base_item_out_bytes[:-1],  # strip closing brace
+        b',"blocks":[',
+        b",".join(blocks),
+        b"]}"
+    ))
+
+
+def iter_cached_item_document_ndjson(
+    item_db: Item,
+    blocks: list[bytes]
+) -> tuple[int, Iterator[bytes]]:
+    """Returns the full document length and the iterator of document lines."""
+    lines = [get_json_line(BaseItemOut.construct_from_item(item_db))]
+    lines.extend(block + b"\n" for block in blocks)
+    return sum(len(line) for line in lines), iter(lines)
 ###
 
 
@@ -294,12 +370,11 @@ async def async_delete_user_item_db_s3(
     if not item_db:
         return False
 
-    block_ids = await async_list_item_block_ids_db(item_db.id)  # find item block ids
-    await Span.find({"block_id": {"$in": block_ids}}).delete()  # delete all spans
-    await Block.find({"item_id": item_db.id}).delete()  # delete all blocks
-
-    if not get_settings().LOCAL:
-        await async_delete_s3_item(user_id, item_db.id)  # delete item in s3
+    # delete all spans and blocks in batches and, concurrently, the item in s3
+    await asyncio.gather(
+        async_delete_item_blocks_db(item_db.id),
+        *([] if get_settings().LOCAL else [async_delete_s3_item(user_id, item_db.id)])
+    )
 
     delete_result = await item_db.delete()  # delete item
     if (delete_result is None or delete_result.deleted_count == 0):
@@ -342,7 +417,7 @@ def update_item(
 
     update_query = BunnetItem.find_one(
         {"_id": item_id}
-    ).update({"$set": update_dict}).run()
+    ).update({"$set": update_dict, "$inc": {"version": 1}}).run()
 
     if update_query.matched_count < 1:
         raise LoggerOSError(logger, f"Item :{item_id}: not found.")
@@ -355,9 +430,9 @@ def upload_cover(
 ) -> None:
     update_item(item_id, {"status": DocStatus.COVER})
     if cover is not None:
+        filename = cover.filename or "cover"
         try:
-            filename, contents = read_file_contents(cover)
-            cover_path = upload_file(user_id, item_id, filename, contents)
+            cover_path = upload_fileobj(user_id, item_id, filename, cover.file)
         except Exception as exc:
             update_item(item_id, {"status": DocStatus.FAILED})
             raise LoggerOSError(
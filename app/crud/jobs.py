@@ -0,0 +1,243 @@
+"""
+Persistent job queue, stored in the jobs collection, so that heavy work (audio
+generation) runs in worker processes (see app/worker.py) and survives restarts:
+  - the API enqueues jobs (async_enqueue_job());
+  - workers claim jobs atomically (async_claim_job()), taking a lease that they
+    renew while the job runs (async_extend_job_lease()). Jobs of workers that died
+    are claimed again once their lease expires;
+  - failed jobs are retried with exponential backoff, up to :MAX_ATTEMPTS: runs;
+  - claims are fair between users: the oldest ready job of the user with fewest
+    running jobs is claimed first, and users run at most :MAX_RUNNING_PER_OWNER:
+    jobs at a time. The cap is best-effort: running jobs are counted before the
+    claim, so concurrent claims of different workers can exceed it.
+"""
+from datetime import datetime, timedelta
+from typing import Any
+
+from beanie.odm.fields import PydanticObjectId
+from pymongo import ReturnDocument
+
+from app.config.logging import get_logger
+from app.config.variables import Jobs as VarConfig
+from app.models.fields import JobStatus, JobType, datetime_func
+from app.models.jobs import Job
+
+logger = get_logger(__name__)
+
+
+async def async_enqueue_job(
+    owner_id: PydanticObjectId,
+    type_: JobType,
+    **args: Any
+) -> Job:
+    """Enqueue job :type_: of user :owner_id:. :args: should be BSON-encodable."""
+    job = Job(owner_id=owner_id, type_=type_, args=args)
+    await job.insert()
+
+    return job
+
+
+async def async_enqueue_block_batch_audio_job(
+    owner_id: PydanticObjectId,
+    item_id: PydanticObjectId,
+    block_ids: list[PydanticObjectId],
+    position_block_id: PydanticObjectId | None = None
+) -> None:
+    """
+    Enqueue the audio generation of blocks :block_ids: of item :item_id:, from block
+    :position_block_id: onwards first. Requests for an item with a queued batch job
+    are coalesced into it: its block ids are merged and its reading position is
+    updated, so that blocks requested twice are generated once.
+    """
+    job_doc = await Job.get_motor_collection().find_one_and_update(
+        {
+            "status": JobStatus.QUEUED,
+            "owner_id": owner_id,
+            "type_": JobType.BLOCK_BATCH_AUDIO,
+            "args.item_id": item_id
+        },
+        {
+            "$addToSet": {"args.block_ids": {"$each": block_ids}},
+            "$set": {
+                "args.position_block_id": position_block_id,
+                "updated_date": datetime_func()
+            }
+        }
+    )
+    if job_doc is None:
+        await async_enqueue_job(
+            owner_id,
+            JobType.BLOCK_BATCH_AUDIO,
+            item_id=item_id,
+            block_ids=block_ids,
+            position_block_id=position_block_id
+        )
+
+
+def get_ready_jobs_query(now: datetime) -> dict[str, Any]:
+    return {
+        "$or": [
+            {"status": JobStatus.QUEUED, "run_after": {"$lte": now}},
+            {"status": JobStatus.RUNNING, "lease_expires": {"$lt": now}}  # abandoned
+        ]
+    }
+
+
+def get_job_claim_query(job: Job) -> dict[str, Any]:
+    """Query matching :job: while it is claimed by the same worker run."""
+    return {
+        "_id": job.id,
+        "status": JobStatus.RUNNING,
+        "worker_id": job.worker_id,
+        "attempts": job.attempts
+    }
+
+
+def get_job_retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(
+        VarConfig.RETRY_BASE_SECONDS * 2**max(attempts - 1, 0),
+        VarConfig.MAX_RETRY_SECONDS
+    ))
+
+
+def get_fair_job_ids(
+    owner_jobs: list[dict[str, Any]],
+    running_counts: dict[PydanticObjectId, int],
+    max_running_per_owner: int = VarConfig.MAX_RUNNING_PER_OWNER
+) -> list[PydanticObjectId]:
+    """
+    Order the oldest ready job of each owner (:owner_jobs: dicts with "_id" (owner
+    id), "job_id" and "added_date") by the number of running jobs of its owner, then
+    by age. Owners with :max_running_per_owner: running jobs are skipped.
+    """
+    owner_jobs = [
+        owner_job for owner_job in owner_jobs
+        if running_counts.get(owner_job["_id"], 0) < max_running_per_owner
+    ]
+    owner_jobs.sort(
+        key=lambda owner_job: (
+            running_counts.get(owner_job["_id"], 0), owner_job["added_date"]
+        )
+    )
+    return [owner_job["job_id"] for owner_job in owner_jobs]
+
+
+async def async_get_running_job_counts(now: datetime) -> dict[PydanticObjectId, int]:
+    """Number of running jobs (with a live lease) of each owner."""
+    return {
+        doc["_id"]: doc["num_jobs"]
+        async for doc in Job.get_motor_collection().aggregate([
+            {"$match": {"status": JobStatus.RUNNING, "lease_expires": {"$gte": now}}},
+            {"$group": {"_id": "$owner_id", "num_jobs": {"$sum": 1}}}
+        ])
+    }
+
+
+async def async_fail_abandoned_jobs(now: datetime) -> None:
+    """Fail the jobs with an expired lease that used all their attempts."""
+    update_result = await Job.get_motor_collection().update_many(
+        {
+            "status": JobStatus.RUNNING,
+            "lease_expires": {"$lt": now},
+            "attempts": {"$gte": VarConfig.MAX_ATTEMPTS}
+        },
+        {"$set": {
+            "status": JobStatus.FAILED,
+            "updated_date": now,
+            "finished_date": now,
+            "error": "Job lease expired (worker stopped)."
+        }}
+    )
+    if update_result.modified_count:
+        logger.warning(f"Failed :{update_result.modified_count}: abandoned jobs.")
+
+
+async def async_claim_job(worker_id: str) -> Job | None:
+    """
+    Claim (lease) the next ready job for worker :worker_id: (see get_fair_job_ids()).
+    Claims are atomic, so concurrent workers never claim the same job, but the
+    per-owner cap is checked on running counts read before the claim (best-effort).
+    Returns None if there are no claimable jobs.
+    """
+    now = datetime_func()
+    await async_fail_abandoned_jobs(now)
+    running_counts = await async_get_running_job_counts(now)
+    owner_jobs = [
+        owner_job
+        async for owner_job in Job.get_motor_collection().aggregate([
+            {"$match": get_ready_jobs_query(now)},
+            {"$sort": {"added_date": 1}},
+            {
+                "$group": {
+                    "_id": "$owner_id",
+                    "job_id": {"$first": "$_id"},
+                    "added_date": {"$first": "$added_date"}
+                }
+            }
+        ])
+    ]
+    for job_id in get_fair_job_ids(owner_jobs, running_counts):
+        job_doc = await Job.get_motor_collection().find_one_and_update(
+            {"_id": job_id, **get_ready_jobs_query(now)},
+            {
+                "$set": {
+                    "status": JobStatus.RUNNING,
+                    "worker_id": worker_id,
+                    "lease_expires": now + timedelta(seconds=VarConfig.LEASE_SECONDS),
+                    "updated_date": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        if job_doc is not None:
+            return Job.parse_obj(job_doc)
+        # else claimed concurrently
+
+    return None
+
+
+async def async_extend_job_lease(job: Job) -> bool:
+    """Renew the lease of :job:. Returns False if the claim was lost."""
+    now = datetime_func()
+    update_result = await Job.get_motor_collection().update_one(
+        get_job_claim_query(job),
+        {"$set": {
+            "lease_expires": now + timedelta(seconds=VarConfig.LEASE_SECONDS),
+            "updated_date": now
+        }}
+    )
+    return update_result.modified_count == 1
+
+
+async def async_complete_job(job: Job) -> None:
+    now = datetime_func()
+    await Job.get_motor_collection().update_one(
+        get_job_claim_query(job),
+        {"$set": {
+            "status": JobStatus.COMPLETED,
+            "lease_expires": None,
+            "updated_date": now,
+            "finished_date": now,
+            "error": None
+        }}
+    )
+
+
+async def async_fail_job(job: Job, error: str) -> None:
+    """Requeue :job: with a delay (see get_job_retry_delay()), or fail it."""
+    now = datetime_func()
+    job_update: dict[str, Any] = {
+        "lease_expires": None, "updated_date": now, "error": error
+    }
+    if job.attempts < VarConfig.MAX_ATTEMPTS:
+        job_update |= {
+            "status": JobStatus.QUEUED,
+            "run_after": now + get_job_retry_delay(job.attempts)
+        }
+    else:
+        job_update |= {"status": JobStatus.FAILED, "finished_date": now}
+
+    await Job.get_motor_collection().update_one(
+        get_job_claim_query(job), {"$set": job_update}
+    )
@@ -0,0 +1,193 @@
+"""
+Raw cursor reads for the read-heavy endpoints (item document, block, block audios).
+Fields are projected in Mongo, and the returned BSON documents are mapped directly to
+output dicts, without instantiating Beanie documents or pydantic models. The output
+dicts match :model.dict(by_alias=True, exclude_none=True): for the corresponding
+output models (:BlockOut:, :BlockAudio:), so they are serialized with
+utils.serialization.dumps().
+"""
+from typing import Any
+
+from beanie.odm.fields import PydanticObjectId
+from pydantic import NonNegativeInt, PositiveInt
+
+from app.config.logging import LoggerOSError, get_logger
+from app.config.variables import Raw as VarConfig
+from app.crud.blocks import get_page_range_block_query_dict
+from app.crud.spans import get_span_storage
+from app.models.blocks import Block
+from app.models.fields import SpanType
+from app.routers.http_exceptions import InternalServerErrorHTTPException
+
+logger = get_logger(__name__)
+
+RawDict = dict[str, Any]
+
+BLOCK_PROJECTION: RawDict = {
+    "_id": 1, "size_class": 1, "read": 1, "page_nb": 1, "seq": 1,
+    "spans": 1  # embedded spans (see crud/spans.py)
+}
+SPAN_PROJECTION: RawDict = {
+    "_id": 1, "type": 1, "pause": 1, "text": 1, "read": 1, "next_id": 1, "is_head": 1,
+    "seq": 1
+}
+BLOCK_AUDIO_PROJECTION: RawDict = {"_id": 1, "audio_status": 1, "audio_path": 1}
+
+
+########
+# Output dicts
+
+def get_span_out_dict(span: RawDict) -> RawDict:
+    """:SpanOut: dict (see SpanOut.check_span_type_read())."""
+    span_out: RawDict = {}
+    if (type_ := span.get("type")) is not None and type_ != SpanType.TEXT:
+        span_out["type"] = type_
+    if (pause := span.get("pause")) is not None:
+        span_out["pause"] = pause
+    if (text := span.get("text")) is not None:
+        span_out["text"] = text
+    if span.get("read") is False:  # None is equivalent to True
+        span_out["read"] = False
+
+    return span_out
+
+
+def get_ordered_spans(
+    block_id: PydanticObjectId,
+    spans: list[RawDict]
+) -> list[RawDict]:
+    """
+    :spans: are sorted by :seq:. Spans without order keys fall back to following
+    the span linked list. Can raise LoggerOSError.
+    """
+    if all(span.get("seq") is not None for span in spans):
+        return spans
+
+    span_dict = {span["_id"]: span for span in spans}
+    head_spans = [span for span in spans if span.get("is_head")]
+    if len(head_spans) != 1:
+        raise LoggerOSError(
+            logger, f"Found :{len(head_spans)}: head spans in block :{block_id}:."
+        )
+
+    ordered_spans: list[RawDict] = []
+    cur_span: RawDict | None = head_spans[0]
+    while cur_span is not None and len(ordered_spans) < len(spans):
+        ordered_spans.append(cur_span)
+        cur_span = span_dict.get(cur_span.get("next_id"))
+
+    if len(ordered_spans) != len(spans) or cur_span is not None:
+        raise LoggerOSError(
+            logger, f"Could not construct span linked list for block :{block_id}: "
+        )
+
+    return ordered_spans
+
+
+def get_block_out_dict(block: RawDict) -> RawDict:
+    """:BlockOut: dict, from block with its :spans: (see get_raw_blocks_pipeline())."""
+    block_out: RawDict = {}
+    if (size_class := block.get("size_class")) is not None:
+        block_out["size_class"] = size_class
+    if block.get("read") is False:  # None is equivalent to True
+        block_out["read"] = False
+    block_out["_id"] = block["_id"]
+    block_out["spans"] = [
+        get_span_out_dict(span)
+        for span in get_ordered_spans(block["_id"], block["spans"])
+    ]
+
+    return block_out
+
+
+def get_block_audio_dict(block: RawDict) -> RawDict:
+    """:BlockAudio: dict."""
+    block_audio: RawDict = {"_id": block["_id"]}
+    for key in ("audio_status", "audio_path"):
+        if (value := block.get(key)) is not None:
+            block_audio[key] = value
+
+    return block_audio
+###
+
+
+########
+# Reads
+
+def get_raw_blocks_pipeline(block_query_dict: RawDict) -> list[RawDict]:
+    """As get_blocks_with_spans_pipeline(), but only with the output fields."""
+    return [
+        {"$match": block_query_dict},
+        {"$sort": {"seq": 1}},
+        {"$project": BLOCK_PROJECTION},
+        *get_span_storage().get_spans_pipeline(span_projection=SPAN_PROJECTION)
+    ]
+
+
+async def async_get_item_blocks_out_raw(
+    item_id: PydanticObjectId,
+    start_page: NonNegativeInt | None = None,
+    end_page: PositiveInt | None = None
+) -> tuple[list[RawDict], list[int]] | None:
+    """
+    Returns :BlockOut: dicts in page range, in reading order, and their page numbers.
+    Returns None if blocks have no order keys (:seq:), for which the block linked list
+    must be followed (see async_get_item_blocks_out_db()). Can raise LoggerOSError.
+    """
+    block_query_dict = get_page_range_block_query_dict(
+        item_id,
+        start_page=start_page,
+        end_page=end_page
+    )
+    cursor = Block.get_motor_collection().aggregate(
+        get_raw_blocks_pipeline(block_query_dict),
+        batchSize=VarConfig.BATCH_SIZE
+    )
+    blocks_out: list[RawDict] = []
+    page_nbs: list[int] = []
+    async for block in cursor:
+        if block.get("seq") is None:
+            # blocks without :seq: are sorted first
+            await cursor.close()
+            return None
+        blocks_out.append(get_block_out_dict(block))
+        page_nbs.append(block["page_nb"])
+
+    return blocks_out, page_nbs
+
+
+async def async_get_item_block_out_raw(
+    item_id: PydanticObjectId,
+    block_id: PydanticObjectId
+) -> RawDict | None:
+    """:BlockOut: dict for block :block_id:."""
+    blocks = await Block.get_motor_collection().aggregate(
+        get_raw_blocks_pipeline({"_id": block_id, "item_id": item_id})
+    ).to_list(length=1)
+    if not blocks:
+        return None
+
+    try:
+        return get_block_out_dict(blocks[0])
+    except LoggerOSError as exc:
+        raise InternalServerErrorHTTPException(exc.msg)
+
+
+async def async_list_item_block_audios_raw(
+    item_id: PydanticObjectId,
+    block_ids: list[PydanticObjectId] | None = None
+) -> list[RawDict]:
+    """:BlockAudio: dicts, as async_list_item_block_audios_db()."""
+    block_query_dict: RawDict = {"item_id": item_id}
+    if block_ids is not None:
+        if not block_ids:
+            return []
+        block_query_dict["_id"] = {"$in": block_ids}
+
+    cursor = Block.get_motor_collection().find(
+        block_query_dict,
+        BLOCK_AUDIO_PROJECTION,
+        batch_size=VarConfig.BATCH_SIZE
+    )
+    return [get_block_audio_dict(block) async for block in cursor]
+###
@@ -0,0 +1,362 @@
+"""
+Span storage layouts, selected with the :SPAN_STORAGE: setting:
+  - "collection": spans are documents of the spans collection, linked to their block
+    by :block_id: (and to the next span by :next_id:);
+  - "embedded": each block document embeds the array of its spans, in :seq: order.
+Spans are only read and written through get_span_storage() (see crud/blocks.py),
+so that both layouts can be used (and benchmarked) interchangeably.
+"""
+from functools import cache
+from typing import Any, AsyncIterator, Sequence
+
+from beanie.odm.fields import PydanticObjectId
+from beanie.odm.utils.dump import get_dict
+from bunnet.odm.utils.dump import get_dict as bunnet_get_dict
+from motor.motor_asyncio import AsyncIOMotorClientSession
+
+from app.config.database import async_delete_in_batches
+from app.config.logging import get_logger
+from app.config.settings import get_settings
+from app.models.blocks import Block, BunnetBlock
+from app.models.collections import Collections
+from app.models.spans import BaseSpan, BunnetSpan, Span
+from app.routers.http_exceptions import BadGatewayHTTPException
+
+logger = get_logger(__name__)
+
+# span fields stored in embedded layout (block id and list pointers are implicit,
+# see get_linked_embedded_spans())
+EMBEDDED_SPAN_FIELDS = {"id", "type_", "pause", "text", "read", "seq"}
+
+
+class SpanStorage:
+    """Interface for span storage layouts."""
+
+    def get_spans_pipeline(
+        self,
+        span_projection: dict[str, Any] | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Aggregation stages run on matched blocks that set their spans (sorted by
+        :seq:) under "spans" and the id(s) of their head span under "head_span_ids".
+        :span_projection: is a hint; embedded spans are not projected.
+        """
+        raise NotImplementedError
+
+    async def async_get_block_spans(self, block_id: PydanticObjectId) -> list[BaseSpan]:
+        """Block spans, sorted by :seq:."""
+        raise NotImplementedError
+
+    def get_block_spans(self, block_id: PydanticObjectId) -> list[BaseSpan]:
+        raise NotImplementedError
+
+    async def async_insert_block(self, block: Block, spans: list[Span]) -> Block:
+        """Insert :block: with its :spans:. Can raise HTTP_502_BAD_GATEWAY."""
+        raise NotImplementedError
+
+    def insert_blocks(self, blocks: list[BunnetBlock], spans: list[BunnetSpan]) -> None:
+        raise NotImplementedError
+
+    async def async_replace_block_spans(
+        self,
+        block_id: PydanticObjectId,
+        spans: list[Span]
+    ) -> None:
+        """Can raise HTTP_502_BAD_GATEWAY."""
+        raise NotImplementedError
+
+    async def async_delete_spans(self, block_ids: list[PydanticObjectId]) -> None:
+        """Delete spans of blocks :block_ids: (to be called before deleting them)."""
+        raise NotImplementedError
+
+    def async_delete_item_spans(self, item_id: PydanticObjectId) -> AsyncIterator[int]:
+        """
+        Delete the spans of item :item_id: in bounded batches, yielding the number
+        of deleted spans of each batch. Spans without :item_id: are not deleted.
+        """
+        raise NotImplementedError
+
+    def get_block_spans_fields(self, spans: list[Span]) -> dict[str, Any]:
+        """Fields of a block document holding its :spans: (see async_write_spans())."""
+        raise NotImplementedError
+
+    async def async_write_spans(
+        self,
+        block_ids: list[PydanticObjectId],
+        spans: list[Span],
+        session: AsyncIOMotorClientSession | None = None
+    ) -> None:
+        """
+        Delete the spans of blocks :block_ids: and insert :spans:, in :session:.
+        Spans written in block documents (see get_block_spans_fields()) are skipped.
+        """
+        raise NotImplementedError
+
+
+class CollectionSpanStorage(SpanStorage):
+
+    def get_spans_pipeline(
+        self,
+        span_projection: dict[str, Any] | None = None
+    ) -> list[dict[str, Any]]:
+        span_pipeline: list[dict[str, Any]] = [{"$sort": {"seq": 1}}]
+        if span_projection is not None:
+            span_pipeline.append({"$project": span_projection})
+
+        return [
+            {
+                "$lookup": {
+                    "from": Collections.SPANS.value,
+                    "localField": "_id",
+                    "foreignField": "block_id",
+                    "pipeline": span_pipeline,
+                    "as": "spans"
+                }
+            },
+            {
+                "$set": {
+                    "head_span_ids": {
+                        "$map": {
+                            "input": {
+                                "$filter": {
+                                    "input": "$spans",
+                                    "as": "span",
+                                    "cond": {"$eq": ["$$span.is_head", True]}
+                                }
+                            },
+                            "as": "head_span",
+                            "in": "$$head_span._id"
+                        }
+                    }
+                }
+            }
+        ]
+
+    async def async_get_block_spans(self, block_id: PydanticObjectId) -> list[BaseSpan]:
+        return await Span.find(
+            {"block_id": block_id}
+        ).sort("+seq").project(BaseSpan).to_list()
+
+    def get_block_spans(self, block_id: PydanticObjectId) -> list[BaseSpan]:
+        return BunnetSpan.find(
+            {"block_id": block_id}
+        ).sort("+seq").project(BaseSpan).to_list()
+
+    async def async_insert_spans(self, spans: list[Span]) -> None:
+        insert_result = await Span.insert_many(spans)
+        if len(insert_result.inserted_ids) != len(spans):
+            raise BadGatewayHTTPException("Error in DB insertion of block spans.")
+
+    async def async_insert_block(self, block: Block, spans: list[Span]) -> Block:
+        # spans first, so that the block is never read without its spans
+        await self.async_insert_spans(spans)
+        block_db = await block.insert()
+        if not block_db:
+            raise BadGatewayHTTPException("Error in DB insertion of new block.")
+
+        return block_db
+
+    def insert_blocks(self, blocks: list[BunnetBlock], spans: list[BunnetSpan]) -> None:
+        BunnetSpan.insert_many(spans)
+        BunnetBlock.insert_many(blocks)
+
+    async def async_replace_block_spans(
+        self,
+        block_id: PydanticObjectId,
+        spans: list[Span]
+    ) -> None:
+        await Span.find({"block_id": block_id}).delete()
+        await self.async_insert_spans(spans)
+
+    async def async_delete_spans(self, block_ids: list[PydanticObjectId]) -> None:
+        await Span.find({"block_id": {"$in": block_ids}}).delete()
+
+    def async_delete_item_spans(self, item_id: PydanticObjectId) -> AsyncIterator[int]:
+        return async_delete_in_batches(
+            Span.get_motor_collection(), {"item_id": item_id}
+        )
+
+    def get_block_spans_fields(self, spans: list[Span]) -> dict[str, Any]:
+        return {}
+
+    async def async_write_spans(
+        self,
+        block_ids: list[PydanticObjectId],
+        spans: list[Span],
+        session: AsyncIOMotorClientSession | None = None
+    ) -> None:
+        span_collection = Span.get_motor_collection()
+        if block_ids:
+            await span_collection.delete_many(
+                {"block_id": {"$in": block_ids}}, session=session
+            )
+        if spans:
+            insert_result = await span_collection.insert_many(
+                [get_dict(span, to_db=True) for span in spans], session=session
+            )
+            if len(insert_result.inserted_ids) != len(spans):
+                raise BadGatewayHTTPException("Error in DB insertion of block spans.")
+
+
+class EmbeddedSpanStorage(SpanStorage):
+
+    @staticmethod
+    def get_embedded_spans(spans: Sequence[BaseSpan]) -> list[dict[str, Any]]:
+        return [
+            span.dict(by_alias=True, include=EMBEDDED_SPAN_FIELDS) for span in spans
+        ]
+
+    @staticmethod
+    def get_linked_embedded_spans(
+        block_id: PydanticObjectId,
+        embedded_spans: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """
+        :embedded_spans: of block :block_id: with their block id and list pointers,
+        set from their order in the array, so that blocks without :seq: (which follow
+        the span linked list) are read as in the collection layout.
+        See the equivalent stage in get_spans_pipeline().
+        """
+        return [
+            {
+                **span,
+                "block_id": block_id,
+                "next_id": (
+                    embedded_spans[j + 1]["_id"]
+                    if j < len(embedded_spans) - 1 else None
+                ),
+                "is_head": (True if j == 0 else None)
+            }
+            for j, span in enumerate(embedded_spans)
+        ]
+
+    def get_spans_pipeline(
+        self,
+        span_projection: dict[str, Any] | None = None
+    ) -> list[dict[str, Any]]:
+        return [
+            {"$set": {"spans": {"$ifNull": ["$spans", []]}}},
+            {
+                "$set": {  # see get_linked_embedded_spans()
+                    "spans": {
+                        "$map": {
+                            "input": {"$range": [0, {"$size": "$spans"}]},
+                            "as": "j",
+                            "in": {
+                                "$mergeObjects": [
+                                    {"$arrayElemAt": ["$spans", "$$j"]},
+                                    {
+                                        "block_id": "$_id",
+                                        "next_id": {
+                                            "$arrayElemAt": [
+                                                "$spans._id", {"$add": ["$$j", 1]}
+                                            ]
+                                        },  # missing after the tail span
+                                        "is_head": {
+                                            "$cond": [
+                                                {"$eq": ["$$j", 0]}, True, None
+                                            ]
+                                        }
+                                    }
+                                ]
+                            }
+                        }
+                    }
+                }
+            },
+            {"$set": {"head_span_ids": {"$slice": ["$spans._id", 1]}}}
+        ]
+
+    @staticmethod
+    def get_block_spans_from_block_doc(
+        block_id: PydanticObjectId,
+        block_doc: dict[str, Any] | None
+    ) -> list[BaseSpan]:
+        if not block_doc:
+            return []
+
+        return [
+            BaseSpan.parse_obj(span)
+            for span in EmbeddedSpanStorage.get_linked_embedded_spans(
+                block_id, block_doc.get("spans", [])
+            )
+        ]
+
+    async def async_get_block_spans(self, block_id: PydanticObjectId) -> list[BaseSpan]:
+        block_doc = await Block.get_motor_collection().find_one(
+            {"_id": block_id}, {"spans": 1}
+        )
+        return self.get_block_spans_from_block_doc(block_id, block_doc)
+
+    def get_block_spans(self, block_id: PydanticObjectId) -> list[BaseSpan]:
+        block_doc = BunnetBlock.get_motor_collection().find_one(
+            {"_id": block_id}, {"spans": 1}
+        )
+        return self.get_block_spans_from_block_doc(block_id, block_doc)
+
+    async def async_insert_block(self, block: Block, spans: list[Span]) -> Block:
+        # a single insert: the block is never read without its spans
+        insert_result = await Block.get_motor_collection().insert_one({
+            **get_dict(block, to_db=True),
+            "spans": self.get_embedded_spans(spans)
+        })
+        if not insert_result.inserted_id:
+            raise BadGatewayHTTPException("Error in DB insertion of new block.")
+
+        return block
+
+    def insert_blocks(self, blocks: list[BunnetBlock], spans: list[BunnetSpan]) -> None:
+        block_spans: dict[PydanticObjectId, list[BunnetSpan]] = {
+            block.id: [] for block in blocks
+        }
+        for span in spans:
+            block_spans[span.block_id].append(span)
+
+        BunnetBlock.get_motor_collection().insert_many([
+            {
+                **bunnet_get_dict(block, to_db=True),
+                "spans": self.get_embedded_spans(block_spans[block.id])
+            }
+            for block in blocks
+        ])
+
+    async def async_replace_block_spans(
+        self,
+        block_id: PydanticObjectId,
+        spans: list[Span]
+    ) -> None:
+        update_result = await Block.get_motor_collection().update_one(
+            {"_id": block_id},
+            {"$set": {"spans": self.get_embedded_spans(spans)}}
+        )
+        if update_result.matched_count < 1:
+            raise BadGatewayHTTPException("Error in DB update of block spans.")
+
+    async def async_delete_spans(self, block_ids: list[PydanticObjectId]) -> None:
+        return  # spans are deleted with their blocks
+
+    async def async_delete_item_spans(
+        self,
+        item_id: PydanticObjectId
+    ) -> AsyncIterator[int]:
+        return  # spans are deleted with their blocks
+        yield  # makes this an (empty) async generator
+
+    def get_block_spans_fields(self, spans: list[Span]) -> dict[str, Any]:
+        return {"spans": self.get_embedded_spans(spans)}
+
+    async def async_write_spans(
+        self,
+        block_ids: list[PydanticObjectId],
+        spans: list[Span],
+        session: AsyncIOMotorClientSession | None = None
+    ) -> None:
+        return  # spans are written with their blocks
+
+
+@cache
+def get_span_storage() -> SpanStorage:
+    if get_settings().SPAN_STORAGE == "embedded":
+        return EmbeddedSpanStorage()
+
+    return CollectionSpanStorage()
@@ -1,18 +1,26 @@
+import asyncio
+from datetime import timedelta, timezone
+from typing import Any, cast
+
 from beanie.odm.fields import PydanticObjectId
-from beanie.odm.operators.find.comparison import In
+from pymongo.errors import DuplicateKeyError, PyMongoError
 
 from app.auth.password import get_password_hash
 from app.config.logging import LoggerOSError, get_logger
 from app.config.settings import get_settings
+from app.config.variables import Users as VarConfig
+from app.crud.blocks import async_delete_item_blocks_db
 from app.models.base import IdModel
-from app.models.blocks import Block
+from app.models.collections import Collections
+from app.models.fields import DeletionStatus, datetime_func
 from app.models.items import BasicItem, Item
-from app.models.spans import Span
-from app.models.users import BasicUser, UserInDB
+from app.models.users import BasicUser, UserDeletion, UserDeletionOut, UserInDB
 from app.utils.aws import async_delete_s3_user  # type: ignore
 
 logger = get_logger(__name__)
 
+_RESUMED_DELETION_TASKS: set[asyncio.Task] = set()
+
 
 ########
 # GET
@@ -57,29 +65,186 @@ async def async_list_user_items_db(user_id: PydanticObjectId) -> list[BasicItem]
 
 ########
 # DELETE
-
-async def async_delete_user_db_s3(username: str) -> bool:
-    user_db = await async_get_user_db(username)
-    if not user_db:
+async def async_get_user_deletion_db(user_id: PydanticObjectId) -> UserDeletion | None:
+    return await UserDeletion.get(user_id)
+
+
+async def async_claim_user_deletion_db(deletion: UserDeletion) -> bool:
+    """
+    Atomically set :deletion: in progress if it failed or stopped making progress
+    (see is_user_deletion_stale()), so that only one server instance resumes it.
+    """
+    if not (
+        deletion.status == DeletionStatus.FAILED or
+        (deletion.status == DeletionStatus.IN_PROGRESS and
+         is_user_deletion_stale(deletion))
+    ):
         return False
 
-    # Find user item ids
-    id_models = await Item.find({"owner_id": user_db.id}).project(IdModel).to_list()
-    item_ids = [id_model.id for id_model in id_models]
-
-    # Find all blocks for all user items
-    id_models = await Block.find(In("item_id", item_ids)).project(IdModel).to_list()
-    block_ids = [id_model.id for id_model in id_models]
+    update_result = await UserDeletion.get_motor_collection().update_one(
+        {"_id": deletion.id, "updated_date": deletion.updated_date},
+        {"$set": {
+            "status": DeletionStatus.IN_PROGRESS,
+            "updated_date": datetime_func(),
+            "error": None
+        }}
+    )
+    if update_result.modified_count != 1:
+        return False  # claimed concurrently
 
-    await Span.find(In("block_id", block_ids)).delete()  # delete all user spans
-    await Block.find(In("item_id", item_ids)).delete()  # delete all user blocks
-    await Item.find(In("_id", item_ids)).delete()  # delete all user items
+    await deletion.sync()
+    return True
 
-    if not get_settings().LOCAL:
-        await async_delete_s3_user(user_db.id)  # delete all user-related stuff from s3
 
-    delete_result = await user_db.delete()  # delete user
+async def async_start_user_deletion_db(
+    user_id: PydanticObjectId
+) -> tuple[UserDeletion, bool]:
+    """
+    Disable user :user_id: and create its deletion job. If the job already exists, it
+    is returned, so that it can be resumed.
+    Returns the job and whether it has to be run (see async_run_user_deletion_db_s3()).
+    """
+    await UserInDB.find_one({"_id": user_id}).update({"$set": {"disabled": True}})
+    deletion = await async_get_user_deletion_db(user_id)
+    if deletion is not None:
+        return deletion, await async_claim_user_deletion_db(deletion)
+
+    deletion = UserDeletion(id=user_id)
+    try:
+        await deletion.insert()
+    except DuplicateKeyError:  # started concurrently
+        return cast(UserDeletion, await async_get_user_deletion_db(user_id)), False
+
+    return deletion, True
+
+
+def is_user_deletion_stale(deletion: UserDeletionOut) -> bool:
+    """Whether an in-progress deletion stopped making progress (e.g. server restart)."""
+    stale_date = datetime_func() - timedelta(seconds=VarConfig.DELETION_STALE_SECONDS)
+    return deletion.updated_date.replace(tzinfo=timezone.utc) < stale_date
+
+
+async def async_delete_user_items_db(deletion: UserDeletion) -> None:
+    """
+    Delete user items one at a time in :_id: order, starting at the persisted cursor
+    :cur_item_id:. Item spans and blocks are deleted in bounded batches (see
+    async_delete_item_blocks_db()), and the progress is saved after each batch.
+    """
+    item_query_dict: dict[str, Any] = {"owner_id": deletion.id}
+    if deletion.cur_item_id is not None:  # items before the cursor are deleted
+        item_query_dict["_id"] = {"$gte": deletion.cur_item_id}
+
+    async for item in Item.find(item_query_dict).sort("+_id").project(IdModel):
+        await deletion.set({"cur_item_id": item.id, "updated_date": datetime_func()})
+        num_deleted = {
+            Collections.SPANS: deletion.num_spans,
+            Collections.BLOCKS: deletion.num_blocks
+        }
+
+        async def async_save_progress(collection: Collections, num_item_docs: int):
+            await deletion.set({
+                f"num_{collection.value}": num_deleted[collection] + num_item_docs,
+                "updated_date": datetime_func()
+            })
+
+        await async_delete_item_blocks_db(item.id, on_progress=async_save_progress)
+        await Item.find_one({"_id": item.id}).delete()
+        await deletion.set({
+            "num_items": deletion.num_items + 1, "updated_date": datetime_func()
+        })
+
+
+async def async_delete_user_s3(deletion: UserDeletion) -> None:
+    if not deletion.s3_deleted:
+        if not get_settings().LOCAL:
+            await async_delete_s3_user(deletion.id)  # delete all user-related s3 objs
+        await deletion.set({"s3_deleted": True})
+
+
+async def async_keep_user_deletion_alive(deletion: UserDeletion) -> None:
+    """
+    Refresh the :updated_date: of running deletion :deletion:, also during phases
+    that save no progress (the s3 deletion), so that it is never seen as stale.
+    """
+    while True:
+        await asyncio.sleep(VarConfig.DELETION_HEARTBEAT_SECONDS)
+        await deletion.set({"updated_date": datetime_func()})
+
+
+async def async_run_user_deletion_db_s3(deletion: UserDeletion) -> bool:
+    """
+    Run (or resume) user deletion job :deletion:. The user items are deleted in
+    bounded batches while, concurrently, the user s3 objs are deleted. The user is
+    deleted last. Returns False if the user is not found.
+    """
+    heartbeat_task = asyncio.create_task(async_keep_user_deletion_alive(deletion))
+    try:
+        await asyncio.gather(
+            async_delete_user_items_db(deletion),
+            async_delete_user_s3(deletion)
+        )
+        delete_result = await UserInDB.find_one({"_id": deletion.id}).delete()
+    except Exception as exc:
+        await deletion.set({
+            "status": DeletionStatus.FAILED,
+            "updated_date": datetime_func(),
+            "error": str(exc)
+        })
+        raise LoggerOSError(
+            logger, f"Deletion of user :{deletion.id}: failed: {exc}"
+        ) from exc
+    finally:
+        heartbeat_task.cancel()
+
+    await deletion.set({
+        "status": DeletionStatus.COMPLETED,
+        "cur_item_id": None,
+        "updated_date": datetime_func()
+    })
+    logger.info(
+        f"Deleted user :{deletion.id}: with :{deletion.num_items}: items, "
+        f":{deletion.num_blocks}: blocks and :{deletion.num_spans}: spans."
+    )
     if (delete_result is None or delete_result.deleted_count == 0):
         return False
 
     return True
+
+
+async def async_resume_user_deletions() -> None:
+    """
+    Resume in-progress user deletions without recent progress, e.g. after a server
+    restart (see async_claim_user_deletion_db()).
+    """
+    async for deletion in UserDeletion.find({"status": DeletionStatus.IN_PROGRESS}):
+        if await async_claim_user_deletion_db(deletion):
+            logger.info(f"Resuming deletion of user :{deletion.id}:.")
+            task = asyncio.create_task(async_run_user_deletion_db_s3(deletion))
+            _RESUMED_DELETION_TASKS.add(task)  # keep a reference until done
+            task.add_done_callback(_RESUMED_DELETION_TASKS.discard)
+
+
+async def async_sweep_user_deletions() -> None:
+    """
+    Resume stale user deletions every :DELETION_SWEEP_SECONDS:, since a deletion
+    stopped less than :DELETION_STALE_SECONDS: before a restart is not stale yet at
+    startup. Runs until cancelled.
+    """
+    while True:
+        try:
+            await async_resume_user_deletions()
+        except PyMongoError as exc:
+            logger.warning(f"Could not resume user deletions: {exc}")
+
+        await asyncio.sleep(VarConfig.DELETION_SWEEP_SECONDS)
+
+
+async def async_delete_user_db_s3(username: str) -> bool:
+    """Delete user :username: now (see async_run_user_deletion_db_s3())."""
+    user_db = await async_get_user_db(username)
+    if not user_db:
+        return False
+
+    deletion, _ = await async_start_user_deletion_db(user_db.id)
+
+    return await async_run_user_deletion_db_s3(deletion)
@@ -1,13 +1,19 @@
+import asyncio
+
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 
 from app.config.database import async_init_databases
+from app.config.executors import get_ingest_executor
 from app.config.logging import get_logger
 from app.config.settings import get_settings
 from app.config.variables import Routers as VarConfig  # type: ignore
+from app.crud.users import async_sweep_user_deletions
 from app.models.responses import ShortResponse
 from app.routers import router as v1
 from app.routers.health import router as health_router
+from app.utils.aws import async_close_s3_client, async_open_s3_client
 
 if get_settings().LOCAL:
     get_logger("uvicorn")
@@ -38,12 +44,14 @@ async def set_content_encoding_to_none(request: Request, call_next):
     """https://community.fly.io/t/content-encoding-gzip/4000/30"""
     response = await call_next(request)
     response.headers["Content-Encoding"] = "none"
-    if "Content-Length" not in response.headers:
-        response.headers["Content-Length"] = response.headers[
-            VarConfig.FULL_CONTENT_LENGTH_HEADER
-        ]
-    # delete X-Full-Content-Length header
-    del response.headers[VarConfig.FULL_CONTENT_LENGTH_HEADER]
+    # streamed responses only set X-Full-Content-Length if their length is known
+    if VarConfig.FULL_CONTENT_LENGTH_HEADER in response.headers:
+        if "Content-Length" not in response.headers:
+            response.headers["Content-Length"] = response.headers[
+                VarConfig.FULL_CONTENT_LENGTH_HEADER
+            ]
+        # delete X-Full-Content-Length header
+        del response.headers[VarConfig.FULL_CONTENT_LENGTH_HEADER]
 
     return response
 
@@ -57,6 +65,8 @@ async def startup_event():
     app.state.logger = get_logger(__name__)
     app.state.logger.info("Server starting...")
     await async_init_databases(app.state)
+    await async_open_s3_client()
+    app.state.deletion_sweep_task = asyncio.create_task(async_sweep_user_deletions())
 
 
 @app.get(
@@ -89,3 +99,7 @@ async def get_aws_root_path():
 @app.on_event("shutdown")
 async def shutdown_event():
     app.state.logger.info("Server stopping.")
+    app.state.deletion_sweep_task.cancel()
+    # wait for running uploads (see upload_item())
+    await run_in_threadpool(get_ingest_executor().shutdown)
+    await async_close_s3_client()
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+from beanie import Document
+from pydantic import NonNegativeInt
+
+from app.models.collections import Collections
+from app.models.fields import Fields
+
+
+class CachedAudioChunk(Document):
+    """Synthesized audio chunk :id: (its hash, see utils/audio_cache.py) in s3."""
+    id: str  # type: ignore
+    s3_key: str
+    num_bytes: NonNegativeInt
+    added_date: datetime = Fields.added_date
+
+    class Settings:
+        name = Collections.AUDIO_CHUNKS.value
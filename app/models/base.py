@@ -1,6 +1,20 @@
+from typing import Any, Type, TypeVar
+
 from beanie.odm.fields import PydanticObjectId
 from pydantic import BaseModel
 
+Model = TypeVar('Model', bound=BaseModel)
+
+
+def construct_from_trusted(cls: Type[Model], obj: BaseModel, **values: Any) -> Model:
+    """
+    Construct :cls: model from the fields of :obj: (and :values:) without validation.
+    Only for data validated before (e.g. read from db), never for user input.
+    """
+    return cls.construct(**{
+        name: getattr(obj, name) for name in cls.__fields__ if name not in values
+    }, **values)
+
 
 class IdModel(BaseModel):
     id: PydanticObjectId
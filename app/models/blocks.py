@@ -6,11 +6,12 @@ from typing import cast
 from beanie import Document as Document
 from beanie.odm.fields import PydanticObjectId
 from bunnet import Document as BunnetDocument
-from pydantic import BaseModel, Field, NonNegativeInt, validator
+from pydantic import BaseModel, Field, NonNegativeInt, root_validator, validator
+from pymongo import ASCENDING, IndexModel
 
-from app.models.base import IdModel
+from app.models.base import IdModel, construct_from_trusted
 from app.models.collections import Collections
-from app.models.fields import AudioStatus, Fields, SizeClass
+from app.models.fields import AudioStatus, BlockEditOp, Fields, SizeClass
 from app.models.spans import BaseSpan, PauseSpanIn, SpanIdBlockId, SpanOut, TextSpanIn
 from app.models.validators import set_is_head_to_none_if_false, set_read_to_none_if_true
 
@@ -79,6 +80,12 @@ class PageNumber(BaseModel):
     page_nb: NonNegativeInt = Fields.page_nb
 
 
+class BlockOrder(IdModel, PageNumber):
+    next_id: PydanticObjectId | None = Fields.next_id
+    is_head: bool | None = Fields.opt_is_head  # None is equivalent to False
+    seq: float | None = Fields.opt_seq
+
+
 class BlockAux(BaseModel):
     size_class: SizeClass | None = None
 
@@ -90,20 +97,94 @@ class BlockIn(BlockAux):
     spans: list[TextSpanIn | PauseSpanIn]
 
 
-class BlockInPrevId(BaseModel):
+class BlockPrevId(BaseModel):
     prev_block_id: PydanticObjectId | None = Field(
         None,
         description="If not given, the block inserted at the beggining of block list."
     )
+
+
+class BlockInPrevId(BlockPrevId):
     block: BlockIn
 
 
+class BlockEdit(BaseModel):
+    op: BlockEditOp
+    block_id: PydanticObjectId | None = Field(
+        None, description="replace, delete, move: id of the edited block."
+    )
+    prev_block_id: PydanticObjectId | None = Field(
+        None,
+        description=(
+            "insert, move: id of the block after which the block(s) are placed. "
+            "If not given, the block(s) are placed at the beggining of block list."
+        )
+    )
+    block: BlockIn | None = Field(None, description="replace: the updated block.")
+    blocks: list[BlockIn] | None = Field(
+        None, description="insert: the new blocks, in order."
+    )
+
+    @root_validator(skip_on_failure=True)
+    def check_op_fields(cls, values):
+        op = values["op"]
+        if op != BlockEditOp.INSERT and values["block_id"] is None:
+            raise ValueError(f"{op.value} edit requires :block_id:.")
+        if op == BlockEditOp.INSERT and not values["blocks"]:
+            raise ValueError("insert edit requires :blocks:.")
+        if op == BlockEditOp.REPLACE and values["block"] is None:
+            raise ValueError("replace edit requires :block:.")
+
+        return values
+
+
+class BlockEditListIn(BaseModel):
+    edits: list[BlockEdit] = Field(
+        min_items=1,
+        description="Edits applied in order, as if sent one at a time."
+    )
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "edits": [
+                    {
+                        "op": "insert",
+                        "prev_block_id": "63becf2d42a96a2f6f1ba55a",
+                        "blocks": [{"spans": [{"text": "New block."}]}]
+                    },
+                    {
+                        "op": "replace",
+                        "block_id": "63becf2d42a96a2f6f1ba55b",
+                        "block": {"spans": [{"text": "Fixed block."}]}
+                    },
+                    {"op": "delete", "block_id": "63becf2d42a96a2f6f1ba55c"},
+                    {
+                        "op": "move",
+                        "block_id": "63becf2d42a96a2f6f1ba55d",
+                        "prev_block_id": None
+                    }
+                ]
+            }
+        }
+
+
 class BlockAuxRead(BlockAux):
     read: bool | None = Fields.opt_read  # None is equivalent to True
 
     _set_read = validator('read', allow_reuse=True)(set_read_to_none_if_true)
 
 
+class BlockEditListOut(BaseModel):
+    block_ids: list[PydanticObjectId] = Field(
+        description="Ids of the inserted blocks, in edit order."
+    )
+
+
+class BlockOrderRead(BlockOrder):
+    read: bool | None = Fields.opt_read  # None is equivalent to True
+
+
 class BaseBlockOut(IdModel, BlockAuxRead):
 
     class Config:
@@ -121,10 +202,8 @@ class BlockOut(BaseBlockOut):
         block: BaseBlockOut,
         spans: list[SpanOut]
     ) -> BlockOut:
-        return cls.parse_obj({
-            **block.dict(),
-            "spans": spans
-        })
+        """:block: and :spans: are read from db, so they are not revalidated."""
+        return construct_from_trusted(cls, block, spans=spans)
 
 
 class BaseBlock(BaseBlockOut):
@@ -134,10 +213,17 @@ class BaseBlock(BaseBlockOut):
     is_head: bool | None = Fields.opt_is_head  # None is equivalent to False
     audio_status: AudioStatus | None = None
     audio_path: str | None = Fields.opt_audio_path
+    seq: float | None = Fields.opt_seq
 
     _set_is_head = validator('is_head', allow_reuse=True)(set_is_head_to_none_if_false)
 
 
+class BlockWithSpans(BaseBlock):
+    """Block with its spans grouped by the :$lookup: aggregation stage."""
+    head_span_ids: list[PydanticObjectId]
+    spans: list[BaseSpan]
+
+
 class ShallowBlockDict(BaseModel):
     # {block_id: {"block": block}}
     __root__: dict[PydanticObjectId, dict[str, BaseBlock]]
@@ -191,6 +277,79 @@ class BlockDict(BaseModel):
         span_dict[span.id] = span
 
 
+class BlockGraph:
+    """
+    Blocks (and their spans) of an item, indexed by block id. Unlike :BlockDict:,
+    blocks and spans are stored as given, i.e., without revalidation. Blocks are kept
+    in an array, with an id -> index map and per-block head span ids and span dicts.
+    """
+    __slots__ = ('blocks', 'block_index', 'head_span_ids', 'span_dicts')
+
+    def __init__(self, blocks: list[BaseBlock]) -> None:
+        self.blocks = blocks
+        self.block_index = {block.id: idx for idx, block in enumerate(blocks)}
+        self.head_span_ids: list[PydanticObjectId | None] = [None] * len(blocks)
+        self.span_dicts: list[dict[PydanticObjectId, BaseSpan]] = [
+            {} for _ in range(len(blocks))
+        ]
+
+    @classmethod
+    def initialize(cls, blocks: list[BaseBlock]) -> BlockGraph:
+        return cls(blocks)
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def __contains__(self, block_id: PydanticObjectId) -> bool:
+        return block_id in self.block_index
+
+    def get_block(self, block_id: PydanticObjectId) -> BaseBlock:
+        """Raises KeyError if block is not in graph."""
+        return self.blocks[self.block_index[block_id]]
+
+    def get_next_block_id(self, block_id: PydanticObjectId) -> PydanticObjectId | None:
+        return self.get_block(block_id).next_id
+
+    def get_head_span_id(self, block_id: PydanticObjectId) -> PydanticObjectId:
+        """Raises KeyError if block is not in graph or has no head span."""
+        head_span_id = self.head_span_ids[self.block_index[block_id]]
+        if head_span_id is None:
+            raise KeyError(block_id)
+
+        return head_span_id
+
+    def get_span_dict(
+        self,
+        block_id: PydanticObjectId
+    ) -> dict[PydanticObjectId, BaseSpan]:
+        return self.span_dicts[self.block_index[block_id]]
+
+    def set_head_span_id(
+        self,
+        block_id: PydanticObjectId,
+        head_span_id: PydanticObjectId
+    ) -> None:
+        self.head_span_ids[self.block_index[block_id]] = head_span_id
+
+    def add_head_span(self, head_span: SpanIdBlockId) -> None:
+        self.set_head_span_id(head_span.block_id, head_span.id)
+
+    def add_span(self, span: BaseSpan) -> None:
+        self.span_dicts[self.block_index[span.block_id]][span.id] = span
+
+
+# Indexes for the block queries in crud (see config.database.get_hot_queries())
+BLOCK_INDEXES = [
+    IndexModel([("item_id", ASCENDING), ("seq", ASCENDING)]),
+    IndexModel([("item_id", ASCENDING), ("page_nb", ASCENDING), ("seq", ASCENDING)]),
+    IndexModel([("next_id", ASCENDING), ("item_id", ASCENDING)]),
+    IndexModel(  # head block lookup; not unique, moves briefly have two heads
+        [("item_id", ASCENDING), ("is_head", ASCENDING)],
+        partialFilterExpression={"is_head": True}
+    ),
+]
+
+
 class Block(Document, BaseBlock):  # type: ignore
     id: PydanticObjectId
 
@@ -198,6 +357,7 @@ class Block(Document, BaseBlock):  # type: ignore
         name = Collections.BLOCKS.value
         use_state_management = True
         use_enum_values = True  # https://docs.pydantic.dev/usage/model_config/
+        indexes = BLOCK_INDEXES
 
 
 # NOTE: Sync between Bunnet/Beanie and is_root with inheritance is not working properly
@@ -213,3 +373,4 @@ class BunnetBlock(BunnetDocument, BaseBlock):  # type: ignore
         name = Collections.BLOCKS.value
         use_state_management = True
         use_enum_values = True
+        indexes = BLOCK_INDEXES
@@ -7,3 +7,6 @@ class Collections(str, Enum):
     ITEMS = "items"
     BLOCKS = "blocks"
     SPANS = "spans"
+    USER_DELETIONS = "user_deletions"
+    JOBS = "jobs"
+    AUDIO_CHUNKS = "audio_chunks"
@@ -2,7 +2,7 @@ from datetime import datetime, timezone
 from enum import Enum, unique
 from typing import Any
 
-from fastapi import Body, Query
+from fastapi import Body, Header, Query
 from pydantic import Field
 from pydantic.fields import Undefined
 
@@ -66,6 +66,37 @@ class AudioStatus(str, Enum):
     FAILED = "failed"
 
 
+@unique
+class DeletionStatus(str, Enum):
+    IN_PROGRESS = "in progress"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@unique
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@unique
+class JobType(str, Enum):
+    ITEM_AUDIOS = "item audios"  # see process_item_audios()
+    BLOCK_AUDIO = "block audio"  # see process_item_block_audio()
+    BLOCK_BATCH_AUDIO = "block batch audio"  # see crud/audio_batches.py
+    BLOCKS_AUDIOS = "blocks audios"  # see get_audios_for_item_blocks()
+
+
+@unique
+class BlockEditOp(str, Enum):
+    INSERT = "insert"
+    REPLACE = "replace"
+    DELETE = "delete"
+    MOVE = "move"
+
+
 @unique
 class Gender(str, Enum):
     MALE = "Male"
@@ -125,6 +156,10 @@ class Fields:
         description="Review progress in percentage value."
     )
     opt_toc = Field(default=None, title="Table of contents")
+    version = Field(
+        default=0,
+        description="Incremented whenever the item document (blocks, spans) changes."
+    )
     opt_span_type = Field(default=None, alias='type')
     opt_read = Field(
         default=None,
@@ -142,6 +177,20 @@ class Fields:
     page_nb = Field(
         description="Page number (0-based index) to which block belongs to."
     )
+    opt_seq = Field(
+        default=None,
+        description=(
+            "Sparse order key of element in list. None for elements created before "
+            "order keys were introduced (see :next_id:)."
+        )
+    )
+    opt_item_id = Field(
+        default=None,
+        description=(
+            "Id of the item (denormalized, for cascading deletes). None for elements "
+            "created before it was introduced."
+        )
+    )
     opt_is_head = Field(
         default=None,
         description="Whether element is head of list. None is equivalent to False."
@@ -173,6 +222,18 @@ class Queries:
     only_missing_audio_flag = Query(
         description="If set, only generate missing audio(s)"
     )
+    position_block_id = Query(
+        description=(
+            "Block at the reading position. Audios of blocks from this block onwards "
+            "are generated first."
+        )
+    )
+
+
+class Headers:
+    if_none_match = Header(
+        description="ETag(s) of cached response(s). If one matches, returns 304."
+    )
 
 
 class Bodies:
@@ -180,6 +241,8 @@ class Bodies:
         description="New block to add and previous block id."
     )
     block_in = Body(description="The updated block model.")
+    prev_block_id = Body(description="Id of the block after which to move the block.")
+    block_edits = Body(description="Block edits, applied in order.")
     block_ids_list_or_range = Body(
         examples={
             "list": {
@@ -7,9 +7,10 @@ from functools import cache
 from beanie import Document as Document
 from beanie.odm.fields import PydanticObjectId
 from bunnet import Document as BunnetDocument
-from pydantic import BaseModel, PositiveInt
+from pydantic import BaseModel, NonNegativeInt, PositiveInt
+from pymongo import ASCENDING, IndexModel
 
-from app.models.base import IdModel
+from app.models.base import IdModel, construct_from_trusted
 from app.models.blocks import BlockOut
 from app.models.collections import Collections
 from app.models.fields import AudioStatus, DocStatus, Fields
@@ -19,12 +20,14 @@ from app.models.voices import VoiceInfo  # type: ignore
 
 class ItemIdDocStatus(IdModel):
     status: DocStatus = DocStatus.IN_PROGRESS
+    version: NonNegativeInt = Fields.version
 
     class Config:
         schema_extra = {
             "example": {
                 "_id": "63becf2d42a96a2f6f1ba55a",
                 "status": DocStatus.IN_PROGRESS,
+                "version": 0,
             }
         }
 
@@ -98,6 +101,11 @@ class ItemAuxPlus(ItemAux):
 class BaseItemOut(IdModel, ItemAuxPlus):
     owner_id: PydanticObjectId
 
+    @classmethod
+    def construct_from_item(cls, item: BaseItemOut) -> BaseItemOut:
+        """:item: is read from db, so it is not revalidated."""
+        return construct_from_trusted(cls, item)
+
     class Config:
         allow_population_by_field_name = True
         fields = {"id": "_id"}
@@ -112,16 +120,21 @@ class ItemOut(BaseItemOut):
         item: BaseItemOut,
         blocks: list[BlockOut]
     ) -> ItemOut:
-        return cls.parse_obj({
-            **item.dict(),
-            "blocks": blocks
-        })
+        """:item: and :blocks: are read from db, so they are not revalidated."""
+        return construct_from_trusted(cls, item, blocks=blocks)
 
 
 class BaseItem(BaseItemOut):
     audio_status: AudioStatus | None = None
     audio_path: str | None = Fields.opt_audio_path
     cover_path: str | None = Fields.opt_cover_path
+    version: NonNegativeInt = Fields.version
+
+
+# Indexes for the item queries in crud (see config.database.get_hot_queries())
+ITEM_INDEXES = [
+    IndexModel([("owner_id", ASCENDING), ("_id", ASCENDING)]),
+]
 
 
 class Item(Document, BaseItem):  # type: ignore
@@ -130,6 +143,7 @@ class Item(Document, BaseItem):  # type: ignore
     class Settings:
         name = Collections.ITEMS.value
         use_state_management = True
+        indexes = ITEM_INDEXES
 
 
 # e.g. that find of head block returns only one block, or that following the list
@@ -145,3 +159,4 @@ class BunnetItem(BunnetDocument, BaseItem):  # type: ignore
     class Settings:
         name = Collections.ITEMS.value
         use_state_management = True
+        indexes = ITEM_INDEXES
@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import Any
+
+from beanie import Document
+from beanie.odm.fields import PydanticObjectId
+from pydantic import Field, NonNegativeInt
+from pymongo import ASCENDING, IndexModel
+
+from app.config.variables import Jobs as VarConfig
+from app.models.collections import Collections
+from app.models.fields import Fields, JobStatus, JobType
+
+JOB_INDEXES = [
+    IndexModel([("status", ASCENDING), ("run_after", ASCENDING)]),  # queued jobs
+    IndexModel([("status", ASCENDING), ("lease_expires", ASCENDING)]),  # leases
+    IndexModel(
+        [("finished_date", ASCENDING)],
+        expireAfterSeconds=VarConfig.FINISHED_TTL_SECONDS
+    ),
+]
+
+
+class Job(Document):
+    """
+    Job :type_: of user :owner_id:, run with :args: by a worker process (see
+    app/worker.py). A running job is leased to worker :worker_id: until
+    :lease_expires:; the pair (:worker_id:, :attempts:) identifies each claim.
+    """
+    id: PydanticObjectId = Field(default_factory=PydanticObjectId)
+    owner_id: PydanticObjectId
+    type_: JobType
+    args: dict[str, Any] = {}
+    status: JobStatus = JobStatus.QUEUED
+    attempts: NonNegativeInt = 0
+    run_after: datetime = Fields.added_date
+    worker_id: str | None = None
+    lease_expires: datetime | None = None
+    added_date: datetime = Fields.added_date
+    updated_date: datetime = Fields.added_date
+    finished_date: datetime | None = None
+    error: str | None = None
+
+    class Settings:
+        name = Collections.JOBS.value
+        use_enum_values = True
+        indexes = JOB_INDEXES
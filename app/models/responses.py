@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, NonNegativeFloat, NonNegativeInt
 
 
 class ShortResponse(BaseModel):
@@ -10,3 +10,24 @@ class ShortResponse(BaseModel):
                 "message": "OK",
             }
         }
+
+
+class S3PoolStats(BaseModel):
+    max_connections: NonNegativeInt
+    # requests waiting for a pooled connection, being sent or awaiting their response
+    in_flight: NonNegativeInt
+    peak_in_flight: NonNegativeInt
+    num_requests: NonNegativeInt  # since startup, including retries
+    # in_flight / max_connections; above 1, requests are waiting for a connection
+    utilization: NonNegativeFloat
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "max_connections": 50,
+                "in_flight": 5,
+                "peak_in_flight": 8,
+                "num_requests": 1204,
+                "utilization": 0.1
+            }
+        }
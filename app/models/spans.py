@@ -4,8 +4,9 @@ from beanie import Document as Document
 from beanie.odm.fields import PydanticObjectId
 from bunnet import Document as BunnetDocument
 from pydantic import BaseModel, root_validator, validator
+from pymongo import ASCENDING, IndexModel
 
-from app.models.base import IdModel
+from app.models.base import IdModel, construct_from_trusted
 from app.models.collections import Collections
 from app.models.fields import Fields, SpanType
 from app.models.validators import (
@@ -78,12 +79,15 @@ class SpanIdBlockId(IdModel):
 class BaseSpan(SpanIdBlockId, SpanOut):
     next_id: PydanticObjectId | None = Fields.next_id
     is_head: bool | None = Fields.opt_is_head  # None is equivalent to False
+    seq: float | None = Fields.opt_seq
 
     _set_is_head = validator('is_head', allow_reuse=True)(set_is_head_to_none_if_false)
 
     @classmethod
     def convert_to_span_out(cls, span: BaseSpan) -> SpanOut:
-        return span
+        # drop db-only fields (ids, pointers), which would otherwise be serialized;
+        # :span: is already validated, so skip validation (and the root validator)
+        return construct_from_trusted(SpanOut, span)
 
     class Config:
         schema_extra = {
@@ -96,21 +100,32 @@ class BaseSpan(SpanIdBlockId, SpanOut):
         }
 
 
+# Indexes for the span queries in crud (see config.database.get_hot_queries())
+SPAN_INDEXES = [
+    IndexModel([("block_id", ASCENDING), ("seq", ASCENDING)]),
+    IndexModel([("item_id", ASCENDING)]),
+]
+
+
 class Span(Document, BaseSpan):  # type: ignore
     id: PydanticObjectId
+    item_id: PydanticObjectId | None = Fields.opt_item_id
 
     class Settings:
         name = Collections.SPANS.value
         schema_extra = BaseSpan.Config.schema_extra
         use_state_management = True
         use_enum_values = True
+        indexes = SPAN_INDEXES
 
 
 class BunnetSpan(BunnetDocument, BaseSpan):  # type: ignore
     id: PydanticObjectId  # type: ignore
+    item_id: PydanticObjectId | None = Fields.opt_item_id
 
     class Settings:
         name = Collections.SPANS.value
         schema_extra = BaseSpan.Config.schema_extra
         use_state_management = True
         use_enum_values = True
+        indexes = SPAN_INDEXES
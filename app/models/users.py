@@ -1,10 +1,13 @@
 # import pymongo
 # from pymongo import IndexModel
+from datetime import datetime
+
 from beanie import Document
 from beanie.odm.fields import PydanticObjectId
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field, NonNegativeInt
 
 from app.models.collections import Collections
+from app.models.fields import DeletionStatus, Fields
 
 
 class BasicUser(BaseModel):
@@ -33,3 +36,46 @@ class UserInDB(Document):
     class Settings:
         name = Collections.USERS.value
         use_state_management = True
+
+
+class UserDeletionOut(BaseModel):
+    status: DeletionStatus = DeletionStatus.IN_PROGRESS
+    num_items: NonNegativeInt = 0  # number of deleted items, blocks and spans
+    num_blocks: NonNegativeInt = 0
+    num_spans: NonNegativeInt = 0
+    s3_deleted: bool = False
+    cur_item_id: PydanticObjectId | None = Field(
+        None,
+        description=(
+            "Cursor of the item being deleted. Items are deleted in :_id: order, "
+            "so items before the cursor are deleted."
+        )
+    )
+    added_date: datetime = Fields.added_date
+    updated_date: datetime = Fields.added_date
+    error: str | None = None
+
+    class Config:
+        use_enum_values = True
+        schema_extra = {
+            "example": {
+                "status": DeletionStatus.IN_PROGRESS,
+                "num_items": 2,
+                "num_blocks": 1200,
+                "num_spans": 15000,
+                "s3_deleted": True,
+                "cur_item_id": "63becf2d42a96a2f6f1ba55a",
+                "added_date": "2023-02-22T11:44:18.274385",
+                "updated_date": "2023-02-22T11:44:25.102817"
+            }
+        }
+
+
+class UserDeletion(Document, UserDeletionOut):
+    """Resumable deletion job of user :id: (one per user)."""
+    id: PydanticObjectId
+
+    class Settings:
+        name = Collections.USER_DELETIONS.value
+        use_state_management = True
+        use_enum_values = True
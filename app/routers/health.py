@@ -1,7 +1,9 @@
 from fastapi import APIRouter, status
 
 from app.config.database import get_beanie_database
-from app.models.responses import ShortResponse
+from app.models.responses import S3PoolStats, ShortResponse
+from app.routers.http_exceptions import NotFoundHTTPException
+from app.utils.aws import get_s3_pool_stats
 
 router = APIRouter()
 
@@ -32,3 +34,21 @@ async def db_health_check():
         )
 
     return ShortResponse(message="OK")
+
+
+@router.get(
+    "/s3",
+    status_code=status.HTTP_200_OK,
+    response_description="A :S3PoolStats: model",
+    response_model=S3PoolStats,
+    description="Connection pool utilization of the async s3 client.",
+    responses={
+        status.HTTP_404_NOT_FOUND: NotFoundHTTPException.response
+    }
+)
+async def s3_health_check():
+    pool_stats = get_s3_pool_stats()
+    if pool_stats is None:
+        raise NotFoundHTTPException("S3 is not used in LOCAL mode.")
+
+    return pool_stats
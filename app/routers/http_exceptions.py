@@ -74,6 +74,19 @@ class BadGatewayHTTPException(HTTPException):
     }
 
 
+class ServiceUnavailableHTTPException(HTTPException):
+    def __init__(self, detail: str | None = None):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=(detail if detail else "The server is busy. Try again later."),
+            headers={"Retry-After": "60"}
+        )
+    response = {
+        "model": HTTPError,
+        "description": "Service Unavailable"
+    }
+
+
 class UnauthorizedHTTPException(HTTPException):
     def __init__(self, detail: str | None = None):
         super().__init__(
@@ -0,0 +1,52 @@
+from typing import AsyncIterable, Mapping
+
+from fastapi import Response, status
+from fastapi.responses import StreamingResponse
+
+from app.config.variables import Routers as VarConfig  # type: ignore
+
+
+class SerializedJSONResponse(Response):
+    """
+    JSON response for content serialized beforehand (see utils.serialization), so that
+    the same bytes are used both for the body and for the full content length header.
+    """
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: bytes,
+        status_code: int = status.HTTP_200_OK,
+        headers: Mapping[str, str] | None = None
+    ) -> None:
+        super().__init__(
+            content=content,
+            status_code=status_code,
+            headers={
+                **(headers or {}),
+                VarConfig.FULL_CONTENT_LENGTH_HEADER: str(len(content))
+            }
+        )
+
+
+class EventStreamResponse(StreamingResponse):
+    """Stream of server-sent events (see utils.serialization.get_event_message())."""
+    media_type = "text/event-stream"
+
+    def __init__(self, content: AsyncIterable[bytes]) -> None:
+        super().__init__(
+            content,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+
+class NotModifiedResponse(Response):
+    """304 response to a conditional GET request whose If-None-Match matched."""
+
+    def __init__(self, etag: str) -> None:
+        super().__init__(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag}
+        )
+
+    response = {"description": "Not Modified"}
@@ -1,33 +1,66 @@
 from typing import Annotated
 
 from beanie.odm.fields import PydanticObjectId
-from fastapi import APIRouter, BackgroundTasks, Depends, status
+from fastapi import APIRouter, Depends, status
 
 from app.auth.users import get_current_active_basic_user
-from app.crud.audios import (  # type: ignore
-    async_delete_item_block_audio_db_s3, async_delete_item_block_audio_s3,
-    async_set_item_block_batch_audio_in_progress, process_item_block_audio,
-)
+from app.crud.audio_events import async_iter_item_audio_events
+from app.crud.audios import async_delete_item_block_audio_db_s3  # type: ignore
 from app.crud.blocks import (
-    async_get_item_block_audio, async_get_item_block_batch_read_block_ids,
-    async_get_item_block_db, async_list_item_block_audios_db,
+    async_get_item_block_audio, async_get_item_block_db,
+    async_get_item_block_id_range_db, async_request_item_block_batch_audio_db_s3,
 )
 from app.crud.items import (  # type: ignore
-    async_get_block_batch_ids_from_block_id_range, async_get_user_id_model_item_db,
-    async_get_user_item_db, process_item_read_block_batch_audio,
+    async_get_user_id_model_item_db, async_get_user_item_db,
 )
+from app.crud.jobs import async_enqueue_block_batch_audio_job, async_enqueue_job
+from app.crud.raw import async_list_item_block_audios_raw
 from app.models.blocks import BlockAudio, BlockIdListIn, BlockIdRange
-from app.models.fields import AudioStatus, Bodies, Queries
+from app.models.fields import Bodies, Headers, JobType, Queries
 from app.models.responses import ShortResponse
 from app.models.users import BasicUser
 from app.routers.http_exceptions import (
     BadGatewayHTTPException, BadRequestHTTPException, InternalServerErrorHTTPException,
     NotFoundHTTPException, UnauthorizedHTTPException,
 )
+from app.routers.responses import (
+    EventStreamResponse, NotModifiedResponse, SerializedJSONResponse,
+)
+from app.utils.etags import etag_matches, get_content_etag
+from app.utils.serialization import dumps, dumps_model
 
 router = APIRouter()
 
 
+# before "/{block_id}" routes, which would match "events"
+@router.get(
+    "/events",
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Stream the audio status changes of item :{id}: as server-sent events: a "
+        "\"snapshot\" event with a list of :BlockAudio: models, then an \"audio\" "
+        "event with a :BlockAudio: model for each block whose audio changes. "
+        "The stream is closed after an hour; clients reconnect and get a new snapshot."
+    ),
+    response_class=EventStreamResponse,
+    responses={
+        status.HTTP_400_BAD_REQUEST: BadRequestHTTPException.response,
+        status.HTTP_401_UNAUTHORIZED: UnauthorizedHTTPException.response,
+        status.HTTP_404_NOT_FOUND: NotFoundHTTPException.response
+    }
+)
+async def stream_item_audio_events(
+    id: PydanticObjectId,
+    user: BasicUser = Depends(get_current_active_basic_user)
+):
+    # can raise HTTP_400_BAD_REQUEST
+    item = await async_get_user_id_model_item_db(user.id, id)  # IdModel
+    if not item:
+        raise NotFoundHTTPException(f"item :{id}: not found.")
+
+    return EventStreamResponse(async_iter_item_audio_events(item.id))
+
+
 @router.post(
     "/{block_id}",
     status_code=status.HTTP_202_ACCEPTED,
@@ -40,7 +73,6 @@ router = APIRouter()
     }
 )
 async def request_block_audio(
-    background_tasks: BackgroundTasks,
     id: PydanticObjectId,
     block_id: PydanticObjectId,
     user: BasicUser = Depends(get_current_active_basic_user)
@@ -59,12 +91,14 @@ async def request_block_audio(
             "Set :read: to True before requesting audio."
         )
 
-    await async_delete_item_block_audio_s3(item_db.owner_id, item_db.id, block_db.id)
-    await block_db.set({
-        "audio_status": AudioStatus.IN_PROGRESS,
-        "audio_path": None
-    })
-    background_tasks.add_task(process_item_block_audio, item_db, block_db)
+    # Can raise HTTP_502_BAD_GATEWAY
+    if not await async_request_item_block_batch_audio_db_s3(
+        item_db.owner_id, item_db.id, block_ids=[block_db.id]
+    ):  # :read: set to False concurrently
+        raise BadRequestHTTPException(f"block :{block_id}: has :read:=False.")
+    await async_enqueue_job(
+        item_db.owner_id, JobType.BLOCK_AUDIO, item_id=item_db.id, block_id=block_db.id
+    )
 
     return ShortResponse(message="OK")
 
@@ -76,6 +110,7 @@ async def request_block_audio(
     response_model=BlockAudio,
     response_model_exclude_none=True,
     responses={
+        status.HTTP_304_NOT_MODIFIED: NotModifiedResponse.response,
         status.HTTP_400_BAD_REQUEST: BadRequestHTTPException.response,
         status.HTTP_401_UNAUTHORIZED: UnauthorizedHTTPException.response,
         status.HTTP_404_NOT_FOUND: NotFoundHTTPException.response
@@ -84,6 +119,7 @@ async def request_block_audio(
 async def get_block_audio(
     id: PydanticObjectId,
     block_id: PydanticObjectId,
+    if_none_match: Annotated[str | None, Headers.if_none_match] = None,
     user: BasicUser = Depends(get_current_active_basic_user)
 ):
     # can raise HTTP_400_BAD_REQUEST
@@ -95,7 +131,13 @@ async def get_block_audio(
     if not block_audio:
         raise NotFoundHTTPException(f"Block :{block_id}: not found.")
 
-    return block_audio
+    # audio status changes do not increment the item version; use a content hash
+    block_audio_bytes = dumps_model(block_audio)
+    etag = get_content_etag(block_audio_bytes)
+    if etag_matches(if_none_match, etag):
+        return NotModifiedResponse(etag)
+
+    return SerializedJSONResponse(block_audio_bytes, headers={"ETag": etag})
 
 
 @router.delete(
@@ -147,13 +189,15 @@ async def delete_block_audio(
 )
 # https://fastapi.tiangolo.com/tutorial/schema-extra-example/
 async def request_block_batch_audio(
-    background_tasks: BackgroundTasks,
     id: PydanticObjectId,
     block_ids: Annotated[
         BlockIdListIn | BlockIdRange | None,
         Bodies.block_ids_list_or_range
     ] = None,
     only_missing: Annotated[bool, Queries.only_missing_audio_flag] = False,
+    position_block_id: Annotated[
+        PydanticObjectId | None, Queries.position_block_id
+    ] = None,
     user: BasicUser = Depends(get_current_active_basic_user)
 ):
     # Can raise HTTP_400_BAD_REQUEST
@@ -165,26 +209,30 @@ async def request_block_batch_audio(
     if isinstance(block_ids, BlockIdListIn):
         block_ids_ = block_ids.block_ids
     elif isinstance(block_ids, BlockIdRange):
-        # Can raise HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
-        block_ids_ = await async_get_block_batch_ids_from_block_id_range(
+        # Can raise HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND,
+        # HTTP_500_INTERNAL_SERVER_ERROR
+        block_ids_ = await async_get_item_block_id_range_db(
             item_db.id,
             start_id=block_ids.start_id,
             end_id=block_ids.end_id
         )
 
+    # Selects and sets the read blocks in progress at once.
     # Can raise HTTP_502_BAD_GATEWAY
-    read_block_ids = await async_get_item_block_batch_read_block_ids(
-        item_db.id, block_ids=block_ids_, only_missing=only_missing
+    read_block_ids = await async_request_item_block_batch_audio_db_s3(
+        item_db.owner_id, item_db.id, block_ids=block_ids_, only_missing=only_missing
     )
     if not read_block_ids:
         raise BadRequestHTTPException(
             "No blocks with :read:=True in request. "
             "Set :read:=True in some block before requesting audio."
         )
-    # Can raise HTTP_502_BAD_GATEWAY
-    await async_set_item_block_batch_audio_in_progress(item_db, read_block_ids)
-    background_tasks.add_task(
-        process_item_read_block_batch_audio, item_db, read_block_ids
+    # Coalesced with queued requests for the item
+    await async_enqueue_block_batch_audio_job(
+        item_db.owner_id,
+        item_db.id,
+        read_block_ids,
+        position_block_id=position_block_id
     )
 
     return ShortResponse(message="OK")
@@ -198,6 +246,7 @@ async def request_block_batch_audio(
     response_model=list[BlockAudio],
     response_model_exclude_none=True,
     responses={
+        status.HTTP_304_NOT_MODIFIED: NotModifiedResponse.response,
         status.HTTP_400_BAD_REQUEST: BadRequestHTTPException.response,
         status.HTTP_401_UNAUTHORIZED: UnauthorizedHTTPException.response,
         status.HTTP_404_NOT_FOUND: NotFoundHTTPException.response
@@ -209,6 +258,7 @@ async def list_item_block_audios(
         BlockIdListIn | BlockIdRange | None,
         Bodies.block_ids_list_or_range
     ] = None,
+    if_none_match: Annotated[str | None, Headers.if_none_match] = None,
     user: BasicUser = Depends(get_current_active_basic_user)
 ):
     # can raise HTTP_400_BAD_REQUEST
@@ -221,11 +271,21 @@ async def list_item_block_audios(
         block_ids_ = block_ids.block_ids
     elif isinstance(block_ids, BlockIdRange):
         # type(block_ids) == BlockIdRange
-        # Can raise HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
-        block_ids_ = await async_get_block_batch_ids_from_block_id_range(
+        # Can raise HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND,
+        # HTTP_500_INTERNAL_SERVER_ERROR
+        block_ids_ = await async_get_item_block_id_range_db(
             item.id,
             start_id=block_ids.start_id,
             end_id=block_ids.end_id,
         )
 
-    return await async_list_item_block_audios_db(item.id, block_ids=block_ids_)
+    # :BlockAudio: dicts, read without instantiating models
+    block_audios = await async_list_item_block_audios_raw(item.id, block_ids=block_ids_)
+
+    # audio status changes do not increment the item version; use a content hash
+    block_audios_bytes = dumps(block_audios)
+    etag = get_content_etag(block_audios_bytes)
+    if etag_matches(if_none_match, etag):
+        return NotModifiedResponse(etag)
+
+    return SerializedJSONResponse(block_audios_bytes, headers={"ETag": etag})
@@ -1,24 +1,30 @@
 from typing import Annotated
 
 from beanie.odm.fields import PydanticObjectId
-from fastapi import APIRouter, BackgroundTasks, Depends, status
+from fastapi import APIRouter, Depends, status
 
 from app.auth.users import get_current_active_basic_user
-from app.crud.audios import get_audios_for_item_blocks  # type: ignore
-from app.crud.blocks import (  # type: ignore
+from app.crud.blocks import (
     async_add_item_block_db, async_delete_item_block_db_s3,
-    async_get_block_out_from_block_db, async_get_item_block_db,
-    async_get_item_block_out_db, async_replace_item_block_db_s3,
+    async_edit_item_blocks_db_s3, async_get_block_out_from_block_db,
+    async_get_item_block_db, async_move_item_block_db, async_replace_item_block_db_s3,
 )
 from app.crud.items import async_get_user_id_model_item_db, async_get_user_item_db
-from app.models.blocks import BlockIn, BlockInPrevId, BlockOut
-from app.models.fields import AudioStatus, Bodies, Queries
+from app.crud.jobs import async_enqueue_job
+from app.crud.raw import async_get_item_block_out_raw
+from app.models.blocks import (
+    BlockEditListIn, BlockEditListOut, BlockIn, BlockInPrevId, BlockOut, BlockPrevId,
+)
+from app.models.fields import AudioStatus, Bodies, Headers, JobType, Queries
 from app.models.responses import ShortResponse
 from app.models.users import BasicUser
 from app.routers.http_exceptions import (
     BadGatewayHTTPException, BadRequestHTTPException, InternalServerErrorHTTPException,
     NotFoundHTTPException, UnauthorizedHTTPException,
 )
+from app.routers.responses import NotModifiedResponse, SerializedJSONResponse
+from app.utils.etags import etag_matches, get_version_etag
+from app.utils.serialization import dumps
 
 router = APIRouter()
 
@@ -30,6 +36,7 @@ router = APIRouter()
     response_model=BlockOut,
     response_model_exclude_none=True,
     responses={
+        status.HTTP_304_NOT_MODIFIED: NotModifiedResponse.response,
         status.HTTP_400_BAD_REQUEST: BadRequestHTTPException.response,
         status.HTTP_401_UNAUTHORIZED: UnauthorizedHTTPException.response,
         status.HTTP_404_NOT_FOUND: NotFoundHTTPException.response,
@@ -40,19 +47,26 @@ router = APIRouter()
 async def get_block(
     id: PydanticObjectId,
     block_id: PydanticObjectId,
+    if_none_match: Annotated[str | None, Headers.if_none_match] = None,
     user: BasicUser = Depends(get_current_active_basic_user)
 ):
     # can raise HTTP_400_BAD_REQUEST
-    item = await async_get_user_id_model_item_db(user.id, id)  # IdModel
+    item = await async_get_user_id_model_item_db(user.id, id)  # ItemIdDocStatus
     if not item:
         raise NotFoundHTTPException(f"item {id}: not found.")
 
-    # Can raise HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
-    block_out = await async_get_item_block_out_db(item.id, block_id)  # BlockOut
+    # The item version is incremented whenever its blocks or spans change
+    etag = get_version_etag(item.id, item.version, block_id)
+    if etag_matches(if_none_match, etag):
+        return NotModifiedResponse(etag)
+
+    # :BlockOut: dict, read without instantiating models
+    # Can raise HTTP_500_INTERNAL_SERVER_ERROR
+    block_out = await async_get_item_block_out_raw(item.id, block_id)
     if not block_out:
         raise NotFoundHTTPException(f"block {block_id}: not found.")
 
-    return block_out
+    return SerializedJSONResponse(dumps(block_out), headers={"ETag": etag})
 
 
 @router.post(
@@ -72,7 +86,6 @@ async def get_block(
     }
 )
 async def create_new_block(
-    background_tasks: BackgroundTasks,
     id: PydanticObjectId,
     prev_block_id_and_block: Annotated[BlockInPrevId, Bodies.prev_block_id_and_block],
     get_audio: Annotated[bool, Queries.audio_flag] = False,
@@ -92,11 +105,52 @@ async def create_new_block(
 
     if get_audio:
         await block_db.set({"audio_status": AudioStatus.IN_PROGRESS})
-        background_tasks.add_task(get_audios_for_item_blocks, item_db, [block_out])
+        await async_enqueue_job(
+            item_db.owner_id,
+            JobType.BLOCKS_AUDIOS,
+            item_id=item_db.id,
+            block_ids=[block_db.id]
+        )
 
     return block_out
 
 
+@router.post(
+    "/batch",
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Insert, replace, delete and move blocks in a single request. Edits are "
+        "applied in order, as if sent one at a time to the single block endpoints, "
+        "and written in a single transaction. Replaced blocks need :read:=True."
+    ),
+    response_description="A :BlockEditListOut: model with the inserted block ids",
+    response_model=BlockEditListOut,
+    responses={
+        status.HTTP_400_BAD_REQUEST: BadRequestHTTPException.response,
+        status.HTTP_401_UNAUTHORIZED: UnauthorizedHTTPException.response,
+        status.HTTP_404_NOT_FOUND: NotFoundHTTPException.response,
+        status.HTTP_500_INTERNAL_SERVER_ERROR:
+            InternalServerErrorHTTPException.response,
+        status.HTTP_502_BAD_GATEWAY: BadGatewayHTTPException.response
+    }
+)
+async def edit_blocks(
+    id: PydanticObjectId,
+    block_edits: Annotated[BlockEditListIn, Bodies.block_edits],
+    user: BasicUser = Depends(get_current_active_basic_user)
+):
+    # can raise HTTP_400_BAD_REQUEST
+    item = await async_get_user_id_model_item_db(user.id, id)  # ItemIdDocStatus
+    if not item:
+        raise NotFoundHTTPException(f"item {id}: not found.")
+
+    # Can raise HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND,
+    # HTTP_500_INTERNAL_SERVER_ERROR, HTTP_502_BAD_GATEWAY
+    block_ids = await async_edit_item_blocks_db_s3(user.id, item.id, block_edits.edits)
+
+    return BlockEditListOut(block_ids=block_ids)
+
+
 @router.put(
     "/{block_id}",
     status_code=status.HTTP_200_OK,
@@ -114,7 +168,6 @@ async def create_new_block(
     }
 )
 async def update_block(
-    background_tasks: BackgroundTasks,
     id: PydanticObjectId,
     block_id: PydanticObjectId,
     block: Annotated[BlockIn, Bodies.block_in],
@@ -144,11 +197,52 @@ async def update_block(
         await block_db.set({
             "audio_status": AudioStatus.IN_PROGRESS, "audio_path": None
         })
-        background_tasks.add_task(get_audios_for_item_blocks, item_db, [block_out])
+        await async_enqueue_job(
+            item_db.owner_id,
+            JobType.BLOCKS_AUDIOS,
+            item_id=item_db.id,
+            block_ids=[block_db.id]
+        )
 
     return block_out
 
 
+@router.put(
+    "/{block_id}/move",
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Move block :{block_id}: after block :{prev_block_id}:. "
+        "The block spans and audio are kept."
+    ),
+    response_model=ShortResponse,
+    responses={
+        status.HTTP_400_BAD_REQUEST: BadRequestHTTPException.response,
+        status.HTTP_401_UNAUTHORIZED: UnauthorizedHTTPException.response,
+        status.HTTP_404_NOT_FOUND: NotFoundHTTPException.response,
+        status.HTTP_500_INTERNAL_SERVER_ERROR:
+            InternalServerErrorHTTPException.response
+    }
+)
+async def move_block(
+    id: PydanticObjectId,
+    block_id: PydanticObjectId,
+    prev_block_id_in: Annotated[BlockPrevId, Bodies.prev_block_id],
+    user: BasicUser = Depends(get_current_active_basic_user)
+):
+    # can raise HTTP_400_BAD_REQUEST
+    item = await async_get_user_id_model_item_db(user.id, id)  # ItemIdDocStatus
+    if not item:
+        raise NotFoundHTTPException(f"item {id}: not found.")
+
+    # Can raise HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
+    if not await async_move_item_block_db(
+        item.id, block_id, prev_block_id_in.prev_block_id
+    ):
+        raise NotFoundHTTPException(f"block {block_id}: not found.")
+
+    return ShortResponse(message="OK")
+
+
 @router.delete(
     "/{block_id}",
     status_code=status.HTTP_200_OK,
@@ -1,30 +1,38 @@
 from typing import Annotated
 
 from beanie.odm.fields import PydanticObjectId
-from fastapi import (
-    APIRouter, BackgroundTasks, Depends, File, Form, Response, UploadFile, status,
-)
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, UploadFile, status
+from fastapi.responses import StreamingResponse
 from pydantic import Json, NonNegativeInt, PositiveInt
 
 from app.auth.users import get_current_active_basic_user
+from app.config.executors import QueueFullError, get_ingest_executor
 from app.config.variables import Routers as VarConfig  # type: ignore
 from app.crud.items import (  # type: ignore
     async_add_basic_item_db, async_delete_user_item_db_s3,
-    async_get_item_out_from_item_db, async_get_user_basic_item_db,
-    async_get_user_item_db, process_item_audios, upload_cover_and_document,
+    async_get_item_document_blocks, async_get_item_out_from_item_db,
+    async_get_user_basic_item_db, async_get_user_item_db,
+    async_iter_item_document_ndjson, get_item_out_bytes,
+    iter_cached_item_document_ndjson, upload_cover_and_document,
 )
+from app.crud.jobs import async_enqueue_job
 from app.crud.users import async_list_user_items_db
-from app.models.fields import AudioOptions, Queries
+from app.models.fields import AudioOptions, Headers, JobType, Queries
 from app.models.items import BasicItem, CoverInfo, ItemIn, ItemOut
 from app.models.responses import ShortResponse
 from app.models.users import BasicUser
 from app.routers.http_exceptions import (
     BadGatewayHTTPException, BadRequestHTTPException, InternalServerErrorHTTPException,
-    NotFoundHTTPException, UnauthorizedHTTPException, UnsupportedMediaTypeHTTPException,
+    NotFoundHTTPException, ServiceUnavailableHTTPException, UnauthorizedHTTPException,
+    UnsupportedMediaTypeHTTPException,
 )
+from app.routers.responses import NotModifiedResponse, SerializedJSONResponse
 from app.utils.aws import get_default_cover_s3_key  # type: ignore
+from app.utils.cache import get_document_cache, get_document_length_cache
+from app.utils.etags import etag_matches, get_version_etag
 from app.utils.files import verify_image_file, verify_item_file
 from app.utils.items import verify_voice_info  # type: ignore
+from app.utils.serialization import dumps_model
 
 router = APIRouter()
 
@@ -76,6 +84,7 @@ async def get_item(
     response_model=ItemOut,
     response_model_exclude_none=True,
     responses={
+        status.HTTP_304_NOT_MODIFIED: NotModifiedResponse.response,
         status.HTTP_400_BAD_REQUEST: BadRequestHTTPException.response,
         status.HTTP_401_UNAUTHORIZED: UnauthorizedHTTPException.response,
         status.HTTP_404_NOT_FOUND: NotFoundHTTPException.response,
@@ -84,24 +93,42 @@ async def get_item(
     }
 )
 async def get_item_document(
-    background_tasks: BackgroundTasks,
     id: PydanticObjectId,
-    response: Response,
     start_page: Annotated[NonNegativeInt | None, Queries.start_page] = None,
     end_page: Annotated[PositiveInt | None, Queries.end_page] = None,
     get_audios: Annotated[AudioOptions | None, Queries.audio_options] = None,
+    if_none_match: Annotated[str | None, Headers.if_none_match] = None,
     user: BasicUser = Depends(get_current_active_basic_user)
 ):
     if ((start_page is not None) and
             (end_page is not None) and
             (start_page >= end_page)):
-        BadRequestHTTPException(":start_page: should be smaller than :end_page:")
+        raise BadRequestHTTPException(
+            ":start_page: should be smaller than :end_page:"
+        )
 
     # can raise HTTP_400_BAD_REQUEST
     item_db = await async_get_user_item_db(user.id, id)
     if not item_db:
         raise NotFoundHTTPException(f"item {id}: not found.")
 
+    # The item version is incremented whenever its blocks or spans change
+    etag = get_version_etag(item_db.id, item_db.version)
+    if get_audios is None:
+        if etag_matches(if_none_match, etag):
+            return NotModifiedResponse(etag)
+
+        # Serve serialized blocks from the document cache (keyed on the item version)
+        # can raise HTTP_500_INTERNAL_SERVER_ERROR
+        document_blocks = await async_get_item_document_blocks(item_db)
+        return SerializedJSONResponse(
+            get_item_out_bytes(
+                item_db,
+                document_blocks.get_page_range(start_page, end_page)
+            ),
+            headers={"ETag": etag}
+        )
+
     # can raise HTTP_404_NOT_FOUND, HTTP_500_INTERNAL_SERVER_ERROR
     item_out = await async_get_item_out_from_item_db(
         item_db,
@@ -109,24 +136,100 @@ async def get_item_document(
         end_page=end_page
     )
 
-    # Add full content length header
-    # https://fastapi.tiangolo.com/advanced/response-headers/
-    # https://stackoverflow.com/questions/39047624/
-    # is-there-an-easy-way-to-estimate-size-of-a-json-object
-    response.headers[VarConfig.FULL_CONTENT_LENGTH_HEADER] = (
-        str(len(item_out.json()))
+    # Serialize once; the same bytes give the full content length header and the body
+    # https://fastapi.tiangolo.com/advanced/custom-response/#return-a-response
+    item_out_bytes = dumps_model(item_out)
+    # Process blocks; generate audios for blocks with :read:=True
+    # (and process blocks with missing audios if :audios: is :AudioOptions.missing:)
+    await async_enqueue_job(
+        item_db.owner_id,
+        JobType.ITEM_AUDIOS,
+        item_id=item_db.id,
+        start_page=start_page,
+        end_page=end_page,
+        only_missing=(True if get_audios is AudioOptions.MISSING else False)
+    )
+
+    return SerializedJSONResponse(item_out_bytes, headers={"ETag": etag})
+
+
+@router.get(
+    "/{id}/document/stream",
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Stream the item document as newline-delimited JSON: a :BaseItemOut: model "
+        "in the first line, followed by one :BlockOut: model per line."
+    ),
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_304_NOT_MODIFIED: NotModifiedResponse.response,
+        status.HTTP_400_BAD_REQUEST: BadRequestHTTPException.response,
+        status.HTTP_401_UNAUTHORIZED: UnauthorizedHTTPException.response,
+        status.HTTP_404_NOT_FOUND: NotFoundHTTPException.response,
+        status.HTTP_500_INTERNAL_SERVER_ERROR:
+            InternalServerErrorHTTPException.response
+    }
+)
+async def stream_item_document(
+    id: PydanticObjectId,
+    start_page: Annotated[NonNegativeInt | None, Queries.start_page] = None,
+    end_page: Annotated[PositiveInt | None, Queries.end_page] = None,
+    if_none_match: Annotated[str | None, Headers.if_none_match] = None,
+    user: BasicUser = Depends(get_current_active_basic_user)
+):
+    if ((start_page is not None) and
+            (end_page is not None) and
+            (start_page >= end_page)):
+        raise BadRequestHTTPException(
+            ":start_page: should be smaller than :end_page:"
+        )
+
+    # can raise HTTP_400_BAD_REQUEST
+    item_db = await async_get_user_item_db(user.id, id)
+    if not item_db:
+        raise NotFoundHTTPException(f"item {id}: not found.")
+
+    etag = get_version_etag(item_db.id, item_db.version)
+    if etag_matches(if_none_match, etag):
+        return NotModifiedResponse(etag)
+
+    # If the current item version is in the document cache, stream it from there
+    document_blocks = await get_document_cache().async_get(
+        (item_db.id, item_db.version)
     )
-    if get_audios is not None:
-        # Process blocks; generate audios for blocks with :read:=True
-        # (and process blocks with missing audios if :audios: is :AudioOptions.missing:)
-        background_tasks.add_task(
-            process_item_audios,
+    if document_blocks is not None:
+        document_length, lines = iter_cached_item_document_ndjson(
             item_db,
-            item_out,
-            only_missing=(True if get_audios is AudioOptions.MISSING else False)
+            document_blocks.get_page_range(start_page, end_page)
+        )
+        return StreamingResponse(
+            lines,
+            media_type="application/x-ndjson",
+            headers={
+                "ETag": etag,
+                VarConfig.FULL_CONTENT_LENGTH_HEADER: str(document_length)
+            }
         )
 
-    return item_out
+    # The full content length is only known once the document was streamed for the
+    # current item version; otherwise, the response is chunked.
+    headers: dict[str, str] = {"ETag": etag}
+    document_length = get_document_length_cache().get(
+        (item_db.id, item_db.version, start_page, end_page)
+    )
+    if document_length is not None:
+        headers[VarConfig.FULL_CONTENT_LENGTH_HEADER] = str(document_length)
+
+    # can raise HTTP_500_INTERNAL_SERVER_ERROR while streaming
+    return StreamingResponse(
+        async_iter_item_document_ndjson(
+            item_db,
+            start_page=start_page,
+            end_page=end_page
+        ),
+        media_type="application/x-ndjson",
+        headers=headers
+    )
 
 
 @router.delete(
@@ -167,7 +270,9 @@ async def delete_item(
         status.HTTP_415_UNSUPPORTED_MEDIA_TYPE:
             UnsupportedMediaTypeHTTPException.response,
         status.HTTP_502_BAD_GATEWAY:
-            BadGatewayHTTPException.response
+            BadGatewayHTTPException.response,
+        status.HTTP_503_SERVICE_UNAVAILABLE:
+            ServiceUnavailableHTTPException.response
     },
 )
 async def upload_item(
@@ -183,10 +288,24 @@ async def upload_item(
     if cover is not None:
         verify_image_file(cover)  # can raise HTTP_415_UNSUPPORTED_MEDIA_TYPE
 
+    # The upload pipeline runs in the ingest executor threads, off the event loop;
+    # uploads are rejected while its queue is full.
+    try:
+        ingest_slot = get_ingest_executor().reserve()
+    except QueueFullError as exc:
+        raise ServiceUnavailableHTTPException(str(exc)) from exc
+
     item_id = PydanticObjectId()  # initialize new id
-    # Can raise HTTP_502_BAD_GATEWAY
-    item_db = await async_add_basic_item_db(user.id, item_id, info)
+    try:
+        # Can raise HTTP_502_BAD_GATEWAY
+        item_db = await async_add_basic_item_db(user.id, item_id, info)
+    except Exception:
+        ingest_slot.release()
+        raise
+
+    # awaited in a background task, so that the uploaded files are kept open
     background_tasks.add_task(
+        ingest_slot.async_run,
         upload_cover_and_document,
         user.id, item_id, file, info, cover=cover, page_limit=page_limit
     )
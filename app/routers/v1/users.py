@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, BackgroundTasks, Depends, status
 
-from app.auth.users import get_current_active_basic_user
-from app.models.users import BasicUser
-from app.routers.http_exceptions import UnauthorizedHTTPException
+from app.auth.users import get_current_active_basic_user, get_current_basic_user
+from app.crud.users import (
+    async_get_user_deletion_db, async_run_user_deletion_db_s3,
+    async_start_user_deletion_db,
+)
+from app.models.users import BasicUser, UserDeletionOut
+from app.routers.http_exceptions import NotFoundHTTPException, UnauthorizedHTTPException
 
 router = APIRouter()
 
@@ -18,3 +22,49 @@ router = APIRouter()
 )
 async def my_user(user: BasicUser = Depends(get_current_active_basic_user)):
     return user
+
+
+@router.delete(
+    "/me/",
+    status_code=status.HTTP_202_ACCEPTED,
+    description=(
+        "Disable the user and delete it, including its items from db and s3, in a "
+        "background job. See GET /me/deletion for its progress."
+    ),
+    response_model=UserDeletionOut,
+    response_description="A :UserDeletionOut: model",
+    responses={
+        status.HTTP_401_UNAUTHORIZED: UnauthorizedHTTPException.response
+    }
+)
+async def delete_my_user(
+    background_tasks: BackgroundTasks,
+    user: BasicUser = Depends(get_current_basic_user)
+):
+    deletion, run_deletion = await async_start_user_deletion_db(user.id)
+    if run_deletion:  # new, failed or stale deletion
+        background_tasks.add_task(async_run_user_deletion_db_s3, deletion)
+
+    return deletion
+
+
+@router.get(
+    "/me/deletion",
+    status_code=status.HTTP_200_OK,
+    description=(
+        "Progress of the user deletion. Once completed, the user no longer exists, "
+        "so this endpoint returns 401."
+    ),
+    response_model=UserDeletionOut,
+    response_description="A :UserDeletionOut: model",
+    responses={
+        status.HTTP_401_UNAUTHORIZED: UnauthorizedHTTPException.response,
+        status.HTTP_404_NOT_FOUND: NotFoundHTTPException.response
+    }
+)
+async def get_my_user_deletion(user: BasicUser = Depends(get_current_basic_user)):
+    deletion = await async_get_user_deletion_db(user.id)
+    if not deletion:
+        raise NotFoundHTTPException(f"No deletion found for user :{user.id}:.")
+
+    return deletion
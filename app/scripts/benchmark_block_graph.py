@@ -0,0 +1,129 @@
+"""
+Benchmark the construction and traversal of the in-memory block linked list for an
+item with :num_blocks: * :num_spans: spans:
+  - before: pydantic :BlockDict: (every block and span is revalidated by parse_obj());
+  - after: slotted :BlockGraph: (blocks and spans are stored as given).
+
+Usage: python3 app/scripts/benchmark_block_graph.py --num_blocks 10000 --num_spans 5
+"""
+import argparse
+import time
+import timeit
+from typing import Callable
+
+from beanie.odm.fields import PydanticObjectId
+
+from app.config.logging import get_logger
+from app.models.blocks import BlockDict, BlockGraph, BlockWithSpans
+from app.models.spans import BaseSpan, SpanIdBlockId
+
+logger = get_logger(__name__)
+
+
+def get_sample_blocks(num_blocks: int, num_spans: int) -> list[BlockWithSpans]:
+    item_id = PydanticObjectId()
+    block_ids = [PydanticObjectId() for _ in range(num_blocks)]
+    blocks: list[BlockWithSpans] = []
+    for i, block_id in enumerate(block_ids):
+        span_ids = [PydanticObjectId() for _ in range(num_spans)]
+        spans = [
+            BaseSpan(
+                id=span_id,
+                block_id=block_id,
+                text=f"This is span {j} of block {i}, with some text. ",
+                next_id=(span_ids[j + 1] if j + 1 < num_spans else None),
+                is_head=(j == 0)
+            )
+            for j, span_id in enumerate(span_ids)
+        ]
+        blocks.append(BlockWithSpans(
+            id=block_id,
+            item_id=item_id,
+            next_id=(block_ids[i + 1] if i + 1 < num_blocks else None),
+            page_nb=i // 100,
+            is_head=(i == 0),
+            head_span_ids=[span_ids[0]],
+            spans=spans
+        ))
+
+    return blocks
+
+
+def construct_block_dict(blocks: list[BlockWithSpans]) -> BlockDict:
+    """Previous construct_block_dict_from_blocks_with_spans()."""
+    block_dict = BlockDict.initialize(blocks)
+    for block in blocks:
+        block_dict.add_head_span(
+            SpanIdBlockId(id=block.head_span_ids[0], block_id=block.id)
+        )
+        for span in block.spans:
+            block_dict.add_span(span)
+
+    return block_dict
+
+
+def construct_block_graph(blocks: list[BlockWithSpans]) -> BlockGraph:
+    block_graph = BlockGraph(blocks)
+    for block in blocks:
+        block_graph.set_head_span_id(block.id, block.head_span_ids[0])
+        for span in block.spans:
+            block_graph.add_span(span)
+
+    return block_graph
+
+
+def traverse(
+    block_dict: BlockDict | BlockGraph,
+    head_block_id: PydanticObjectId
+) -> int:
+    """Follow the block and span linked lists, as aux_get_item_blocks_out()."""
+    num_spans = 0
+    cur_block_id: PydanticObjectId | None = head_block_id
+    while cur_block_id is not None:
+        cur_block = block_dict.get_block(cur_block_id)
+        span_dict = block_dict.get_span_dict(cur_block_id)
+        cur_span_id: PydanticObjectId | None = block_dict.get_head_span_id(cur_block_id)
+        while cur_span_id is not None:
+            cur_span_id = span_dict[cur_span_id].next_id
+            num_spans += 1
+        cur_block_id = cur_block.next_id
+
+    return num_spans
+
+
+def get_cpu_time(func: Callable[[], object], repeat: int) -> float:
+    return min(timeit.repeat(func, timer=time.process_time, repeat=repeat, number=1))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num_blocks", type=int, default=10000)
+    parser.add_argument("--num_spans", type=int, default=5, help="spans per block")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    blocks = get_sample_blocks(args.num_blocks, args.num_spans)
+    head_block_id = blocks[0].id
+    block_dict = construct_block_dict(blocks)
+    block_graph = construct_block_graph(blocks)
+    total_spans = args.num_blocks * args.num_spans
+    assert traverse(block_dict, head_block_id) == total_spans
+    assert traverse(block_graph, head_block_id) == total_spans
+
+    for name, construct, block_dict_ in [
+        ("BlockDict", construct_block_dict, block_dict),
+        ("BlockGraph", construct_block_graph, block_graph)
+    ]:
+        construct_time = get_cpu_time(lambda: construct(blocks), args.repeat)
+        traverse_time = get_cpu_time(
+            lambda: traverse(block_dict_, head_block_id), args.repeat
+        )
+        logger.info(
+            f"{name} ({total_spans} spans): construction "
+            f"{construct_time * 1000:.1f} ms, traversal {traverse_time * 1000:.1f} ms "
+            "of CPU time."
+        )
+
+
+if __name__ == "__main__":
+    main()
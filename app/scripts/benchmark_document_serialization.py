@@ -0,0 +1,97 @@
+"""
+Benchmark the serialization of an item document with :num_blocks: blocks:
+  - before: :ItemOut.json(): for the full content length header, plus FastAPI's
+    serialization of the returned :ItemOut: for the response body;
+  - after: a single orjson serialization, reused for the header and the body
+    (see get_item_document()).
+
+Usage: python3 app/scripts/benchmark_document_serialization.py --num_blocks 10000
+"""
+import argparse
+import json
+import time
+import timeit
+
+from beanie.odm.fields import PydanticObjectId
+from fastapi.encoders import jsonable_encoder
+
+from app.config.logging import get_logger
+from app.models.blocks import BlockOut
+from app.models.items import ItemOut
+from app.models.spans import SpanOut
+from app.utils.serialization import dumps_model
+
+logger = get_logger(__name__)
+
+
+def get_sample_item_out(num_blocks: int, num_spans: int) -> ItemOut:
+    blocks = [
+        BlockOut(
+            id=PydanticObjectId(),
+            spans=[
+                SpanOut(text=f"This is span {j} of block {i}, with some text. ")
+                for j in range(num_spans)
+            ]
+        )
+        for i in range(num_blocks)
+    ]
+    return ItemOut(
+        id=PydanticObjectId(),
+        owner_id=PydanticObjectId(),
+        title="A title",
+        author="An author",
+        language_name="A language name",
+        voice_name="A voice name",
+        blocks=blocks
+    )
+
+
+def serialize_twice(item_out: ItemOut) -> bytes:
+    """Previous :get_item_document(): path."""
+    _ = str(len(item_out.json()))  # full content length header
+    # FastAPI response serialization (see fastapi.routing.serialize_response())
+    content = jsonable_encoder(item_out, by_alias=True, exclude_none=True)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def serialize_once(item_out: ItemOut) -> bytes:
+    content = dumps_model(item_out)
+    _ = str(len(content))  # full content length header
+    return content
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num_blocks", type=int, default=10000)
+    parser.add_argument("--num_spans", type=int, default=5, help="spans per block")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    item_out = get_sample_item_out(args.num_blocks, args.num_spans)
+    assert json.loads(serialize_twice(item_out)) == json.loads(serialize_once(item_out))
+
+    results: dict[str, float] = {}
+    for name, func in [("twice", serialize_twice), ("once", serialize_once)]:
+        results[name] = min(timeit.repeat(
+            lambda: func(item_out),
+            timer=time.process_time,  # CPU time
+            repeat=args.repeat,
+            number=1
+        ))
+        logger.info(f"Serialize {name}: {results[name] * 1000:.1f} ms of CPU time.")
+
+    logger.info(
+        f"CPU saved per request for :{args.num_blocks}: blocks: "
+        f"{(results['twice'] - results['once']) * 1000:.1f} ms "
+        f"({results['twice'] / results['once']:.1f}x faster)."
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark the reads of the item document and block audios endpoints for item
+:item_id: (which should have order keys, see set_seq.py):
+  - before: Beanie documents / pydantic models, serialized with dumps_model();
+  - after: raw motor cursors mapped directly to output dicts (see crud/raw.py).
+
+Usage: python3 app/scripts/benchmark_raw_reads.py --item_id 63becf2d42a96a2f6f1ba55a
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from beanie.odm.fields import PydanticObjectId
+from starlette.datastructures import State
+
+from app.config.database import async_init_beanie_database
+from app.config.logging import get_logger
+from app.crud.blocks import async_list_item_block_audios_db
+from app.crud.items import async_get_item_blocks_out_db
+from app.crud.raw import async_get_item_blocks_out_raw, async_list_item_block_audios_raw
+from app.utils.serialization import dumps, dumps_model
+
+logger = get_logger(__name__)
+
+
+async def read_document_beanie(item_id: PydanticObjectId) -> int:
+    blocks_out = await async_get_item_blocks_out_db(item_id)
+    _ = [dumps_model(block_out) for block_out in blocks_out]
+    return sum(len(block_out.spans) for block_out in blocks_out)
+
+
+async def read_document_raw(item_id: PydanticObjectId) -> int:
+    raw_blocks = await async_get_item_blocks_out_raw(item_id)
+    assert raw_blocks is not None, "Item blocks have no order keys."
+    blocks_out, _ = raw_blocks
+    _ = [dumps(block_out) for block_out in blocks_out]
+    return sum(len(block_out["spans"]) for block_out in blocks_out)
+
+
+async def read_block_audios_beanie(item_id: PydanticObjectId) -> int:
+    block_audios = await async_list_item_block_audios_db(item_id)
+    _ = dumps([
+        block_audio.dict(by_alias=True, exclude_none=True)
+        for block_audio in block_audios
+    ])
+    return len(block_audios)
+
+
+async def read_block_audios_raw(item_id: PydanticObjectId) -> int:
+    block_audios = await async_list_item_block_audios_raw(item_id)
+    _ = dumps(block_audios)
+    return len(block_audios)
+
+
+async def async_get_objects_per_second(
+    read: Callable[[PydanticObjectId], Awaitable[int]],
+    item_id: PydanticObjectId,
+    repeat: int
+) -> float:
+    """Best of :repeat: wall times, since reads include db round trips."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        num_objects = await read(item_id)
+        best = min(best, time.perf_counter() - start)
+
+    return num_objects / best
+
+
+async def async_main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--item_id", type=PydanticObjectId, required=True)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    await async_init_beanie_database(State())
+    for name, read in [
+        ("document spans (Beanie)", read_document_beanie),
+        ("document spans (raw)", read_document_raw),
+        ("block audios (Beanie)", read_block_audios_beanie),
+        ("block audios (raw)", read_block_audios_raw),
+    ]:
+        objects_per_second = await async_get_objects_per_second(
+            read, args.item_id, args.repeat
+        )
+        logger.info(f"Read {name}: {objects_per_second:.0f} objects/s.")
+
+
+if __name__ == "__main__":
+    asyncio.run(async_main())
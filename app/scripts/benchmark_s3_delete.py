@@ -0,0 +1,156 @@
+"""
+Benchmark the deletion of an item prefix of :num_objs: s3 objs (see config/aws.py)
+against an in-memory stand-in of the s3 client, where each request takes :latency:
+seconds (so that no bucket is needed):
+  - baseline: one list_objects_v2 request (at most 1000 keys) and one delete_object
+    request per key, as before (the time for all objs is extrapolated);
+  - paginated listing and batched delete_objects over a bounded pool, sync and async.
+
+Usage: python3 app/scripts/benchmark_s3_delete.py [--num_objs 50000] [--latency 0.02]
+"""
+import argparse
+import asyncio
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator
+
+from app.config.aws import async_delete_objs_in_prefix, delete_objs_in_prefix
+from app.config.logging import get_logger
+
+logger = get_logger(__name__)
+
+PAGE_SIZE = 1000  # maximum number of keys returned by list_objects_v2
+
+
+class StandInS3Client:
+    """In-memory s3 client (sync), with :latency: seconds per request."""
+
+    def __init__(self, keys: list[str], latency: float) -> None:
+        self.keys = dict.fromkeys(keys)
+        self.latency = latency
+        self.num_requests = 0
+        self.lock = threading.Lock()
+
+    def request(self) -> None:
+        with self.lock:
+            self.num_requests += 1
+        time.sleep(self.latency)
+
+    def list_page(self, prefix: str, start_after: str) -> dict[str, Any]:
+        with self.lock:
+            keys = sorted(key for key in self.keys if key > start_after)
+        keys = [key for key in keys if key.startswith(prefix)][:PAGE_SIZE]
+        return {"KeyCount": len(keys), "Contents": [{"Key": key} for key in keys]}
+
+    def list_objects_v2(self, Bucket: str, Prefix: str) -> dict[str, Any]:
+        self.request()
+        return self.list_page(Prefix, "")
+
+    def get_paginator(self, operation_name: str) -> "StandInS3Client":
+        return self
+
+    def paginate(self, Bucket: str, Prefix: str) -> Iterator[dict[str, Any]]:
+        start_after = ""
+        while True:
+            self.request()
+            page = self.list_page(Prefix, start_after)
+            yield page
+            if page["KeyCount"] < PAGE_SIZE:
+                return
+            start_after = page["Contents"][-1]["Key"]
+
+    def delete_object(self, Bucket: str, Key: str) -> None:
+        self.request()
+        with self.lock:
+            self.keys.pop(Key, None)
+
+    def delete_objects(self, Bucket: str, Delete: dict[str, Any]) -> dict[str, Any]:
+        self.request()
+        with self.lock:
+            for obj in Delete["Objects"]:
+                self.keys.pop(obj["Key"], None)
+        return {}
+
+
+class AsyncStandInS3Client(StandInS3Client):
+    """In-memory s3 client (async), with :latency: seconds per request."""
+
+    async def async_request(self) -> None:
+        self.num_requests += 1
+        await asyncio.sleep(self.latency)
+
+    async def paginate(  # type: ignore
+        self,
+        Bucket: str,
+        Prefix: str
+    ) -> AsyncIterator[dict[str, Any]]:
+        start_after = ""
+        while True:
+            await self.async_request()
+            page = self.list_page(Prefix, start_after)
+            yield page
+            if page["KeyCount"] < PAGE_SIZE:
+                return
+            start_after = page["Contents"][-1]["Key"]
+
+    async def delete_objects(  # type: ignore
+        self,
+        Bucket: str,
+        Delete: dict[str, Any]
+    ) -> dict[str, Any]:
+        await self.async_request()
+        for obj in Delete["Objects"]:
+            self.keys.pop(obj["Key"], None)
+        return {}
+
+
+def delete_objs_in_prefix_baseline(client: StandInS3Client, prefix: str) -> int:
+    response = client.list_objects_v2(Bucket="bucket", Prefix=prefix)
+    for obj in response["Contents"]:
+        client.delete_object(Bucket="bucket", Key=obj["Key"])
+
+    return response["KeyCount"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num_objs", type=int, default=50000)
+    parser.add_argument("--latency", type=float, default=0.02, help="per request (s)")
+    args = parser.parse_args()
+
+    prefix = "user/item/"
+    keys = [f"{prefix}audio/{idx:08d}.wav" for idx in range(args.num_objs)]
+
+    client = StandInS3Client(keys, args.latency)
+    start = time.perf_counter()
+    num_deleted = delete_objs_in_prefix_baseline(client, prefix)
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"baseline: deleted :{num_deleted}: objs in {elapsed:.2f}s "
+        f"({client.num_requests} requests, "
+        f"~{elapsed * args.num_objs / num_deleted:.0f}s for all objs)."
+    )
+
+    client = StandInS3Client(keys, args.latency)
+    start = time.perf_counter()
+    num_deleted = delete_objs_in_prefix(client, "bucket", prefix)
+    logger.info(
+        f"batched (sync): deleted :{num_deleted}: objs in "
+        f"{time.perf_counter() - start:.2f}s ({client.num_requests} requests)."
+    )
+    assert not client.keys
+
+    async_client = AsyncStandInS3Client(keys, args.latency)
+    start = time.perf_counter()
+    num_deleted = asyncio.run(
+        async_delete_objs_in_prefix(async_client, "bucket", prefix)
+    )
+    logger.info(
+        f"batched (async): deleted :{num_deleted}: objs in "
+        f"{time.perf_counter() - start:.2f}s ({async_client.num_requests} requests)."
+    )
+    assert not async_client.keys
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark reads of item :item_id: with both span storage layouts (see crud/spans.py),
+which should both be populated (see embed_spans.py):
+  - the whole item document, in a single aggregation;
+  - the spans of each block, one query per block (as in GET block).
+
+Usage: python3 app/scripts/benchmark_span_storage.py --item_id 63becf2d42a96a2f6f1ba55a
+"""
+import argparse
+import time
+from typing import Callable
+
+from beanie.odm.fields import PydanticObjectId
+from starlette.datastructures import State
+
+from app.config.database import init_bunnet_database
+from app.config.logging import get_logger
+from app.crud.spans import CollectionSpanStorage, EmbeddedSpanStorage, SpanStorage
+from app.models.blocks import BlockWithSpans, BunnetBlock
+
+logger = get_logger(__name__)
+
+
+def read_document(span_storage: SpanStorage, item_id: PydanticObjectId) -> int:
+    blocks = BunnetBlock.aggregate(
+        [
+            {"$match": {"item_id": item_id}},
+            {"$sort": {"seq": 1}},
+            *span_storage.get_spans_pipeline()
+        ],
+        projection_model=BlockWithSpans
+    ).to_list()
+    return sum(len(block.spans) for block in blocks)
+
+
+def read_block_spans(
+    span_storage: SpanStorage,
+    block_ids: list[PydanticObjectId]
+) -> int:
+    return sum(len(span_storage.get_block_spans(block_id)) for block_id in block_ids)
+
+
+def get_best_time(func: Callable[[], int], repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        num_spans = func()
+        best = min(best, time.perf_counter() - start)
+
+    return best, num_spans
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--item_id", type=PydanticObjectId, required=True)
+    parser.add_argument("--num_blocks", type=int, default=100, help="for block reads")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    init_bunnet_database(State())
+    block_ids = [
+        block["_id"]
+        for block in BunnetBlock.get_motor_collection().find(
+            {"item_id": args.item_id}, {"_id": 1}
+        ).limit(args.num_blocks)
+    ]
+    for name, span_storage in [
+        ("collection", CollectionSpanStorage()),
+        ("embedded", EmbeddedSpanStorage())
+    ]:
+        document_time, num_spans = get_best_time(
+            lambda: read_document(span_storage, args.item_id), args.repeat
+        )
+        block_time, _ = get_best_time(
+            lambda: read_block_spans(span_storage, block_ids), args.repeat
+        )
+        logger.info(
+            f"{name}: document ({num_spans} spans) {document_time * 1000:.1f} ms, "
+            f"{len(block_ids)} block reads {block_time * 1000:.1f} ms."
+        )
+
+
+if __name__ == "__main__":
+    main()
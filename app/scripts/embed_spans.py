@@ -0,0 +1,88 @@
+"""
+Migrate spans from the spans collection to the embedded layout (see crud/spans.py),
+item by item. Run before setting SPAN_STORAGE="embedded". The spans collection is
+kept, so that both layouts can be benchmarked (see benchmark_span_storage.py),
+unless --drop is given. Blocks that already embed their spans are skipped.
+
+Usage: python3 app/scripts/embed_spans.py [--drop]
+"""
+import argparse
+
+from beanie.odm.fields import PydanticObjectId
+from pymongo import UpdateOne
+from starlette.datastructures import State
+
+from app.config.database import init_bunnet_database
+from app.config.logging import get_logger
+from app.crud.blocks import get_linked_list_ids, has_seq
+from app.crud.spans import CollectionSpanStorage, EmbeddedSpanStorage
+from app.models.blocks import BlockWithSpans, BunnetBlock
+from app.models.collections import Collections
+from app.utils.seq import get_seq
+
+logger = get_logger(__name__)
+
+
+def embed_item_spans(item_id: PydanticObjectId) -> int:
+    """Returns the number of embedded spans."""
+    blocks = BunnetBlock.aggregate(
+        [
+            {"$match": {"item_id": item_id, "spans": {"$exists": False}}},
+            *CollectionSpanStorage().get_spans_pipeline()
+        ],
+        projection_model=BlockWithSpans
+    ).to_list()
+
+    block_ops: list[UpdateOne] = []
+    num_spans = 0
+    for block in blocks:
+        spans = block.spans
+        if not has_seq(spans):  # follow the span linked list
+            if len(block.head_span_ids) != 1:
+                raise ValueError(f"Block :{block.id}: does not have one head span.")
+            span_dict = {span.id: span for span in spans}
+            spans = [
+                span_dict[span_id]
+                for span_id in get_linked_list_ids(spans, block.head_span_ids[0])
+            ]
+        embedded_spans = EmbeddedSpanStorage.get_embedded_spans(spans)
+        for j, embedded_span in enumerate(embedded_spans):
+            embedded_span["seq"] = get_seq(j)
+        block_ops.append(
+            UpdateOne(
+                {"_id": block.id, "spans": {"$exists": False}},
+                {"$set": {"spans": embedded_spans}}
+            )
+        )
+        num_spans += len(embedded_spans)
+
+    if block_ops:
+        BunnetBlock.get_motor_collection().bulk_write(block_ops, ordered=False)
+
+    return num_spans
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--drop", action="store_true", help="drop the spans collection afterwards"
+    )
+    args = parser.parse_args()
+
+    state = State()
+    init_bunnet_database(state)
+    item_ids = BunnetBlock.get_motor_collection().distinct(
+        "item_id", {"spans": {"$exists": False}}
+    )
+    logger.info(f"Embedding spans of :{len(item_ids)}: items.")
+    for item_id in item_ids:
+        num_spans = embed_item_spans(item_id)
+        logger.info(f"Embedded :{num_spans}: spans of item :{item_id}:.")
+
+    if args.drop:
+        state.bunnet_database.drop_collection(Collections.SPANS.value)
+        logger.info("Dropped spans collection.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Backfill the order keys (:seq:) of items created before they were introduced."""
+from starlette.datastructures import State
+
+from app.config.database import init_bunnet_database
+from app.config.logging import get_logger
+from app.crud.blocks import set_item_seq_db
+from app.models.blocks import BunnetBlock
+
+logger = get_logger(__name__)
+
+
+def main() -> None:
+    init_bunnet_database(State())
+    # items with at least one block without :seq: (missing or None)
+    item_ids = BunnetBlock.get_motor_collection().distinct("item_id", {"seq": None})
+    logger.info(f"Setting :seq: for :{len(item_ids)}: items.")
+    for item_id in item_ids:
+        set_item_seq_db(item_id)
+        logger.info(f"Set :seq: for item :{item_id}:.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Backfill the :item_id: of spans created before it was denormalized onto spans (see
+crud/blocks.py async_delete_item_blocks_db()). The item id is looked up from the span
+block and merged into the spans collection server-side, in a single aggregation.
+"""
+from starlette.datastructures import State
+
+from app.config.database import init_bunnet_database
+from app.config.logging import get_logger
+from app.models.collections import Collections
+from app.models.spans import BunnetSpan
+
+logger = get_logger(__name__)
+
+
+def main() -> None:
+    init_bunnet_database(State())
+    span_collection = BunnetSpan.get_motor_collection()
+    num_spans = span_collection.count_documents({"item_id": None})
+    logger.info(f"Setting :item_id: for :{num_spans}: spans.")
+    span_collection.aggregate([
+        {"$match": {"item_id": None}},
+        {
+            "$lookup": {
+                "from": Collections.BLOCKS.value,
+                "localField": "block_id",
+                "foreignField": "_id",
+                "pipeline": [{"$project": {"_id": 0, "item_id": 1}}],
+                "as": "block"
+            }
+        },
+        {"$unwind": "$block"},  # spans of missing blocks are left unchanged
+        {"$project": {"item_id": "$block.item_id"}},
+        {
+            "$merge": {
+                "into": Collections.SPANS.value,
+                "on": "_id",
+                "whenMatched": "merge",
+                "whenNotMatched": "discard"
+            }
+        }
+    ])
+    num_spans = span_collection.count_documents({"item_id": None})
+    logger.info(f"Spans left without :item_id:: :{num_spans}:.")
+
+
+if __name__ == "__main__":
+    main()
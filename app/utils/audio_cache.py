@@ -0,0 +1,80 @@
+"""
+Content-addressed audio cache: block audio is synthesized in sentence chunks (see
+get_audio_chunks()), each stored once in s3 under the hash of everything that
+determines its audio (see get_audio_chunk_hash()), so that regenerating an edited
+block only synthesizes its changed sentences, and identical sentences of any item
+or user are never synthesized twice.
+"""
+import hashlib
+import re
+import unicodedata
+from typing import Sequence
+
+import orjson
+
+from app.config.variables import TTS as VarConfig
+from app.config.variables import Regex as RegexVarConfig
+from app.models.fields import SpanType
+from app.models.spans import SpanOut
+from app.utils.general import is_end_of_sentence
+
+
+def normalize_chunk_text(text: str) -> str:
+    """Text normalized so that edits that do not change the speech hit the cache."""
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(RegexVarConfig.WHITESPACES_REGEX, " ", text).strip()
+
+
+def is_pause_span(span: SpanOut) -> bool:
+    return span.type_ == SpanType.PAUSE
+
+
+def get_audio_chunks(spans: Sequence[SpanOut]) -> list[list[SpanOut]]:
+    """
+    Split block :spans: (in reading order) into sentence chunks, each ending with a
+    text span that ends a sentence (see is_end_of_sentence()). Chunks without audio
+    (without pauses or text to read) are dropped.
+    """
+    chunks: list[list[SpanOut]] = []
+    chunk: list[SpanOut] = []
+    for span in spans:
+        chunk.append(span)
+        if not is_pause_span(span) and is_end_of_sentence(span.text or ""):
+            chunks.append(chunk)
+            chunk = []
+
+    if chunk:
+        chunks.append(chunk)
+
+    return [chunk for chunk in chunks if has_audio(chunk)]
+
+
+def has_audio(chunk: Sequence[SpanOut]) -> bool:
+    return any(
+        is_pause_span(span) or
+        (span.read is not False and normalize_chunk_text(span.text or ""))
+        for span in chunk
+    )
+
+
+def get_audio_chunk_hash(
+    chunk: Sequence[SpanOut],
+    language_name: str,
+    voice_name: str
+) -> str:
+    """
+    Hash of the audio of :chunk: spoken by :voice_name: in :language_name:: the
+    normalized span texts with their :read: flags, and the pause spans.
+    """
+    key = [
+        VarConfig.AUDIO_CACHE_VERSION,
+        language_name,
+        voice_name,
+        [
+            ["pause", span.pause]
+            if is_pause_span(span)
+            else ["text", normalize_chunk_text(span.text or ""), span.read is not False]
+            for span in chunk
+        ]
+    ]
+    return hashlib.sha256(orjson.dumps(key)).hexdigest()
@@ -1,11 +1,14 @@
 import os
 from functools import cache
+from typing import BinaryIO
 
 from beanie.odm.fields import PydanticObjectId
 from s3transfer.futures import TransferFuture
 
 from app.config.aws import get_async_s3_session, get_s3_client, get_s3_transfer
 from app.config.logging import get_logger
+from app.config.settings import get_settings
+from app.models.responses import S3PoolStats
 
 logger = get_logger(__name__)
 
@@ -17,6 +20,14 @@ def write_stream_to_s3(contents: bytes, s3_key: str) -> None:
     get_s3_client().write_stream_to_s3(contents, s3_key)
 
 
+def write_fileobj_to_s3(fileobj: BinaryIO, s3_key: str) -> None:
+    get_s3_client().write_fileobj_to_s3(fileobj, s3_key)
+
+
+async def async_write_stream_to_s3(contents: bytes, s3_key: str) -> None:
+    await get_async_s3_session().async_write_stream_to_s3(contents, s3_key)
+
+
 def get_s3_num_workers() -> int:
     return get_s3_client().num_workers
 
@@ -38,6 +49,27 @@ def delete_s3_obj(key: str) -> None:
     get_s3_client().delete_s3_obj(key)
 
 
+###############
+# Async client
+async def async_open_s3_client() -> None:
+    """Open the long-lived async s3 client (at startup)."""
+    if not get_settings().LOCAL:
+        await get_async_s3_session().async_open()
+
+
+async def async_close_s3_client() -> None:
+    if not get_settings().LOCAL:
+        await get_async_s3_session().async_close()
+
+
+def get_s3_pool_stats() -> S3PoolStats | None:
+    """Connection pool metrics of the async s3 client (None if LOCAL)."""
+    if get_settings().LOCAL:
+        return None
+
+    return get_async_s3_session().get_pool_stats()
+
+
 ########
 # DELETE
 async def async_delete_s3_objs_in_prefix(prefix: str) -> None:
@@ -95,6 +127,11 @@ def get_block_audio_s3_key(
     return os.path.join(block_prefix, f'{filename}.wav')
 
 
+def get_audio_chunk_s3_key(chunk_hash: str) -> str:
+    """Key of a cached audio chunk, shared by all items (see utils/audio_cache.py)."""
+    return os.path.join("some audio cache path", chunk_hash[:2], f"{chunk_hash}.wav")
+
+
 ########
 # info
 def get_language_samples_prefix(language_name: str) -> str:
@@ -0,0 +1,248 @@
+"""In-process and local on-disk caches."""
+import os
+from collections import OrderedDict
+from contextlib import suppress
+from functools import cache
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import Callable, Generic, Hashable, TypeVar
+
+import orjson
+from starlette.concurrency import run_in_threadpool
+
+from app.config.logging import get_logger
+from app.config.settings import get_settings
+from app.config.variables import Cache as VarConfig
+from app.utils.general import mkdir_if_not_exists
+
+logger = get_logger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Least recently used cache holding at most :max_size: units, where the size of each
+    value is given by :get_size: (by default, every value has size 1).
+    """
+    __slots__ = ('max_size', 'size', '_get_size', '_entries', '_lock')
+
+    def __init__(
+        self,
+        max_size: int,
+        get_size: Callable[[V], int] = lambda _: 1
+    ) -> None:
+        self.max_size = max_size
+        self.size = 0
+        self._get_size = get_size
+        self._entries: OrderedDict[K, tuple[V, int]] = OrderedDict()
+        self._lock = Lock()  # sync (Bunnet) code runs in a threadpool
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def set(self, key: K, value: V) -> None:
+        value_size = self._get_size(value)
+        if value_size > self.max_size:
+            return  # never fits
+
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, value_size)
+            self.size += value_size
+            while self.size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def pop(self, key: K) -> V | None:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            value, value_size = self._entries.pop(key)
+            self.size -= value_size
+            return value
+
+
+DocumentLengthKey = tuple[Hashable, int, int | None, int | None]
+
+
+@cache
+def get_document_length_cache() -> LRUCache[DocumentLengthKey, int]:
+    """
+    Byte length of streamed item documents.
+    Keys are (item_id, item_version, start_page, end_page).
+    """
+    return LRUCache(VarConfig.MAX_DOCUMENT_LENGTHS)
+
+
+########
+# Item documents
+DocumentKey = tuple[Hashable, int]  # (item_id, item_version)
+
+
+class DocumentBlocks:
+    """Serialized :BlockOut: models of a whole item document, in reading order."""
+    __slots__ = ('blocks', 'page_nbs', 'nbytes')
+
+    def __init__(self, blocks: list[bytes], page_nbs: list[int]) -> None:
+        assert len(blocks) == len(page_nbs)
+        self.blocks = blocks
+        self.page_nbs = page_nbs
+        self.nbytes = sum(len(block) for block in blocks)
+
+    def get_page_range(
+        self,
+        start_page: int | None = None,
+        end_page: int | None = None
+    ) -> list[bytes]:
+        """:start_page: is included and :end_page: is excluded."""
+        if start_page is None and end_page is None:
+            return self.blocks
+
+        return [
+            block for block, page_nb in zip(self.blocks, self.page_nbs)
+            if ((start_page is None or page_nb >= start_page) and
+                (end_page is None or page_nb < end_page))
+        ]
+
+
+class DocumentStore:
+    """
+    Cache of :DocumentBlocks: keyed on (item_id, item_version). Since the item version
+    is incremented on every change to its blocks, entries never need invalidation.
+    """
+
+    def get(self, key: DocumentKey) -> DocumentBlocks | None:
+        raise NotImplementedError
+
+    def set(self, key: DocumentKey, document_blocks: DocumentBlocks) -> None:
+        raise NotImplementedError
+
+    async def async_get(self, key: DocumentKey) -> DocumentBlocks | None:
+        return self.get(key)
+
+    async def async_set(
+        self,
+        key: DocumentKey,
+        document_blocks: DocumentBlocks
+    ) -> None:
+        self.set(key, document_blocks)
+
+
+class MemoryDocumentStore(DocumentStore):
+    """LRU cache with a budget of :max_bytes: of serialized blocks."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.lru_cache: LRUCache[DocumentKey, DocumentBlocks] = LRUCache(
+            max_bytes, get_size=lambda document_blocks: document_blocks.nbytes
+        )
+
+    def get(self, key: DocumentKey) -> DocumentBlocks | None:
+        return self.lru_cache.get(key)
+
+    def set(self, key: DocumentKey, document_blocks: DocumentBlocks) -> None:
+        self.lru_cache.set(key, document_blocks)
+
+
+class DiskDocumentStore(DocumentStore):
+    """
+    Local on-disk cache with a budget of :max_bytes:. Each document is saved in
+    :path:/{item_id}-{item_version}.ndjson, with the block page numbers in the first
+    line, followed by one block per line. Least recently written files are evicted.
+    """
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        mkdir_if_not_exists(path)
+
+    def get_filename(self, key: DocumentKey) -> str:
+        item_id, item_version = key
+        return os.path.join(self.path, f"{item_id}-{item_version}.ndjson")
+
+    def get(self, key: DocumentKey) -> DocumentBlocks | None:
+        try:
+            with open(self.get_filename(key), 'rb') as f:
+                page_nbs = orjson.loads(f.readline())
+                blocks = f.read().splitlines()
+        except FileNotFoundError:
+            return None
+
+        return DocumentBlocks(blocks, page_nbs)
+
+    def set(self, key: DocumentKey, document_blocks: DocumentBlocks) -> None:
+        """Errors are logged: the document is then served without being cached."""
+        try:
+            self.write(key, document_blocks)
+        except OSError as exc:
+            logger.warning(f"Could not cache document :{key}: on disk: {exc}")
+
+    def write(self, key: DocumentKey, document_blocks: DocumentBlocks) -> None:
+        """
+        Files can be removed concurrently by other requests (or processes) sharing
+        :path:, so missing files are skipped.
+        """
+        item_id, _ = key
+        for entry in os.scandir(self.path):  # remove previous item versions
+            if entry.name.startswith(f"{item_id}-"):
+                with suppress(FileNotFoundError):
+                    os.remove(entry.path)
+
+        # write to temporary file first, so that readers never see partial files
+        with NamedTemporaryFile('wb', dir=self.path, delete=False) as f:
+            try:
+                f.write(orjson.dumps(document_blocks.page_nbs) + b"\n")
+                f.write(b"\n".join(document_blocks.blocks))
+            except BaseException:
+                f.close()
+                os.remove(f.name)
+                raise
+        os.replace(f.name, self.get_filename(key))
+        self.evict()
+
+    def evict(self) -> None:
+        entry_stats: list[tuple[str, os.stat_result]] = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".ndjson"):
+                with suppress(FileNotFoundError):
+                    entry_stats.append((entry.path, entry.stat()))
+        entry_stats.sort(key=lambda entry_stat: entry_stat[1].st_mtime)
+
+        total_bytes = sum(stat.st_size for _, stat in entry_stats)
+        for entry_path, stat in entry_stats:
+            if total_bytes <= self.max_bytes:
+                break
+            total_bytes -= stat.st_size
+            with suppress(FileNotFoundError):
+                os.remove(entry_path)
+
+    async def async_get(self, key: DocumentKey) -> DocumentBlocks | None:
+        return await run_in_threadpool(self.get, key)
+
+    async def async_set(
+        self,
+        key: DocumentKey,
+        document_blocks: DocumentBlocks
+    ) -> None:
+        await run_in_threadpool(self.set, key, document_blocks)
+
+
+@cache
+def get_document_cache() -> DocumentStore:
+    if (path := get_settings().DOCUMENT_CACHE_DIR):
+        logger.info(f"Caching item documents on disk in :{path}:.")
+        return DiskDocumentStore(path, VarConfig.MAX_DISK_DOCUMENT_BYTES)
+
+    return MemoryDocumentStore(VarConfig.MAX_DOCUMENT_BYTES)
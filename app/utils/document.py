@@ -2,6 +2,7 @@ from io import BufferedReader, BytesIO
 from typing import Any
 
 from app.models.document import TDocCls, TDocObj  # type: ignore
+from app.utils.files import MemoryViewIO
 
 
 def convert_doc_obj_to_doc_class(
@@ -23,9 +24,12 @@ def convert_doc_obj_to_doc_class(
     return new_cls.construct(**new_model_dict)
 
 
-def get_file_buffered_reader(pdf_contents: bytes) -> BufferedReader:
-    file_handle = BytesIO()
-    file_handle.write(pdf_contents)
-    file_handle.seek(0)
+def get_file_buffered_reader(pdf_contents: bytes | memoryview) -> BufferedReader:
+    """
+    Buffered reader of :pdf_contents:, which are not copied: a BytesIO shares the
+    bytes it is initialized with, and views are read in place (see open_file_view()).
+    """
+    if isinstance(pdf_contents, memoryview):
+        return BufferedReader(MemoryViewIO(pdf_contents))
 
-    return BufferedReader(file_handle)  # type: ignore
+    return BufferedReader(BytesIO(pdf_contents))  # type: ignore
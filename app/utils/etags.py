@@ -0,0 +1,29 @@
+"""Entity tags for conditional GET requests (If-None-Match)."""
+from hashlib import blake2b
+from typing import Any
+
+
+def get_version_etag(*parts: Any) -> str:
+    """Strong ETag for a resource identified by :parts: (e.g. item id and version)."""
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def get_content_etag(content: bytes) -> str:
+    """Strong ETag for a serialized response body."""
+    return '"' + blake2b(content, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Whether the If-None-Match header value matches :etag:. As per RFC 9110, the
+    comparison is weak, i.e., the W/ prefix of the header entity tags is ignored.
+    """
+    if not if_none_match:
+        return False
+
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+
+    return False
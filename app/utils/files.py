@@ -1,4 +1,7 @@
-from typing import Type
+import mmap
+from contextlib import contextmanager
+from io import BytesIO, RawIOBase
+from typing import BinaryIO, Iterator, Type
 
 from fastapi import UploadFile
 
@@ -53,3 +56,58 @@ def verify_item_file(file: UploadFile) -> None:
 
 def verify_image_file(file: UploadFile) -> None:
     verify_file(file, MimeTypes=ImgMimeTypes, Extensions=ImgExtensions)
+
+
+#############
+# File views
+@contextmanager
+def open_file_view(file: BinaryIO) -> Iterator[memoryview]:
+    """
+    Read-only view of the contents of :file:, without copying them: a view of the
+    buffer of in-memory files, or of a mmap of files on disk (e.g. of the spooled
+    temporary file of an :UploadFile:). Views of the contents should not outlive the
+    context.
+    """
+    raw_file = getattr(file, "_file", file)  # SpooledTemporaryFile
+    if isinstance(raw_file, BytesIO):
+        with raw_file.getbuffer() as buffer:
+            with buffer.toreadonly() as view:
+                yield view
+        return
+
+    raw_file.flush()
+    if raw_file.seek(0, 2) == 0:  # empty files cannot be mapped
+        yield memoryview(b"")
+        return
+
+    with mmap.mmap(raw_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        with memoryview(mapped_file) as view:
+            yield view
+
+
+class MemoryViewIO(RawIOBase):
+    """Seekable binary reader over a memoryview (see open_file_view())."""
+
+    def __init__(self, view: memoryview) -> None:
+        self.view = view
+        self.pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        num_bytes = max(min(len(buffer), len(self.view) - self.pos), 0)
+        buffer[:num_bytes] = self.view[self.pos:self.pos + num_bytes]
+        self.pos += num_bytes
+        return num_bytes
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        start = (0, self.pos, len(self.view))[whence]
+        self.pos = max(start + offset, 0)
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
@@ -1,6 +1,10 @@
 """General utilities"""
+import asyncio
 import os
 import re
+from typing import Any, Callable
+
+from starlette.concurrency import run_in_threadpool
 
 from app.config.variables import Regex as VarConfig
 
@@ -11,6 +15,14 @@ def mkdir_if_not_exists(path: str) -> None:
         os.makedirs(path, mode=0o777, exist_ok=True)
 
 
+async def async_call(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Await :func:, or run it in a thread if it is sync (as BackgroundTasks do)."""
+    if asyncio.iscoroutinefunction(func):
+        return await func(*args, **kwargs)
+
+    return await run_in_threadpool(func, *args, **kwargs)
+
+
 def abs_relative_diff(s1: int | float, s2: int | float) -> float:
     """
     Return the size difference between :s1 and :s2 relative to :s2.
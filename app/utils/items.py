@@ -1,4 +1,6 @@
 import os
+import shutil
+from typing import BinaryIO
 
 from beanie.odm.fields import PydanticObjectId
 from botocore.exceptions import ClientError
@@ -6,14 +8,17 @@ from botocore.exceptions import ClientError
 from app.config.logging import LoggerClientError, get_logger
 from app.config.settings import DidWeRaise, get_settings
 from app.config.variables import Path as VarConfig  # type: ignore
+from app.crud.spans import get_span_storage
 from app.models.blocks import BunnetBlock
 from app.models.document import PageV2  # type: ignore
 from app.models.spans import BunnetSpan
 from app.models.validators import set_read_to_none_if_true
 from app.utils.aws import (
-    delete_s3_item, get_item_path, get_s3_item_obj_key, write_stream_to_s3,
+    delete_s3_item, get_item_path, get_s3_item_obj_key, write_fileobj_to_s3,
+    write_stream_to_s3,
 )
 from app.utils.general import mkdir_if_not_exists
+from app.utils.seq import get_seq
 
 logger = get_logger(__name__)
 
@@ -45,6 +50,38 @@ def upload_file(
     return s3_key
 
 
+def upload_fileobj(
+    user_id: PydanticObjectId,
+    item_id: PydanticObjectId,
+    filename: str,
+    fileobj: BinaryIO
+) -> str:
+    """
+    Like upload_file(), but :fileobj: (e.g. the spooled file of an :UploadFile:) is
+    streamed instead of being read in memory.
+    """
+    s3_key = get_s3_item_obj_key(user_id, item_id, filename)
+    if not get_settings().LOCAL:
+        try:
+            with DidWeRaise() as error_state:
+                write_fileobj_to_s3(fileobj, s3_key)
+        except ClientError as exc:
+            raise LoggerClientError(logger, exc=exc)
+        finally:
+            if error_state.exception_happened:
+                delete_s3_item(user_id, item_id)
+    else:
+        item_path = get_item_path(user_id, item_id)
+        out_path = os.path.join(VarConfig.OUTPUT, item_path)
+        mkdir_if_not_exists(out_path)
+
+        fileobj.seek(0)
+        with open(os.path.join(out_path, filename), 'wb') as f:
+            shutil.copyfileobj(fileobj, f)
+
+    return s3_key
+
+
 def insert_item_blocks_from_pages_db(
     item_id: PydanticObjectId,
     pages: list[PageV2],
@@ -80,11 +117,13 @@ def insert_item_blocks_from_pages_db(
                     BunnetSpan(
                         id=span_ids[j],
                         block_id=block_id,
+                        item_id=item_id,
                         next_id=span_next_id,
                         is_head=is_head_span,
                         type_=None,
                         text=span.text,
                         read=span_read,
+                        seq=get_seq(j),
                     )
                 )
 
@@ -105,13 +144,13 @@ def insert_item_blocks_from_pages_db(
                     page_nb=page.number,
                     is_head=is_head_block,
                     read=block_read,
-                    size_class=block.size_class
+                    size_class=block.size_class,
+                    seq=get_seq(block_idx),
                 )
             )
             block_idx += 1
 
-    BunnetSpan.insert_many(spans)
     # needed because some blocks were skipped, so we never utilize all the ids,
     # above, which would be required to make the last block have next_id=None
     blocks[-1].next_id = None
-    BunnetBlock.insert_many(blocks)
+    get_span_storage().insert_blocks(blocks, spans)
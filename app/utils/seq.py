@@ -0,0 +1,91 @@
+"""Sparse fractional order keys (:seq:) for blocks and spans."""
+from app.config.variables import Blocks as VarConfig
+
+
+def get_seq(idx: int) -> float:
+    """Order key of the element at (0-based) position :idx: of a list."""
+    return (idx + 1) * VarConfig.SEQ_GAP
+
+
+def get_seq_between(
+    prev_seq: float | None,
+    next_seq: float | None
+) -> float | None:
+    """
+    Order key for an element inserted between elements with keys :prev_seq: and
+    :next_seq: (None if the element is inserted at the head or tail of the list).
+    Returns None if there is no room left between :prev_seq: and :next_seq:,
+    in which case the list needs to be renumbered.
+    """
+    if prev_seq is None and next_seq is None:
+        return get_seq(0)
+    elif prev_seq is None:
+        assert next_seq is not None
+        return next_seq - VarConfig.SEQ_GAP
+    elif next_seq is None:
+        return prev_seq + VarConfig.SEQ_GAP
+
+    seq = (prev_seq + next_seq) / 2
+    if not (prev_seq < seq < next_seq):
+        return None  # float precision exhausted
+
+    return seq
+
+
+def get_seqs_between(
+    prev_seq: float | None,
+    next_seq: float | None,
+    num: int
+) -> list[float] | None:
+    """
+    Order keys for :num: consecutive elements inserted between elements with keys
+    :prev_seq: and :next_seq: (see get_seq_between()).
+    Returns None if there is no room left between :prev_seq: and :next_seq:.
+    """
+    if prev_seq is None and next_seq is None:
+        return [get_seq(idx) for idx in range(num)]
+    elif prev_seq is None:
+        assert next_seq is not None
+        return [next_seq - (num - idx) * VarConfig.SEQ_GAP for idx in range(num)]
+    elif next_seq is None:
+        return [prev_seq + (idx + 1) * VarConfig.SEQ_GAP for idx in range(num)]
+
+    step = (next_seq - prev_seq) / (num + 1)
+    seqs = [prev_seq + (idx + 1) * step for idx in range(num)]
+    bounded_seqs = [prev_seq, *seqs, next_seq]
+    if any(cur >= nxt for cur, nxt in zip(bounded_seqs[:-1], bounded_seqs[1:])):
+        return None  # float precision exhausted
+
+    return seqs
+
+
+def fill_seqs(seqs: list[float | None]) -> list[float] | None:
+    """
+    Fill the missing order keys of a list whose existing keys are increasing, by
+    spreading each run of missing keys between its neighbours.
+    Returns None if there is no room left, in which case the list needs renumbering.
+    """
+    filled_seqs: list[float] = []
+    num_missing = 0  # length of the current run of missing keys
+    for seq in seqs:
+        if seq is None:
+            num_missing += 1
+            continue
+        if num_missing:
+            run_seqs = get_seqs_between(
+                (filled_seqs[-1] if filled_seqs else None), seq, num_missing
+            )
+            if run_seqs is None:
+                return None
+            filled_seqs.extend(run_seqs)
+            num_missing = 0
+        filled_seqs.append(seq)
+
+    if num_missing:  # run at the tail, always with room
+        run_seqs = get_seqs_between(
+            (filled_seqs[-1] if filled_seqs else None), None, num_missing
+        )
+        assert run_seqs is not None
+        filled_seqs.extend(run_seqs)
+
+    return filled_seqs
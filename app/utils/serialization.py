@@ -0,0 +1,28 @@
+"""Fast JSON serialization of output models."""
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from pydantic import BaseModel
+
+
+def orjson_default(obj: Any) -> Any:
+    """Serialize types not natively supported by orjson."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+
+    raise TypeError(f"Type :{type(obj)}: is not JSON serializable.")
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=orjson_default)
+
+
+def get_event_message(event: str, data: Any) -> bytes:
+    """Server-sent event :event: with JSON :data:."""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+def dumps_model(model: BaseModel) -> bytes:
+    """Serialize :model: as FastAPI would with :response_model_exclude_none:=True."""
+    return dumps(model.dict(by_alias=True, exclude_none=True))
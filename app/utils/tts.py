@@ -0,0 +1,130 @@
+"""
+Scheduling of block audio synthesis (TTS) in a worker process (see app/worker.py):
+  - at most :MAX_CONCURRENCY: blocks of the same voice are synthesized at a time
+    (overridden per voice in :VOICE_MAX_CONCURRENCY:), across all batches;
+  - each batch is consumed in priority order by as many consumers as its voice
+    allows, so that concurrent batches of the same voice interleave;
+  - a block already being synthesized is not synthesized again: duplicate requests
+    wait for the running synthesis.
+"""
+import asyncio
+from collections import deque
+from functools import cache
+from typing import Awaitable, Callable, Sequence
+
+from beanie.odm.fields import PydanticObjectId
+
+from app.config.logging import get_logger
+from app.config.variables import TTS as VarConfig
+
+logger = get_logger(__name__)
+
+BlockSynthesis = Callable[[PydanticObjectId], Awaitable[None]]
+
+
+def get_reading_order(
+    block_seqs: Sequence[tuple[PydanticObjectId, float]],
+    position_seq: float | None = None
+) -> list[PydanticObjectId]:
+    """
+    Order blocks (:block_seqs: (id, seq) pairs) for synthesis: the blocks from the
+    reading position :position_seq: onwards first, then the blocks before it, each
+    in reading (:seq:) order.
+    """
+    return [
+        block_id
+        for block_id, _ in sorted(
+            block_seqs,
+            key=lambda block_seq: (
+                position_seq is not None and block_seq[1] < position_seq,
+                block_seq[1]
+            )
+        )
+    ]
+
+
+class TTSScheduler:
+
+    def __init__(
+        self,
+        max_concurrency: int = VarConfig.MAX_CONCURRENCY,
+        voice_max_concurrency: dict[str, int] | None = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.voice_max_concurrency = (
+            VarConfig.VOICE_MAX_CONCURRENCY
+            if voice_max_concurrency is None
+            else voice_max_concurrency
+        )
+        self._voice_semaphores: dict[str, asyncio.Semaphore] = {}
+        self._in_flight: dict[PydanticObjectId, asyncio.Event] = {}
+
+    def get_voice_max_concurrency(self, voice_name: str) -> int:
+        return self.voice_max_concurrency.get(voice_name, self.max_concurrency)
+
+    def get_voice_semaphore(self, voice_name: str) -> asyncio.Semaphore:
+        if voice_name not in self._voice_semaphores:
+            self._voice_semaphores[voice_name] = asyncio.Semaphore(
+                self.get_voice_max_concurrency(voice_name)
+            )
+
+        return self._voice_semaphores[voice_name]
+
+    @property
+    def num_in_flight(self) -> int:
+        return len(self._in_flight)
+
+    async def async_synthesize(
+        self,
+        voice_name: str,
+        block_id: PydanticObjectId,
+        synthesize: BlockSynthesis
+    ) -> None:
+        """
+        Run :synthesize: for block :block_id:, unless it is already running, in which
+        case wait for it to finish. Exceptions are only raised to the first caller.
+        """
+        in_flight = self._in_flight.get(block_id)
+        if in_flight is not None:
+            await in_flight.wait()
+            return
+
+        self._in_flight[block_id] = asyncio.Event()
+        try:
+            async with self.get_voice_semaphore(voice_name):
+                await synthesize(block_id)
+        finally:
+            self._in_flight.pop(block_id).set()
+
+    async def async_synthesize_blocks(
+        self,
+        voice_name: str,
+        block_ids: Sequence[PydanticObjectId],
+        synthesize: BlockSynthesis
+    ) -> list[PydanticObjectId]:
+        """
+        Synthesize blocks :block_ids:, started in the given (priority) order, so that
+        the wall time is proportional to the number of blocks over the voice
+        concurrency. Returns the ids of the blocks whose synthesis failed.
+        """
+        pending = deque(block_ids)
+        failed_block_ids: list[PydanticObjectId] = []
+
+        async def async_consume() -> None:
+            while pending:
+                block_id = pending.popleft()
+                try:
+                    await self.async_synthesize(voice_name, block_id, synthesize)
+                except Exception as exc:
+                    logger.warning(f"Synthesis of block :{block_id}: failed: {exc}")
+                    failed_block_ids.append(block_id)
+
+        num_consumers = min(self.get_voice_max_concurrency(voice_name), len(pending))
+        await asyncio.gather(*(async_consume() for _ in range(num_consumers)))
+
+        return failed_block_ids
+
+
+@cache
+def get_tts_scheduler() -> TTSScheduler:
+    return TTSScheduler()
@@ -0,0 +1,203 @@
+"""
+Job worker: runs the jobs enqueued by the API (see crud/jobs.py), outside the web
+server process. Start one or more with:
+  python3 -m app.worker
+"""
+import asyncio
+import os
+import signal
+import socket
+from typing import Awaitable, Callable
+
+from starlette.datastructures import State
+
+from app.config.database import async_init_databases
+from app.config.logging import get_logger
+from app.config.variables import Jobs as VarConfig
+from app.crud.audio_batches import async_process_item_block_batch_audio
+from app.crud.audios import (  # type: ignore
+    get_audios_for_item_blocks, process_item_block_audio,
+)
+from app.crud.blocks import async_get_block_out_from_block_db, async_get_item_block_db
+from app.crud.items import (  # type: ignore
+    async_get_item_out_from_item_db, process_item_audios,
+)
+from app.crud.jobs import (
+    async_claim_job, async_complete_job, async_extend_job_lease, async_fail_job,
+)
+from app.models.fields import JobType
+from app.models.items import Item
+from app.models.jobs import Job
+from app.utils.aws import async_close_s3_client, async_open_s3_client
+from app.utils.general import async_call
+
+logger = get_logger(__name__)
+
+
+async def async_get_job_item_db(job: Job) -> Item | None:
+    item_db = await Item.find_one(
+        {"_id": job.args["item_id"], "owner_id": job.owner_id}
+    )
+    if not item_db:
+        logger.info(f"Item :{job.args['item_id']}: of job :{job.id}: was deleted.")
+
+    return item_db
+
+
+async def async_run_item_audios_job(job: Job) -> None:
+    item_db = await async_get_job_item_db(job)
+    if not item_db:
+        return
+
+    item_out = await async_get_item_out_from_item_db(
+        item_db,
+        start_page=job.args["start_page"],
+        end_page=job.args["end_page"]
+    )
+    await async_call(
+        process_item_audios, item_db, item_out, only_missing=job.args["only_missing"]
+    )
+
+
+async def async_run_block_audio_job(job: Job) -> None:
+    item_db = await async_get_job_item_db(job)
+    if not item_db:
+        return
+
+    block_db = await async_get_item_block_db(item_db.id, job.args["block_id"])
+    if not block_db:
+        logger.info(f"Block :{job.args['block_id']}: of job :{job.id}: was deleted.")
+        return
+
+    await async_call(process_item_block_audio, item_db, block_db)
+
+
+async def async_run_block_batch_audio_job(job: Job) -> None:
+    item_db = await async_get_job_item_db(job)
+    if not item_db:
+        return
+
+    await async_process_item_block_batch_audio(
+        item_db,
+        job.args["block_ids"],
+        position_block_id=job.args.get("position_block_id")
+    )
+
+
+async def async_run_blocks_audios_job(job: Job) -> None:
+    item_db = await async_get_job_item_db(job)
+    if not item_db:
+        return
+
+    block_outs = []
+    for block_id in job.args["block_ids"]:
+        block_db = await async_get_item_block_db(item_db.id, block_id)
+        if block_db:  # else deleted
+            block_outs.append(await async_get_block_out_from_block_db(block_db))
+
+    if block_outs:
+        await async_call(get_audios_for_item_blocks, item_db, block_outs)
+
+
+JOB_HANDLERS: dict[JobType, Callable[[Job], Awaitable[None]]] = {
+    JobType.ITEM_AUDIOS: async_run_item_audios_job,
+    JobType.BLOCK_AUDIO: async_run_block_audio_job,
+    JobType.BLOCK_BATCH_AUDIO: async_run_block_batch_audio_job,
+    JobType.BLOCKS_AUDIOS: async_run_blocks_audios_job,
+}
+
+
+class Worker:
+    """Claims and runs up to :num_concurrent_jobs: jobs at a time."""
+
+    def __init__(self, num_concurrent_jobs: int = VarConfig.NUM_CONCURRENT_JOBS):
+        self.id = f"{socket.gethostname()}:{os.getpid()}"
+        self.num_concurrent_jobs = num_concurrent_jobs
+        self._stopping = asyncio.Event()
+        self._job_tasks: set[asyncio.Task] = set()
+
+    def stop(self) -> None:
+        """Stop claiming jobs; running jobs are finished."""
+        logger.info(f"Worker :{self.id}: stopping ({len(self._job_tasks)} jobs).")
+        self._stopping.set()
+
+    async def async_keep_lease(self, job: Job) -> None:
+        """Renew the lease of :job: until it is lost (returns) or cancelled."""
+        while True:
+            await asyncio.sleep(VarConfig.LEASE_SECONDS / 3)
+            if not await async_extend_job_lease(job):
+                logger.warning(f"Worker :{self.id}: lost the lease of job :{job.id}:.")
+                return
+
+    async def async_run_job(self, job: Job) -> None:
+        """
+        Run :job: while keeping its lease. If the lease is lost (or cannot be
+        renewed), the job may have been claimed by another worker: it is cancelled
+        (work already handed to threads finishes) and its status is left to its new
+        claimant.
+        """
+        handler_task = asyncio.create_task(JOB_HANDLERS[JobType(job.type_)](job))
+        lease_task = asyncio.create_task(self.async_keep_lease(job))
+        try:
+            await asyncio.wait(
+                (handler_task, lease_task), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not handler_task.done():  # lease lost
+                handler_task.cancel()
+                await asyncio.gather(handler_task, return_exceptions=True)
+                logger.warning(f"Job :{job.id}: ({job.type_}) cancelled.")
+                return
+
+            exc = handler_task.exception()
+            if exc is not None:
+                logger.error(
+                    f"Job :{job.id}: ({job.type_}) failed: {exc}", exc_info=exc
+                )
+                await async_fail_job(job, str(exc))
+            else:
+                await async_complete_job(job)
+        finally:
+            lease_task.cancel()
+            handler_task.cancel()  # if this task is cancelled
+
+    async def async_wait(self, seconds: float) -> None:
+        """Sleep :seconds:, or until the worker is stopped or a job finishes."""
+        waits = [asyncio.create_task(self._stopping.wait()), *self._job_tasks]
+        await asyncio.wait(waits, timeout=seconds, return_when=asyncio.FIRST_COMPLETED)
+        waits[0].cancel()
+
+    async def async_run(self) -> None:
+        logger.info(f"Worker :{self.id}: started.")
+        while not self._stopping.is_set():
+            job = None
+            if len(self._job_tasks) < self.num_concurrent_jobs:
+                job = await async_claim_job(self.id)
+
+            if job is None:
+                await self.async_wait(VarConfig.POLL_SECONDS)
+                continue
+
+            task = asyncio.create_task(self.async_run_job(job))
+            self._job_tasks.add(task)
+            task.add_done_callback(self._job_tasks.discard)
+
+        if self._job_tasks:
+            await asyncio.wait(self._job_tasks)
+
+
+async def async_main() -> None:
+    await async_init_databases(State())
+    await async_open_s3_client()
+    worker = Worker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.async_run()
+    finally:
+        await async_close_s3_client()
+
+
+if __name__ == "__main__":
+    asyncio.run(async_main())
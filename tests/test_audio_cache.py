@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.crud import audio_chunks
+from app.models.fields import SpanType
+from app.models.spans import SpanOut
+from app.utils.audio_cache import get_audio_chunk_hash, get_audio_chunks
+
+
+def get_spans(*texts: str | int) -> list[SpanOut]:
+    """Text spans, and pause spans for ints."""
+    return [
+        SpanOut.parse_obj({"type": SpanType.PAUSE, "pause": text})
+        if isinstance(text, int)
+        else SpanOut(text=text)
+        for text in texts
+    ]
+
+
+def test_get_audio_chunks():
+    spans = get_spans("A first ", "sentence. ", 250, "A second one! ", "No end")
+    assert get_audio_chunks(spans) == [spans[:2], spans[2:4], spans[4:]]
+    # chunks without audio are dropped
+    spans = get_spans("Not read. ", "Read.")
+    spans[0].read = False
+    assert get_audio_chunks(spans) == [spans[1:]]
+
+
+def test_get_audio_chunk_hash():
+    def get_hash(*texts: str | int, voice_name: str = "voice") -> str:
+        return get_audio_chunk_hash(get_spans(*texts), "en", voice_name)
+
+    # normalized text
+    assert get_hash("A  sentence.\n") == get_hash("A sentence.")
+    assert get_hash("Cafe\u0301.") == get_hash("Caf\u00e9.")  # decomposed, composed
+    # different audio
+    assert get_hash("A sentence.") != get_hash("a sentence.")
+    assert get_hash("A sentence.") != get_hash("A sentence.", voice_name="other")
+    assert get_hash(250, "A sentence.") != get_hash(500, "A sentence.")
+    unread_spans = get_spans("A sentence.")
+    unread_spans[0].read = False
+    assert get_audio_chunk_hash(unread_spans, "en", "voice") != get_hash("A sentence.")
+
+
+def test_async_get_block_audio_chunk_keys(monkeypatch: pytest.MonkeyPatch):
+    spans = get_spans("Cached. ", "New. ", "Cached. ")
+    cached_hash = get_audio_chunk_hash(spans[:1], "en", "voice")
+    added_hashes: list[str] = []
+
+    async def async_get_cached_audio_chunk_keys(chunk_hashes: list[str]):
+        return {h: f"key-{h}" for h in chunk_hashes if h == cached_hash}
+
+    async def async_add_cached_audio_chunk(chunk_hash: str, contents: bytes) -> str:
+        added_hashes.append(chunk_hash)
+        return f"key-{chunk_hash}"
+
+    monkeypatch.setattr(
+        audio_chunks,
+        "async_get_cached_audio_chunk_keys",
+        async_get_cached_audio_chunk_keys
+    )
+    monkeypatch.setattr(
+        audio_chunks, "async_add_cached_audio_chunk", async_add_cached_audio_chunk
+    )
+    synthesized: list[list[SpanOut]] = []
+
+    async def async_synthesize(chunk: list[SpanOut]) -> bytes:
+        synthesized.append(chunk)
+        return b"RIFF"
+
+    s3_keys = asyncio.run(audio_chunks.async_get_block_audio_chunk_keys(
+        spans + spans[1:2], "en", "voice", async_synthesize
+    ))
+    # only the new chunk is synthesized, once
+    assert synthesized == [spans[1:2]]
+    assert len(added_hashes) == 1
+    assert s3_keys == [
+        f"key-{cached_hash}", f"key-{added_hashes[0]}",
+        f"key-{cached_hash}", f"key-{added_hashes[0]}"
+    ]
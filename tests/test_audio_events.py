@@ -0,0 +1,108 @@
+import asyncio
+
+import orjson
+import pytest
+from beanie.odm.fields import PydanticObjectId
+
+from app.config.variables import Events as VarConfig
+from app.crud import audio_events
+from app.crud.audio_events import get_block_audio_changes
+
+
+def test_get_block_audio_changes():
+    block_ids = [PydanticObjectId() for _ in range(2)]
+    block_audios = {
+        block_id: {"_id": block_id, "audio_status": "in progress"}
+        for block_id in block_ids
+    }
+    completed = {
+        "_id": block_ids[1], "audio_status": "completed", "audio_path": "path.wav"
+    }
+    new_block_audios = [{"_id": block_ids[0], "audio_status": "in progress"}, completed]
+    assert get_block_audio_changes(block_audios, new_block_audios) == [completed]
+    assert block_audios[block_ids[1]] == completed
+    assert get_block_audio_changes(block_audios, new_block_audios) == []
+
+
+def test_async_iter_item_audio_events_polling(monkeypatch: pytest.MonkeyPatch):
+    block_id = PydanticObjectId()
+    reads = iter([
+        [{"_id": block_id, "audio_status": "in progress"}],  # snapshot
+        [{"_id": block_id, "audio_status": "in progress"}],
+        [{"_id": block_id, "audio_status": "completed", "audio_path": "path.wav"}],
+    ])
+
+    async def async_list_item_block_audios_raw(item_id: PydanticObjectId):
+        return next(reads)
+
+    async def async_supports_change_streams() -> bool:
+        return False
+
+    monkeypatch.setattr(
+        audio_events,
+        "async_list_item_block_audios_raw",
+        async_list_item_block_audios_raw
+    )
+    monkeypatch.setattr(
+        audio_events, "async_supports_change_streams", async_supports_change_streams
+    )
+    monkeypatch.setattr(VarConfig, "POLL_SECONDS", 0.)
+
+    async def main() -> list[bytes]:
+        events = audio_events.async_iter_item_audio_events(PydanticObjectId())
+        return [await events.__anext__() for _ in range(2)]
+
+    snapshot, audio = asyncio.run(main())
+    assert snapshot.startswith(b"retry: 5000\nevent: snapshot\ndata: ")
+    assert audio.startswith(b"event: audio\ndata: ")
+    assert orjson.loads(audio.split(b"data: ")[1]) == {
+        "_id": str(block_id), "audio_status": "completed", "audio_path": "path.wav"
+    }
+
+
+def test_async_iter_item_audio_events_snapshot_after_watch(
+    monkeypatch: pytest.MonkeyPatch
+):
+    block_id = PydanticObjectId()
+    calls: list[str] = []
+
+    class ChangeStream:
+        async def __aenter__(self):
+            calls.append("watch")
+            return self
+
+        async def __aexit__(self, *args):
+            pass
+
+        async def try_next(self):
+            return {"fullDocument": {"_id": block_id, "audio_status": "completed"}}
+
+    class Collection:
+        def watch(self, *args, **kwargs):
+            return ChangeStream()
+
+    async def async_list_item_block_audios_raw(item_id: PydanticObjectId):
+        calls.append("snapshot")
+        return [{"_id": block_id, "audio_status": "in progress"}]
+
+    async def async_supports_change_streams() -> bool:
+        return True
+
+    monkeypatch.setattr(audio_events.Block, "get_motor_collection", Collection)
+    monkeypatch.setattr(
+        audio_events,
+        "async_list_item_block_audios_raw",
+        async_list_item_block_audios_raw
+    )
+    monkeypatch.setattr(
+        audio_events, "async_supports_change_streams", async_supports_change_streams
+    )
+
+    async def main() -> list[bytes]:
+        events = audio_events.async_iter_item_audio_events(PydanticObjectId())
+        return [await events.__anext__() for _ in range(2)]
+
+    snapshot, audio = asyncio.run(main())
+    assert calls == ["watch", "snapshot"]
+    assert b"event: snapshot" in snapshot
+    assert orjson.loads(audio.split(b"data: ")[1])["audio_status"] == "completed"
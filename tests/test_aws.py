@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from app.config.aws import (
+    async_delete_objs_in_prefix, delete_objs_in_prefix, iter_key_batches,
+)
+from app.config.variables import AWS as VarConfig
+from app.scripts.benchmark_s3_delete import AsyncStandInS3Client, StandInS3Client
+
+
+def test_iter_key_batches():
+    keys = [str(idx) for idx in range(VarConfig.DELETE_BATCH_SIZE + 1)]
+    batches = list(iter_key_batches(keys))
+    assert [len(batch) for batch in batches] == [VarConfig.DELETE_BATCH_SIZE, 1]
+    assert [key for batch in batches for key in batch] == keys
+
+
+def test_delete_objs_in_prefix():
+    keys = [f"item/{idx:05d}" for idx in range(2500)] + ["other_item/0"]
+
+    client = StandInS3Client(keys, latency=0)
+    assert delete_objs_in_prefix(client, "bucket", "item/", num_workers=2) == 2500
+    assert list(client.keys) == ["other_item/0"]
+    assert client.num_requests == 3 + 3  # paginated listing + delete_objects
+
+    async_client = AsyncStandInS3Client(keys, latency=0)
+    assert asyncio.run(
+        async_delete_objs_in_prefix(async_client, "bucket", "item/", num_workers=2)
+    ) == 2500
+    assert list(async_client.keys) == ["other_item/0"]
+
+
+def test_async_delete_objs_in_prefix_listing_error():
+    keys = [f"item/{idx:05d}" for idx in range(2500)]
+    async_client = AsyncStandInS3Client(keys, latency=0.01)
+    paginate = async_client.paginate
+
+    async def failing_paginate(Bucket: str, Prefix: str):
+        async for page in paginate(Bucket, Prefix):
+            yield page
+            raise ConnectionError("Listing failed.")  # after the first page
+
+    async_client.paginate = failing_paginate  # type: ignore
+
+    async def main() -> set[asyncio.Task]:
+        with pytest.raises(ConnectionError):
+            await async_delete_objs_in_prefix(
+                async_client, "bucket", "item/", num_workers=2
+            )
+        return asyncio.all_tasks() - {asyncio.current_task()}
+
+    assert asyncio.run(main()) == set()  # no deletes left running
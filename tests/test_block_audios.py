@@ -0,0 +1,47 @@
+import pytest
+from beanie.odm.fields import PydanticObjectId
+
+from app.config.logging import LoggerOSError, LoggerValueError
+from app.crud.blocks import get_linked_list_range_ids, get_read_block_query_dict
+from app.models.blocks import BlockOrder
+from app.models.fields import AudioStatus
+
+
+def test_get_read_block_query_dict():
+    item_id = PydanticObjectId()
+    block_ids = [PydanticObjectId(), PydanticObjectId()]
+
+    assert get_read_block_query_dict(item_id) == {
+        "item_id": item_id, "read": {"$ne": False}
+    }
+    assert get_read_block_query_dict(item_id, block_ids, only_missing=True) == {
+        "item_id": item_id,
+        "read": {"$ne": False},
+        "_id": {"$in": block_ids},
+        "audio_status": {"$ne": AudioStatus.COMPLETED}
+    }
+
+
+def test_get_linked_list_range_ids():
+    block_ids = [PydanticObjectId() for _ in range(4)]
+    blocks = [
+        BlockOrder(
+            id=block_id,
+            next_id=(block_ids[idx + 1] if idx < len(block_ids) - 1 else None),
+            page_nb=idx // 2
+        )
+        for idx, block_id in enumerate(block_ids)
+    ]
+    blocks.reverse()  # found in any order
+
+    assert get_linked_list_range_ids(blocks, block_ids[1]) == block_ids[1:]
+    assert get_linked_list_range_ids(
+        blocks, block_ids[1], end_id=block_ids[2]
+    ) == block_ids[1:3]
+    assert get_linked_list_range_ids(
+        blocks, block_ids[3], end_id=block_ids[3]
+    ) == block_ids[3:]
+    with pytest.raises(LoggerValueError):  # end before start
+        get_linked_list_range_ids(blocks, block_ids[2], end_id=block_ids[1])
+    with pytest.raises(LoggerOSError):  # broken list
+        get_linked_list_range_ids(blocks[1:], block_ids[0])
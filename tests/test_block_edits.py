@@ -0,0 +1,131 @@
+import pytest
+from beanie.odm.fields import PydanticObjectId
+from pydantic import ValidationError
+
+from app.crud.blocks import (
+    apply_block_edits, get_edited_block_orders, get_move_block_updates,
+)
+from app.models.blocks import BlockEdit, BlockIn, BlockOrderRead
+from app.routers.http_exceptions import NotFoundHTTPException
+from app.utils.seq import get_seq
+
+
+def get_blocks(num_blocks: int, with_seq: bool = True) -> list[BlockOrderRead]:
+    block_ids = [PydanticObjectId() for _ in range(num_blocks)]
+    return [
+        BlockOrderRead(
+            id=block_id,
+            next_id=(block_ids[idx + 1] if idx < num_blocks - 1 else None),
+            is_head=(idx == 0),
+            page_nb=idx,
+            seq=(get_seq(idx) if with_seq else None)
+        )
+        for idx, block_id in enumerate(block_ids)
+    ]
+
+
+def test_block_edit_validation():
+    with pytest.raises(ValidationError):
+        BlockEdit(op="replace", block_id=PydanticObjectId())
+    with pytest.raises(ValidationError):
+        BlockEdit(op="delete")
+
+
+def test_apply_block_edits():
+    a, b, c, d = [block.id for block in get_blocks(4)]
+    block_in = BlockIn(spans=[{"text": "Some text."}])
+    edited_ids, inserted, replaced, moved = apply_block_edits([a, b, c, d], [
+        BlockEdit(op="insert", prev_block_id=a, blocks=[block_in, block_in]),
+        BlockEdit(op="replace", block_id=b, block=block_in),
+        BlockEdit(op="delete", block_id=c),
+        BlockEdit(op="move", block_id=d),  # to head
+    ])
+    new_1, new_2 = inserted
+    assert edited_ids == [d, a, new_1, new_2, b]
+    assert list(replaced) == [b]
+    assert moved == {d}
+
+    with pytest.raises(NotFoundHTTPException):
+        apply_block_edits([a, b], [BlockEdit(op="delete", block_id=c)])
+
+
+def test_apply_block_edits_of_inserted_blocks(monkeypatch):
+    a, b = [block.id for block in get_blocks(2)]
+    new_id = PydanticObjectId()
+    # ids of inserted blocks are generated in apply_block_edits()
+    monkeypatch.setattr("app.crud.blocks.PydanticObjectId", lambda: new_id)
+    block_in = BlockIn(spans=[{"text": "Some text."}])
+    other_block_in = BlockIn(spans=[{"text": "Other text."}])
+
+    edited_ids, inserted, replaced, _ = apply_block_edits([a, b], [
+        BlockEdit(op="insert", prev_block_id=a, blocks=[block_in]),
+        BlockEdit(op="replace", block_id=new_id, block=other_block_in),
+    ])
+    assert edited_ids == [a, new_id, b]
+    assert inserted == {new_id: other_block_in}
+    assert not replaced
+
+    edited_ids, inserted, replaced, moved = apply_block_edits([a, b], [
+        BlockEdit(op="insert", prev_block_id=a, blocks=[block_in]),
+        BlockEdit(op="move", block_id=new_id),
+        BlockEdit(op="delete", block_id=new_id),
+    ])
+    assert edited_ids == [a, b]
+    assert not inserted and not replaced and not moved
+
+
+@pytest.mark.parametrize("with_seq", [True, False])
+def test_get_edited_block_orders(with_seq: bool):
+    blocks = get_blocks(3, with_seq=with_seq)
+    new_id = PydanticObjectId()
+    block_ids = [blocks[2].id, blocks[0].id, new_id, blocks[1].id]
+    block_orders = get_edited_block_orders(blocks, block_ids, {blocks[2].id})
+
+    assert [block.id for block in block_orders] == block_ids
+    assert [block.next_id for block in block_orders] == [*block_ids[1:], None]
+    assert [block.is_head for block in block_orders] == [True, None, None, None]
+    assert [block.page_nb for block in block_orders] == [0, 0, 0, 1]
+    seqs = [block.seq for block in block_orders]
+    assert seqs == sorted(set(seqs))
+    if with_seq:  # blocks that kept their position keep their order key
+        assert seqs[1] == blocks[0].seq and seqs[3] == blocks[1].seq
+
+
+@pytest.mark.parametrize(
+    "block_idx, prev_block_idx, expected_order", [
+        (3, None, [3, 0, 1, 2]),  # tail to head
+        (0, 3, [1, 2, 3, 0]),  # head to tail
+        (0, 1, [1, 0, 2, 3]),  # head after next block
+        (2, 0, [0, 2, 1, 3]),
+    ]
+)
+def test_get_move_block_updates(
+    block_idx: int,
+    prev_block_idx: int | None,
+    expected_order: list[int]
+):
+    blocks = get_blocks(4)
+    block = blocks[block_idx]
+    old_prev_block = blocks[block_idx - 1] if block_idx > 0 else None
+    other_blocks = [block_ for block_ in blocks if block_ is not block]
+    prev_block = blocks[prev_block_idx] if prev_block_idx is not None else None
+    next_idx = (other_blocks.index(prev_block) + 1) if prev_block else 0
+    next_block = other_blocks[next_idx] if next_idx < len(other_blocks) else None
+
+    block_updates = get_move_block_updates(
+        block, old_prev_block, prev_block, next_block, seq=None
+    )
+    assert len(block_updates) <= 3  # the three affected pointers
+    for block_ in blocks:
+        for field, value in block_updates.get(block_.id, {}).items():
+            setattr(block_, field, value)
+
+    head_blocks = [block_ for block_ in blocks if block_.is_head]
+    assert len(head_blocks) == 1
+    block_dict = {block_.id: block_ for block_ in blocks}
+    order: list[int] = []
+    cur_block: BlockOrderRead | None = head_blocks[0]
+    while cur_block is not None:
+        order.append(blocks.index(cur_block))
+        cur_block = block_dict.get(cur_block.next_id)  # type: ignore
+    assert order == expected_order
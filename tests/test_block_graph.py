@@ -0,0 +1,42 @@
+import pytest
+from beanie.odm.fields import PydanticObjectId
+
+from app.models.blocks import BaseBlock, BlockGraph, BlockOut
+from app.models.spans import BaseSpan
+
+
+def test_block_graph():
+    item_id = PydanticObjectId()
+    blocks = [
+        BaseBlock(id=PydanticObjectId(), item_id=item_id, page_nb=0) for _ in range(2)
+    ]
+    blocks[0].next_id = blocks[1].id
+    block_graph = BlockGraph(blocks)
+    assert len(block_graph) == 2
+    assert block_graph.get_block(blocks[1].id) is blocks[1]  # not revalidated
+    assert block_graph.get_next_block_id(blocks[0].id) == blocks[1].id
+
+    span = BaseSpan(id=PydanticObjectId(), block_id=blocks[0].id, text="Some text.")
+    block_graph.set_head_span_id(blocks[0].id, span.id)
+    block_graph.add_span(span)
+    assert block_graph.get_head_span_id(blocks[0].id) == span.id
+    assert block_graph.get_span_dict(blocks[0].id) == {span.id: span}
+    assert block_graph.get_span_dict(blocks[1].id) == {}
+
+    with pytest.raises(KeyError):
+        block_graph.get_head_span_id(blocks[1].id)  # no head span
+    with pytest.raises(KeyError):
+        block_graph.get_block(PydanticObjectId())
+
+
+def test_construct_from_block():
+    block = BaseBlock(id=PydanticObjectId(), item_id=PydanticObjectId(), page_nb=0)
+    span = BaseSpan(id=PydanticObjectId(), block_id=block.id, text="Some text.")
+    span_out = BaseSpan.convert_to_span_out(span)
+    assert span_out.dict() == {"type_": None, "pause": None, "text": "Some text.",
+                               "read": None}
+
+    block_out = BlockOut.construct_from_block(block, [span_out])
+    assert block_out.dict(by_alias=True, exclude_none=True) == {
+        "_id": block.id, "spans": [{"text": "Some text."}]
+    }
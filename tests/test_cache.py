@@ -0,0 +1,64 @@
+from app.utils import cache
+from app.utils.cache import (
+    DiskDocumentStore, DocumentBlocks, LRUCache, MemoryDocumentStore,
+)
+
+
+def test_lru_cache_eviction():
+    lru_cache: LRUCache[str, int] = LRUCache(2)
+    lru_cache.set("a", 1)
+    lru_cache.set("b", 2)
+    assert lru_cache.get("a") == 1  # "b" is now the least recently used
+    lru_cache.set("c", 3)
+    assert "b" not in lru_cache
+    assert lru_cache.get("a") == 1
+    assert lru_cache.get("c") == 3
+
+
+def test_document_blocks_page_range():
+    document_blocks = DocumentBlocks([b'{"a":0}', b'{"b":1}', b'{"c":1}'], [0, 1, 1])
+    assert document_blocks.get_page_range() == document_blocks.blocks
+    assert document_blocks.get_page_range(1) == [b'{"b":1}', b'{"c":1}']
+    assert document_blocks.get_page_range(end_page=1) == [b'{"a":0}']
+    assert document_blocks.get_page_range(2) == []
+
+
+def test_memory_document_store():
+    document_store = MemoryDocumentStore(max_bytes=16)
+    document_store.set(("item", 0), DocumentBlocks([b"x" * 10], [0]))
+    document_store.set(("item", 1), DocumentBlocks([b"y" * 10], [0]))
+    assert document_store.get(("item", 0)) is None  # evicted (over budget)
+    assert document_store.get(("item", 1)).blocks == [b"y" * 10]
+
+
+def test_disk_document_store(tmp_path):
+    document_store = DiskDocumentStore(str(tmp_path), max_bytes=1024)
+    document_blocks = DocumentBlocks([b'{"a":0}', b'{"b":1}'], [0, 1])
+    document_store.set(("item", 0), document_blocks)
+    cached = document_store.get(("item", 0))
+    assert cached.blocks == document_blocks.blocks
+    assert cached.page_nbs == document_blocks.page_nbs
+
+    # a new item version replaces the previous one
+    document_store.set(("item", 1), document_blocks)
+    assert document_store.get(("item", 0)) is None
+    assert document_store.get(("item", 1)) is not None
+
+
+def test_disk_document_store_concurrent_removal(tmp_path, monkeypatch):
+    document_store = DiskDocumentStore(str(tmp_path), max_bytes=16)
+    document_store.set(("item", 0), DocumentBlocks([b"x" * 10], [0]))
+
+    def remove(path: str) -> None:  # removed by another request first
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(cache.os, "remove", remove)
+    document_store.set(("other_item", 0), DocumentBlocks([b"y" * 10], [0]))
+    assert document_store.get(("other_item", 0)) is not None
+
+
+def test_disk_document_store_write_error(tmp_path):
+    document_store = DiskDocumentStore(str(tmp_path / "cache"), max_bytes=1024)
+    (tmp_path / "cache").rmdir()  # e.g. cache dir cleared
+    document_store.set(("item", 0), DocumentBlocks([b"x"], [0]))  # not raised
+    assert document_store.get(("item", 0)) is None
@@ -0,0 +1,66 @@
+import asyncio
+
+from bson import ObjectId
+from pymongo.results import DeleteResult
+
+from app.config.database import async_delete_in_batches, has_collection_scan
+
+
+def test_has_collection_scan():
+    index_scan_plan = {
+        "stage": "FETCH",
+        "inputStage": {"stage": "IXSCAN", "indexName": "item_id_1_seq_1"}
+    }
+    assert not has_collection_scan(index_scan_plan)
+    assert has_collection_scan({"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}})
+    assert has_collection_scan({  # slot-based execution engine plans
+        "queryPlan": {"stage": "OR", "inputStages": [index_scan_plan,
+                                                      {"stage": "COLLSCAN"}]}
+    })
+
+
+class FakeCursor:
+
+    def __init__(self, docs: list[dict]) -> None:
+        self.docs = docs
+
+    def limit(self, limit: int) -> "FakeCursor":
+        return FakeCursor(self.docs[:limit])
+
+    async def __aiter__(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    """Minimal stand-in of a motor collection of documents matching any query."""
+
+    def __init__(self, num_docs: int) -> None:
+        self.docs = [{"_id": ObjectId()} for _ in range(num_docs)]
+
+    def find(self, query: dict, projection: dict) -> FakeCursor:
+        return FakeCursor(list(self.docs))
+
+    async def delete_many(self, query: dict) -> DeleteResult:
+        ids = set(query["_id"]["$in"])
+        num_docs = len(self.docs)
+        self.docs = [doc for doc in self.docs if doc["_id"] not in ids]
+        return DeleteResult({"n": num_docs - len(self.docs)}, acknowledged=True)
+
+
+def test_async_delete_in_batches():
+    collection = FakeCollection(25)
+    deleted_ids: list[ObjectId] = []
+
+    async def before_delete(ids: list[ObjectId]) -> None:
+        deleted_ids.extend(ids)
+
+    async def delete() -> list[int]:
+        return [
+            num_deleted async for num_deleted in async_delete_in_batches(
+                collection, {}, before_delete=before_delete, batch_size=10
+            )
+        ]
+
+    assert asyncio.run(delete()) == [10, 10, 5]
+    assert not collection.docs and len(deleted_ids) == 25
@@ -0,0 +1,16 @@
+from app.utils.etags import etag_matches, get_content_etag, get_version_etag
+
+
+def test_etag_matches():
+    etag = get_version_etag("63becf2d42a96a2f6f1ba55a", 3)
+    assert etag == '"63becf2d42a96a2f6f1ba55a-3"'
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches(get_version_etag("63becf2d42a96a2f6f1ba55a", 2), etag)
+
+
+def test_get_content_etag():
+    assert get_content_etag(b"[]") == get_content_etag(b"[]")
+    assert get_content_etag(b"[]") != get_content_etag(b"[{}]")
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.config.executors import BoundedExecutor, QueueFullError
+
+
+def test_bounded_executor_rejects_when_full():
+    executor = BoundedExecutor("test", num_workers=1, max_queue_size=1)
+    slots = [executor.reserve(), executor.reserve()]
+    with pytest.raises(QueueFullError):
+        executor.reserve()
+
+    slots[0].release()
+    slots[0].release()  # idempotent
+    assert executor.num_pending == 1
+    executor.reserve()
+    executor.shutdown()
+
+
+def test_bounded_executor_runs_off_the_event_loop():
+    executor = BoundedExecutor("test", num_workers=1, max_queue_size=0)
+    started, done = threading.Event(), threading.Event()
+
+    def work(value: int) -> int:
+        started.set()
+        assert done.wait(timeout=5)
+        return value * 2
+
+    async def main() -> int:
+        task = asyncio.create_task(executor.reserve().async_run(work, 21))
+        # the event loop keeps running while :work: blocks its thread
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        assert executor.num_pending == 1
+        done.set()
+        return await task
+
+    assert asyncio.run(main()) == 42
+    assert executor.num_pending == 0
+    executor.shutdown()
@@ -0,0 +1,30 @@
+from io import BufferedReader
+from tempfile import SpooledTemporaryFile
+
+import pytest
+
+from app.utils.files import MemoryViewIO, open_file_view
+
+
+@pytest.mark.parametrize("max_size", [1024 * 1024, 16])  # in memory, rolled to disk
+def test_open_file_view(max_size: int):
+    contents = b"%PDF-1.7 " + bytes(range(256)) * 4
+    with SpooledTemporaryFile(max_size=max_size) as file:
+        file.write(contents)
+        with open_file_view(file) as view:  # type: ignore
+            assert view.readonly
+            assert view == contents
+
+            reader = BufferedReader(MemoryViewIO(view))
+            assert reader.read(4) == b"%PDF"
+            reader.seek(-4, 2)
+            assert reader.read() == contents[-4:]
+            reader.close()
+        file.write(b"still writable")
+
+
+def test_open_empty_file_view():
+    with SpooledTemporaryFile(max_size=0) as file:
+        file.rollover()
+        with open_file_view(file) as view:  # type: ignore
+            assert len(view) == 0
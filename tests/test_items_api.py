@@ -98,6 +98,13 @@ async def test_upload_item(
     response = await client.get(f"/api/{version}/items/{item_id}/document")
     assert response.status_code == status.HTTP_200_OK
 
+    # Test revalidation of unchanged item document
+    etag_response = await client.get(
+        f"/api/{version}/items/{item_id}/document",
+        headers={"If-None-Match": response.headers["ETag"]}
+    )
+    assert etag_response.status_code == status.HTTP_304_NOT_MODIFIED
+
     # save for next test
     request.config.cache.set("item_dict", item_dict)
     request.config.cache.set("item_id", item_id)
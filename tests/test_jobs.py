@@ -0,0 +1,77 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from beanie.odm.fields import PydanticObjectId
+
+from app import worker
+from app.config.variables import Jobs as VarConfig
+from app.crud.jobs import get_fair_job_ids, get_job_retry_delay
+from app.models.fields import JobType
+from app.models.jobs import Job
+
+
+def test_get_fair_job_ids():
+    owner_ids = [PydanticObjectId() for _ in range(3)]
+    job_ids = [PydanticObjectId() for _ in range(3)]
+    date = datetime(2023, 2, 22)
+    owner_jobs = [  # oldest ready job of each owner
+        {"_id": owner_ids[0], "job_id": job_ids[0], "added_date": date},
+        {
+            "_id": owner_ids[1],
+            "job_id": job_ids[1],
+            "added_date": date + timedelta(seconds=1)
+        },
+        {
+            "_id": owner_ids[2],
+            "job_id": job_ids[2],
+            "added_date": date + timedelta(seconds=2)
+        },
+    ]
+    assert get_fair_job_ids(owner_jobs, {}) == job_ids
+    # owners with fewer running jobs go first, however old their jobs are
+    assert get_fair_job_ids(owner_jobs, {owner_ids[0]: 1}) == [
+        job_ids[1], job_ids[2], job_ids[0]
+    ]
+    # owners running the maximum number of jobs are skipped
+    assert get_fair_job_ids(
+        owner_jobs, {owner_ids[1]: 2}, max_running_per_owner=2
+    ) == [job_ids[0], job_ids[2]]
+
+
+def test_get_job_retry_delay():
+    assert get_job_retry_delay(1) == timedelta(seconds=VarConfig.RETRY_BASE_SECONDS)
+    assert get_job_retry_delay(2) == 2 * get_job_retry_delay(1)
+    assert get_job_retry_delay(100) == timedelta(seconds=VarConfig.MAX_RETRY_SECONDS)
+
+
+def test_worker_cancels_job_with_lost_lease(monkeypatch: pytest.MonkeyPatch):
+    calls: list[str] = []
+
+    async def async_run_job(job: Job) -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            calls.append("cancelled")
+            raise
+
+    async def async_extend_job_lease(job: Job) -> bool:
+        return False  # reclaimed by another worker
+
+    async def async_complete_job(job: Job) -> None:
+        calls.append("completed")
+
+    async def async_fail_job(job: Job, error: str) -> None:
+        calls.append("failed")
+
+    monkeypatch.setitem(worker.JOB_HANDLERS, JobType.BLOCK_AUDIO, async_run_job)
+    monkeypatch.setattr(worker, "async_extend_job_lease", async_extend_job_lease)
+    monkeypatch.setattr(worker, "async_complete_job", async_complete_job)
+    monkeypatch.setattr(worker, "async_fail_job", async_fail_job)
+    monkeypatch.setattr(VarConfig, "LEASE_SECONDS", 0.03)
+
+    job = Job.construct(
+        id=PydanticObjectId(), owner_id=PydanticObjectId(), type_=JobType.BLOCK_AUDIO
+    )
+    asyncio.run(asyncio.wait_for(worker.Worker().async_run_job(job), timeout=5))
+    assert calls == ["cancelled"]  # no status written for a job it no longer owns
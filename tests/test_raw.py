@@ -0,0 +1,62 @@
+import pytest
+from beanie.odm.fields import PydanticObjectId
+
+from app.config.logging import LoggerOSError
+from app.crud.blocks import get_block_out_from_block_with_spans
+from app.crud.raw import get_block_audio_dict, get_block_out_dict
+from app.models.blocks import BlockAudio, BlockWithSpans
+from app.models.spans import BaseSpan
+from app.utils.serialization import dumps, dumps_model
+
+
+def get_sample_raw_block(with_seq: bool) -> dict:
+    block_id = PydanticObjectId()
+    head_span_id, tail_span_id = PydanticObjectId(), PydanticObjectId()
+    spans = [  # in reverse order, so that the linked list must be followed
+        {"_id": tail_span_id, "type": 1, "pause": 250, "read": None, "next_id": None},
+        {"_id": head_span_id, "type": 0, "text": "Some text.", "read": False,
+         "next_id": tail_span_id, "is_head": True},
+    ]
+    if with_seq:
+        spans = spans[::-1]
+        for j, span in enumerate(spans):
+            span["seq"] = 1024. * (j + 1)
+
+    return {
+        "_id": block_id, "size_class": "h1", "read": None, "page_nb": 0, "seq": 1024.,
+        "spans": spans
+    }
+
+
+@pytest.mark.parametrize("with_seq", [True, False])
+def test_get_block_out_dict(with_seq: bool):
+    raw_block = get_sample_raw_block(with_seq)
+    block = BlockWithSpans(
+        item_id=PydanticObjectId(),
+        head_span_ids=[],
+        spans=[
+            BaseSpan(block_id=raw_block["_id"], **span) for span in raw_block["spans"]
+        ],
+        **{key: value for key, value in raw_block.items() if key != "spans"}
+    )
+    if not with_seq:
+        block.spans = block.spans[::-1]  # linked list order
+
+    # raw output is serialized exactly as the :BlockOut: model
+    assert dumps(get_block_out_dict(raw_block)) == dumps_model(
+        get_block_out_from_block_with_spans(block)
+    )
+
+
+def test_get_block_out_dict_broken_linked_list():
+    raw_block = get_sample_raw_block(with_seq=False)
+    raw_block["spans"][0]["next_id"] = raw_block["spans"][1]["_id"]  # cycle
+    with pytest.raises(LoggerOSError):
+        get_block_out_dict(raw_block)
+
+
+def test_get_block_audio_dict():
+    raw_block = {"_id": PydanticObjectId(), "audio_status": None, "audio_path": "a.wav"}
+    assert dumps(get_block_audio_dict(raw_block)) == dumps_model(
+        BlockAudio.parse_obj(raw_block)
+    )
@@ -0,0 +1,55 @@
+import pytest
+from app.config.variables import Blocks as VarConfig
+from app.utils.seq import fill_seqs, get_seq, get_seq_between, get_seqs_between
+
+
+def test_get_seq():
+    seqs = [get_seq(idx) for idx in range(5)]
+    assert seqs == sorted(seqs)
+    assert seqs[1] - seqs[0] == VarConfig.SEQ_GAP
+
+
+@pytest.mark.parametrize(
+    "prev_seq, next_seq", [
+        (None, None),
+        (None, 1024.),
+        (1024., None),
+        (1024., 2048.),
+        (1024., 1025.),
+    ]
+)
+def test_get_seq_between(prev_seq: float | None, next_seq: float | None):
+    seq = get_seq_between(prev_seq, next_seq)
+    assert seq is not None
+    if prev_seq is not None:
+        assert prev_seq < seq
+    if next_seq is not None:
+        assert seq < next_seq
+
+
+def test_get_seq_between_exhausted():
+    prev_seq, next_seq = 1024., 2048.
+    for _ in range(100):
+        seq = get_seq_between(prev_seq, next_seq)
+        if seq is None:
+            break
+        next_seq = seq
+    else:
+        pytest.fail("Float precision was never exhausted.")
+
+    assert get_seq_between(prev_seq, next_seq) is None
+
+
+def test_get_seqs_between():
+    seqs = get_seqs_between(1024., 2048., 3)
+    assert seqs is not None and len(seqs) == 3
+    assert 1024. < seqs[0] < seqs[1] < seqs[2] < 2048.
+    assert get_seqs_between(1024., float.fromhex("0x1.0000000000001p+10"), 2) is None
+
+
+def test_fill_seqs():
+    seqs = fill_seqs([None, 1024., None, None, 2048., None])
+    assert seqs is not None
+    assert seqs[1] == 1024. and seqs[4] == 2048.
+    assert seqs == sorted(set(seqs))
+    assert fill_seqs([None, None]) == [get_seq(0), get_seq(1)]
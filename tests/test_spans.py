@@ -0,0 +1,72 @@
+import pytest
+from beanie.odm.fields import PydanticObjectId
+
+from app.config.variables import Blocks as BlocksVarConfig
+from app.crud.blocks import (
+    append_cur_block_to_blocks, construct_block_dict_from_blocks_with_spans,
+    get_spans_out_from_spans_db,
+)
+from app.crud.spans import EmbeddedSpanStorage
+from app.models.blocks import BlockOut, BlockWithSpans
+from app.models.fields import SpanType
+from app.models.spans import BaseSpan
+
+
+def test_embedded_spans():
+    block_id = PydanticObjectId()
+    spans = [
+        BaseSpan(id=PydanticObjectId(), block_id=block_id, text="Some text.", seq=1.,
+                 is_head=True),
+        BaseSpan(id=PydanticObjectId(), block_id=block_id, type_=SpanType.PAUSE,
+                 pause=250, seq=2.),
+    ]
+    embedded_spans = EmbeddedSpanStorage.get_embedded_spans(spans)
+    # the block id and list pointers are implicit in the embedded layout (set on read)
+    assert embedded_spans[0].keys() == {"_id", "type", "pause", "text", "read", "seq"}
+    assert embedded_spans[1]["type"] == SpanType.PAUSE
+
+    block_doc = {"_id": block_id, "spans": embedded_spans}
+    assert EmbeddedSpanStorage.get_block_spans_from_block_doc(
+        block_id, block_doc
+    ) == [spans[0].copy(update={"next_id": spans[1].id}), spans[1]]
+
+
+def test_embedded_item_without_seq(monkeypatch: pytest.MonkeyPatch):
+    """Blocks without :seq: follow the block and span linked lists."""
+    item_id = PydanticObjectId()
+    block_ids = [PydanticObjectId() for _ in range(2)]
+    texts = [["First.", "Second."], ["Third."]]
+    blocks = []
+    for idx, block_id in enumerate(block_ids):
+        embedded_spans = EmbeddedSpanStorage.get_embedded_spans([
+            BaseSpan(id=PydanticObjectId(), block_id=block_id, text=text, seq=None)
+            for text in texts[idx]
+        ])
+        # as read by EmbeddedSpanStorage.get_spans_pipeline()
+        spans = EmbeddedSpanStorage.get_linked_embedded_spans(block_id, embedded_spans)
+        blocks.append(BlockWithSpans(
+            id=block_id,
+            item_id=item_id,
+            next_id=(block_ids[1] if idx == 0 else None),
+            is_head=(idx == 0),
+            page_nb=0,
+            head_span_ids=[spans[0]["_id"]],
+            spans=spans
+        ))
+    blocks.reverse()  # found in any order
+
+    block_dict = construct_block_dict_from_blocks_with_spans(blocks)
+    blocks_out: list[BlockOut] = []
+    cur_block_id: PydanticObjectId | None = block_ids[0]
+    while cur_block_id is not None:
+        cur_block = block_dict.get_block(cur_block_id)
+        append_cur_block_to_blocks(cur_block, blocks_out, block_dict)
+        cur_block_id = cur_block.next_id
+    assert [block.id for block in blocks_out] == block_ids
+    assert [[span.text for span in block.spans] for block in blocks_out] == texts
+
+    monkeypatch.setattr(BlocksVarConfig, "CHECK_LINKED_LIST", True)
+    spans = [BaseSpan.parse_obj(span) for span in blocks[1].spans]
+    assert [span.text for span in get_spans_out_from_spans_db(block_ids[0], spans)] == (
+        texts[0]
+    )
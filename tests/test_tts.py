@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+from beanie.odm.fields import PydanticObjectId
+
+from app.crud.audio_batches import get_reading_seqs
+from app.utils.tts import TTSScheduler, get_reading_order
+
+
+def test_get_reading_order():
+    block_ids = [PydanticObjectId() for _ in range(4)]
+    block_seqs = list(zip(block_ids, [3072., 1024., 4096., 2048.]))
+    assert get_reading_order(block_seqs) == [
+        block_ids[1], block_ids[3], block_ids[0], block_ids[2]
+    ]
+    # from the reading position onwards, then the blocks before it
+    assert get_reading_order(block_seqs, position_seq=3072.) == [
+        block_ids[0], block_ids[2], block_ids[1], block_ids[3]
+    ]
+
+
+
+def test_get_reading_seqs_of_legacy_blocks():
+    block_ids = [PydanticObjectId() for _ in range(4)]
+    # blocks of an item created before :seq:, with blocks added since then
+    block_seqs = dict(zip(block_ids, [None, 2048., None, None]))
+    ordered_block_ids = [block_ids[2], block_ids[0], block_ids[3], block_ids[1]]
+
+    reading_seqs = get_reading_seqs(block_seqs, ordered_block_ids)
+    assert get_reading_order(list(reading_seqs.items())) == ordered_block_ids
+    assert get_reading_order(
+        list(reading_seqs.items()), position_seq=reading_seqs[block_ids[3]]
+    ) == [block_ids[3], block_ids[1], block_ids[2], block_ids[0]]
+    # without the item block list, keys are still comparable
+    assert set(get_reading_seqs(block_seqs).values()) == {0., 2048.}
+
+def test_tts_scheduler_bounds_concurrency_per_voice():
+    scheduler = TTSScheduler(max_concurrency=4, voice_max_concurrency={"slow": 1})
+    block_ids = [PydanticObjectId() for _ in range(12)]
+    started: list[PydanticObjectId] = []
+    running = {"num": 0, "max": 0}
+
+    async def async_synthesize(block_id: PydanticObjectId) -> None:
+        started.append(block_id)
+        running["num"] += 1
+        running["max"] = max(running["max"], running["num"])
+        await asyncio.sleep(0.01)
+        running["num"] -= 1
+        if block_id == block_ids[5]:
+            raise ValueError("TTS error")
+
+    failed_block_ids = asyncio.run(
+        scheduler.async_synthesize_blocks("fast", block_ids, async_synthesize)
+    )
+    assert started == block_ids  # in priority order
+    assert running["max"] == 4
+    assert failed_block_ids == [block_ids[5]]
+
+    running["max"] = 0
+    asyncio.run(
+        TTSScheduler(voice_max_concurrency={"slow": 1}).async_synthesize_blocks(
+            "slow", block_ids[:3], async_synthesize
+        )
+    )
+    assert running["max"] == 1
+
+
+@pytest.mark.parametrize("num_requests", [2, 3])
+def test_tts_scheduler_coalesces_block_requests(num_requests: int):
+    scheduler = TTSScheduler()
+    block_id = PydanticObjectId()
+    num_syntheses = 0
+
+    async def async_synthesize(_: PydanticObjectId) -> None:
+        nonlocal num_syntheses
+        num_syntheses += 1
+        await asyncio.sleep(0.01)
+
+    async def main() -> None:
+        await asyncio.gather(*(
+            scheduler.async_synthesize("voice", block_id, async_synthesize)
+            for _ in range(num_requests)
+        ))
+
+    asyncio.run(main())
+    assert num_syntheses == 1
+    assert scheduler.num_in_flight == 0
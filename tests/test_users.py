@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from beanie.odm.fields import PydanticObjectId
+from pymongo.errors import PyMongoError
+
+from app.config.variables import Users as VarConfig
+from app.crud import users
+from app.crud.users import is_user_deletion_stale
+from app.models.fields import DeletionStatus
+from app.models.users import UserDeletionOut
+
+
+def test_is_user_deletion_stale():
+    deletion = UserDeletionOut(cur_item_id=PydanticObjectId())
+    assert not is_user_deletion_stale(deletion)
+
+    # dates read from db are naive (UTC)
+    deletion.updated_date = datetime.utcnow() - timedelta(
+        seconds=VarConfig.DELETION_STALE_SECONDS + 1
+    )
+    assert is_user_deletion_stale(deletion)
+
+
+def test_async_sweep_user_deletions(monkeypatch: pytest.MonkeyPatch):
+    num_sweeps = 0
+
+    async def async_resume_user_deletions() -> None:
+        nonlocal num_sweeps
+        num_sweeps += 1
+        if num_sweeps == 1:
+            raise PyMongoError("Connection lost.")  # the next sweep still runs
+
+    monkeypatch.setattr(
+        users, "async_resume_user_deletions", async_resume_user_deletions
+    )
+    monkeypatch.setattr(VarConfig, "DELETION_SWEEP_SECONDS", 0)
+
+    async def main() -> None:
+        task = asyncio.create_task(users.async_sweep_user_deletions())
+        while num_sweeps < 3:
+            await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(main())
+    assert num_sweeps >= 3
+
+
+def test_long_s3_user_deletion_is_not_reclaimed(monkeypatch: pytest.MonkeyPatch):
+    class Deletion(UserDeletionOut):
+        id: PydanticObjectId
+
+        async def set(self, fields: dict) -> None:
+            for field, value in fields.items():
+                setattr(self, field, value)
+
+    class DeleteResult:
+        deleted_count = 1
+
+    class User:
+        async def delete(self) -> DeleteResult:
+            return DeleteResult()
+
+    class UserInDB:
+        @staticmethod
+        def find_one(query: dict) -> User:
+            return User()
+
+    deletion = Deletion(id=PydanticObjectId())
+    reclaimed = []
+
+    async def async_delete_user_items_db(deletion: Deletion) -> None:
+        pass
+
+    async def async_delete_user_s3(deletion: Deletion) -> None:
+        # runs past the stale window, without saving progress
+        await asyncio.sleep(VarConfig.DELETION_STALE_SECONDS * 3)
+        reclaimed.append(await users.async_claim_user_deletion_db(deletion))
+
+    monkeypatch.setattr(VarConfig, "DELETION_STALE_SECONDS", 0.2)
+    monkeypatch.setattr(VarConfig, "DELETION_HEARTBEAT_SECONDS", 0.05)
+    monkeypatch.setattr(users, "async_delete_user_items_db", async_delete_user_items_db)
+    monkeypatch.setattr(users, "async_delete_user_s3", async_delete_user_s3)
+    monkeypatch.setattr(users, "UserInDB", UserInDB)
+
+    assert asyncio.run(users.async_run_user_deletion_db_s3(deletion))
+    assert reclaimed == [False]
+    assert deletion.status == DeletionStatus.COMPLETED